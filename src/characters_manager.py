@@ -1,6 +1,6 @@
 from src.character_manager import Character
 from src import utils
-from typing import Any
+from typing import Any, Callable
 
 class Characters:
     """Manages a list of NPCs - both full Characters in conversation and (lightweight) nearby NPCs
@@ -162,4 +162,12 @@ class Characters:
 
     def get_participation_log(self) -> list[tuple[str, str, int]]:
         """Returns ordered list of ("join"/"leave", npc_name, message_index) events."""
-        return self.__participation_log.copy()
\ No newline at end of file
+        return self.__participation_log.copy()
+
+    def remap_participation_log(self, remap_index: Callable[[int], int]):
+        """Updates the message indices of the participation log after messages of the conversation have been replaced
+
+        Args:
+            remap_index (Callable[[int], int]): maps a message index before the change to the index after the change
+        """
+        self.__participation_log = [(event, name, remap_index(msg_index)) for event, name, msg_index in self.__participation_log]
\ No newline at end of file
@@ -212,6 +212,8 @@ class ConfigLoader:
                 self.piper_path = self.__definitions.get_string_value("piper_folder", validate_piper_path)
 
             self.lip_generation = self.__definitions.get_string_value("lip_generation").strip().lower()
+            self.piper_backend = self.__definitions.get_string_value("piper_backend").strip().lower()
+            self.piper_loaded_voices = self.__definitions.get_int_value("piper_loaded_voices")
             self.fast_response_mode = self.__definitions.get_bool_value("fast_response_mode")
             self.fast_response_mode_volume = self.__definitions.get_int_value("fast_response_mode_volume")
             self.allow_per_character_tts_overrides: bool = self.__definitions.get_bool_value("allow_per_character_tts_overrides")
@@ -222,8 +224,14 @@ class ConfigLoader:
             self.xtts_lowvram = self.__definitions.get_bool_value("xtts_lowvram")
             self.xtts_device = self.__definitions.get_string_value("xtts_device")
             self.number_words_tts = self.__definitions.get_int_value("number_words_tts")
+            self.tts_queue_size = self.__definitions.get_int_value("tts_queue_size")
+            self.voiceline_cache_size = self.__definitions.get_int_value("voiceline_cache_size")
+            self.voiceline_warmup_enabled = self.__definitions.get_bool_value("voiceline_warmup_enabled")
+            self.tts_request_timeout = self.__definitions.get_int_value("tts_request_timeout")
+            self.tts_chunk_concurrency = self.__definitions.get_int_value("tts_chunk_concurrency")
             self.xtts_data = self.__definitions.get_string_value("xtts_data")
             self.xtts_accent = self.__definitions.get_bool_value("xtts_accent")
+            self.xtts_streaming = self.__definitions.get_bool_value("xtts_streaming")
 
             self.tts_print = self.__definitions.get_bool_value("tts_print")
         
@@ -249,6 +257,8 @@ class ConfigLoader:
             self.audio_threshold = self.__definitions.get_float_value("audio_threshold")
             self.proactive_mic_mode = self.__definitions.get_bool_value("proactive_mic_mode")
             self.min_refresh_secs = self.__definitions.get_float_value("min_refresh_secs")
+            self.incremental_transcription = self.__definitions.get_bool_value("incremental_transcription")
+            self.speculative_response = self.__definitions.get_bool_value("speculative_response")
             self.play_cough_sound = self.__definitions.get_bool_value("play_cough_sound")
             self.allow_interruption = self.__definitions.get_bool_value("allow_interruption")
             self.ptt_enabled = self.__definitions.get_bool_value("ptt_enabled")
@@ -293,6 +303,9 @@ LLM parameter list must be valid JSON""")
             self.claude_prompt_caching_enabled: bool = self.__definitions.get_bool_value("claude_prompt_caching_enabled")
             self.apply_model_profiles: bool = self.__definitions.get_bool_value("apply_model_profiles")
             self.allow_per_character_llm_overrides: bool = self.__definitions.get_bool_value("allow_per_character_llm_overrides")
+            self.llm_max_connections: int = self.__definitions.get_int_value("llm_max_connections")
+            self.llm_keepalive_expiry: float = self.__definitions.get_float_value("llm_keepalive_expiry")
+            self.llm_http2: bool = self.__definitions.get_bool_value("llm_http2")
 
             # Random LLM Selection
             self.random_llm_enabled: bool = self.__definitions.get_bool_value("random_llm_enabled")
@@ -333,6 +346,8 @@ LLM parameter list must be valid JSON""")
             self.voice_player_input: bool = self.__definitions.get_bool_value("voice_player_input")
             self.player_voice_model: str = self.__definitions.get_string_value("player_voice_model")
             self.conversation_summary_enabled = self.__definitions.get_bool_value("conversation_summary_enabled")
+            self.background_compaction_enabled = self.__definitions.get_bool_value("background_compaction_enabled")
+            self.background_compaction_threshold = self.__definitions.get_float_value("background_compaction_threshold")
             self.enable_character_tag_reading: bool = self.__definitions.get_bool_value("enable_character_tag_reading")
 
             #HTTP
@@ -360,6 +375,7 @@ LLM parameter list must be valid JSON""")
             self.memory_prompt = self.__definitions.get_string_value("memory_prompt")
             self.memory_prompt_datetime_prefix = self.__definitions.get_bool_value("memory_prompt_datetime_prefix")
             self.resummarize_prompt = self.__definitions.get_string_value("resummarize_prompt")
+            self.compaction_prompt = self.__definitions.get_string_value("compaction_prompt")
             self.vision_prompt = self.__definitions.get_string_value("vision_prompt")
             self.function_llm_prompt = self.__definitions.get_string_value("function_llm_prompt")
 
@@ -393,6 +409,7 @@ LLM parameter list must be valid JSON""")
             # Actions
             self.advanced_actions_enabled = self.__definitions.get_bool_value("advanced_actions_enabled")
             self.custom_function_model = self.__definitions.get_bool_value("custom_function_model")
+            self.concurrent_function_llm_call = self.__definitions.get_bool_value("concurrent_function_llm_call")
             self.function_llm_api = self.__definitions.get_string_value("function_llm_api")
             self.function_llm = self.__definitions.get_string_value("function_llm")
             self.function_llm = self.function_llm.split(' |')[0] if ' |' in self.function_llm else self.function_llm
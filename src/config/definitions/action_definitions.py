@@ -19,6 +19,13 @@ class ActionDefinitions:
                         If disabled, the model chosen in the `Large Language Model` tab will be used for both verbal responses and advanced action handling (if advanced actions are enabled)."""
         return ConfigValueBool("custom_function_model", "Custom Tool Calling Model", description, False, tags=[ConfigValueTag.advanced])
 
+    @staticmethod
+    def get_concurrent_function_llm_call_config_value() -> ConfigValue:
+        description = """If enabled, the custom tool calling model is called at the same time as the model generating the NPC's verbal response instead of before it.
+                        This reduces the time it takes for NPCs to start speaking, but the NPC may already have started speaking by the time an action is chosen.
+                        If a chosen action requires a response from the game, the remaining verbal response is discarded."""
+        return ConfigValueBool("concurrent_function_llm_call", "Call Tool Calling Model Concurrently", description, False, tags=[ConfigValueTag.advanced])
+
     @staticmethod
     def get_function_llm_api_config_value() -> ConfigValue:
         description = """Selects the LLM service to connect to (either local or via an API) that will handle NPC actions.
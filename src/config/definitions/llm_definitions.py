@@ -164,6 +164,23 @@ class LLMDefinitions:
             This feature only applies to one-on-one conversations, not multi-NPC."""
         return ConfigValueBool("allow_per_character_llm_overrides", "Per-Character LLM Overrides", description, False, tags=[ConfigValueTag.advanced])
 
+    @staticmethod
+    def get_llm_max_connections_config_value() -> ConfigValue:
+        description = """The maximum number of connections kept open to each LLM service.
+                        Connections are reused between requests to avoid repeating the connection setup for every response."""
+        return ConfigValueInt("llm_max_connections","Max Connections per LLM Service",description, 10, 1, 100, tags=[ConfigValueTag.advanced,ConfigValueTag.share_row])
+
+    @staticmethod
+    def get_llm_keepalive_expiry_config_value() -> ConfigValue:
+        description = """How long (in seconds) an idle connection to an LLM service is kept open to be reused for the next request."""
+        return ConfigValueFloat("llm_keepalive_expiry","LLM Connection Keep-Alive",description, 60.0, 0.0, 3600.0, tags=[ConfigValueTag.advanced,ConfigValueTag.share_row])
+
+    @staticmethod
+    def get_llm_http2_config_value() -> ConfigValue:
+        description = """Whether to use HTTP/2 for connections to LLM services that support it.
+                        Requires the 'h2' Python package. Falls back to HTTP/1.1 if it is not installed."""
+        return ConfigValueBool("llm_http2","LLM HTTP/2",description, False, tags=[ConfigValueTag.advanced,ConfigValueTag.share_row])
+
     @staticmethod
     def get_summary_llm_enabled_config_value() -> ConfigValue:
         description = """Enable a separate LLM client for generating conversation summaries.
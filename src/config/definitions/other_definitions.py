@@ -2,6 +2,7 @@ from src.conversation.action import Action
 from src.config.types.config_value import ConfigValue, ConfigValueTag
 from src.config.types.config_value_bool import ConfigValueBool
 from src.config.types.config_value_int import ConfigValueInt
+from src.config.types.config_value_float import ConfigValueFloat
 from src.config.types.config_value_string import ConfigValueString
 from src.config.types.config_value_multi_selection import ConfigValueMultiSelection
 
@@ -67,6 +68,19 @@ class OtherDefinitions:
                         If disabled: No summaries will be generated when conversations end. 
                         Note: Summaries are still generated when a conversation exceeds the context window."""
         return ConfigValueBool("conversation_summary_enabled", "Conversation Summaries", description, True, tags=[ConfigValueTag.advanced,ConfigValueTag.share_row])
+
+    @staticmethod
+    def get_background_compaction_enabled_config_value() -> ConfigValue:
+        description = """Whether to condense long conversations in the background.
+                        If enabled: Once a conversation uses more than `Background Compaction Threshold` of the LLM's context window, the oldest messages are summarized into a single message while the conversation carries on.
+                        If disabled: Long conversations are only condensed once they fill the context window, which pauses the conversation while NPCs 'gather their thoughts'."""
+        return ConfigValueBool("background_compaction_enabled", "Background Compaction", description, False, tags=[ConfigValueTag.advanced,ConfigValueTag.share_row])
+
+    @staticmethod
+    def get_background_compaction_threshold_config_value() -> ConfigValue:
+        description = """The share of the LLM's context window a conversation may use before its oldest messages are summarized in the background.
+                        Should be lower than the point at which the conversation is reloaded (0.9) so the reload is rarely needed."""
+        return ConfigValueFloat("background_compaction_threshold", "Background Compaction Threshold", description, 0.6, 0.1, 0.85, tags=[ConfigValueTag.advanced,ConfigValueTag.share_row])
     
     @staticmethod
     def get_enable_character_tag_reading_config_value() -> ConfigValue:
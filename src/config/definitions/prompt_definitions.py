@@ -228,6 +228,20 @@ Please summarize the conversation into a single paragraph in {language}."""
         resummarize_prompt = """You are tasked with summarizing the conversation history between {name} and {player_name} (the player) / other characters. These conversations take place in {game}.
                                             Each paragraph represents a conversation at a new point in time. Timestamps in square brackets (eg [Day 42, 5 in the early evening]) indicate when each conversation occurred. Please summarize these conversations into a single paragraph in {language}."""
         return ConfigValueString("resummarize_prompt","Resummarize Prompt",resummarize_prompt_description,resummarize_prompt,[PromptDefinitions.PromptChecker(["name", "language", "game", "player_name"])])
+
+    @staticmethod
+    def get_compaction_prompt_config_value() -> ConfigValue:
+        compaction_prompt_description = """The prompt used to condense the oldest messages of a long conversation when `Background Compaction` is enabled.
+                                            The summary replaces these messages in the ongoing conversation.
+                                            If you would like to edit this, please ensure that the below dynamic variables are contained in curly brackets {}:
+                                                name = the NPC name(s)
+                                                language = the selected language
+                                                game = the game selected
+                                                player_name = the player's name"""
+        compaction_prompt = """You are tasked with summarizing the first part of an ongoing conversation between {name} and {player_name} (and any other characters present). This conversation takes place in {game}.
+                                            The summary will replace these messages, so keep every detail the characters might refer back to later, such as names, places, promises and requests. Text contained within brackets state in-game events.
+                                            Please summarize the conversation into a single paragraph in {language}."""
+        return ConfigValueString("compaction_prompt","Compaction Prompt",compaction_prompt_description,compaction_prompt,[PromptDefinitions.PromptChecker(["name", "language", "game", "player_name"])])
     
     @staticmethod
     def get_vision_prompt_config_value() -> ConfigValue:
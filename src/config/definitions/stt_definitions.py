@@ -113,6 +113,21 @@ class STTDefinitions:
                         Decrease this value to improve response times."""
         return ConfigValueFloat("min_refresh_secs", "Refresh Frequency", description, 0.3, 0.01, 999, tags=[ConfigValueTag.advanced,ConfigValueTag.share_row])
     
+    @staticmethod
+    def get_incremental_transcription_config_value() -> ConfigValue:
+        description = """Local Whisper with Proactive Mode only. If enabled, words that are unlikely to change anymore are kept from one transcription update to the next, and only the rest of the mic input is transcribed again.
+                        Enable this setting to keep long player monologues from slowing down transcription on the CPU.
+                        Disable this setting if words at the boundaries of the kept parts are transcribed incorrectly."""
+        return ConfigValueBool("incremental_transcription", "Incremental Transcription", description, False, tags=[ConfigValueTag.advanced,ConfigValueTag.share_row])
+    
+    @staticmethod
+    def get_speculative_response_config_value() -> ConfigValue:
+        description = """Proactive Mode only. If enabled, the LLM starts responding to what the player has said so far as soon as they pause, instead of waiting for `Pause Threshold` seconds of silence.
+                        If the player keeps talking, the response is thrown away and started again once they pause next.
+                        Enable this setting to improve response times.
+                        Disable this setting if your LLM service charges per request, as it can be called more than once per player turn."""
+        return ConfigValueBool("speculative_response", "Speculative Response", description, False, tags=[ConfigValueTag.advanced,ConfigValueTag.share_row])
+    
     @staticmethod
     def get_external_whisper_service_config_value() -> ConfigValue:
         description = """Allows running of Whisper externally. When enabled, Mantella will call the URL set in 'Whisper URL' instead of running Whisper locally."""
@@ -52,6 +52,21 @@ If you have trouble installing the xVASynth version from Nexus, try installing i
     def get_piper_folder_config_value(is_hidden: bool = False) -> ConfigValue:
         #Note(Leidtier): Because this is a Frankenparameter, I just set it to be a string. It SHOULD be a path, but this would require a different handling of the default empty state
         return ConfigValueString("piper_folder", "Piper Folder", "The folder where Piper is installed (where piper.exe exists).", "", is_hidden=is_hidden)
+    
+    @staticmethod
+    def get_piper_backend_config_value() -> ConfigValue:
+        description = """How Piper voices are run.
+                        'Piper.exe' runs Piper as a separate process.
+                        'In-Process' runs the Piper voice models from the Piper folder directly inside Mantella. This avoids the delay of talking to a separate process, keeps several voices loaded at once and does not require Wine on Linux.
+                        'In-Process' requires the piper-phonemize package and falls back to 'Piper.exe' if it is not installed."""
+        return ConfigValueSelection("piper_backend","Piper Backend",description,"Piper.exe",["Piper.exe","In-Process"],tags=[ConfigValueTag.advanced,ConfigValueTag.share_row])
+    
+    @staticmethod
+    def get_piper_loaded_voices_config_value() -> ConfigValue:
+        description = """The number of Piper voice models kept loaded at the same time, so that switching between the speakers of a group conversation does not reload their voices.
+                        With 'Piper.exe' every loaded voice runs in its own Piper process. Each loaded voice takes up roughly 100 MB of memory.
+                        Keep this at 1 to load a single voice at a time."""
+        return ConfigValueInt("piper_loaded_voices","Piper Loaded Voices",description, 1, 1, 16, tags=[ConfigValueTag.advanced,ConfigValueTag.share_row])
 
     @staticmethod
     def get_lipgen_folder_config_value(is_hidden: bool = False) -> ConfigValue:
@@ -73,6 +88,40 @@ If you have trouble installing the xVASynth version from Nexus, try installing i
                         TTS services often struggle with synthesizing short voicelines, so increasing this threshold can improve quality."""
         return ConfigValueInt("number_words_tts","Number of Words TTS",description, 3, 1, 999999)
     
+    @staticmethod
+    def get_tts_queue_size_config_value() -> ConfigValue:
+        description = """The maximum number of sentences that can wait to be voiced while the LLM response is still being received.
+                        Sentences are voiced in the background so that the LLM response can keep streaming while the TTS service is busy.
+                        Once this limit is reached, reading the LLM response pauses until the TTS service catches up."""
+        return ConfigValueInt("tts_queue_size","TTS Queue Size",description, 4, 1, 32, tags=[ConfigValueTag.advanced])
+    
+    @staticmethod
+    def get_voiceline_cache_size_config_value() -> ConfigValue:
+        description = """The maximum size (in MB) of the cache of previously synthesized voicelines.
+                        When an NPC speaks a voiceline they have spoken before with the same voice, the cached audio and lip sync files are reused instead of being synthesized again.
+                        The least recently used voicelines are removed once the cache grows larger than this. Set to 0 to disable the cache."""
+        return ConfigValueInt("voiceline_cache_size","Voiceline Cache Size (MB)",description, 500, 0, 100000, tags=[ConfigValueTag.advanced])
+    
+    @staticmethod
+    def get_voiceline_warmup_enabled_config_value() -> ConfigValue:
+        description = """Whether to voice fixed lines such as goodbyes in the background as NPCs join a conversation.
+                        These voicelines are then taken from the voiceline cache when needed, so ending a conversation or recovering from an LLM error does not have to wait for the TTS service.
+                        Requires the voiceline cache to be enabled (Voiceline Cache Size above 0)."""
+        return ConfigValueBool("voiceline_warmup_enabled","Pre-Voice System Lines",description, True, tags=[ConfigValueTag.advanced])
+    
+    @staticmethod
+    def get_tts_request_timeout_config_value() -> ConfigValue:
+        description = """xVASynth and XTTS only. The maximum number of seconds to wait for the TTS service to voice a line or load a voice model.
+                        If the TTS service does not respond in time, the voiceline is skipped instead of stalling the conversation."""
+        return ConfigValueInt("tts_request_timeout","TTS Request Timeout",description, 120, 5, 600, tags=[ConfigValueTag.advanced])
+    
+    @staticmethod
+    def get_tts_chunk_concurrency_config_value() -> ConfigValue:
+        description = """xVASynth and XTTS only. Long voicelines are split into chunks of around 150 characters.
+                        This sets how many of these chunks are sent to the TTS service at the same time. The first chunk is played as soon as it is ready, while the rest are still being voiced.
+                        Set to 0 to voice long voicelines as a single audio file again, which only plays once every chunk is done."""
+        return ConfigValueInt("tts_chunk_concurrency","Chunked Synthesis Concurrency",description, 2, 0, 8, tags=[ConfigValueTag.advanced])
+    
     @staticmethod
     def get_lip_generation_config_value() -> ConfigValue:
         description = """Whether to generate lip sync files for spoken voicelines. Disable this setting to improve response times.
@@ -144,6 +193,13 @@ If you have trouble installing the xVASynth version from Nexus, try installing i
         Changes the 'accent' of NPCs by sending the language value from data/Skyrim/skyrim_characters.csv's lang_override column to XTTS.\nThis helps give NPC's unique-sounding voices, even when they use the same base voice model."""
         return ConfigValueBool("xtts_accent", "XTTS Accent", description, False, tags=[ConfigValueTag.advanced,ConfigValueTag.share_row])
     
+    @staticmethod
+    def get_xtts_streaming_config_value() -> ConfigValue:
+        description = """Whether to receive voicelines from the XTTS server as they are being voiced instead of all at once.
+                        The audio is written to file while it arrives, so it is ready to play as soon as the server is done. Most useful when XTTS runs on the CPU.
+                        Only works with the local XTTS models, falls back to receiving voicelines all at once otherwise."""
+        return ConfigValueBool("xtts_streaming", "XTTS Streaming", description, False, tags=[ConfigValueTag.advanced,ConfigValueTag.share_row])
+    
     # xVASynth section
     @staticmethod
     def get_tts_process_device_config_value() -> ConfigValue:
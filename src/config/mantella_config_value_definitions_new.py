@@ -59,6 +59,9 @@ class MantellaConfigValueDefinitionsNew:
         llm_category.add_config_value(LLMDefinitions.get_narration_indicators())
         llm_category.add_config_value(LLMDefinitions.get_claude_prompt_caching_config_value())
         llm_category.add_config_value(LLMDefinitions.get_allow_per_character_llm_overrides_config_value())
+        llm_category.add_config_value(LLMDefinitions.get_llm_max_connections_config_value())
+        llm_category.add_config_value(LLMDefinitions.get_llm_keepalive_expiry_config_value())
+        llm_category.add_config_value(LLMDefinitions.get_llm_http2_config_value())
         llm_category.add_config_value(LLMDefinitions.get_summary_llm_enabled_config_value())
         llm_category.add_config_value(LLMDefinitions.get_summary_llm_api_config_value())
         llm_category.add_config_value(LLMDefinitions.get_summary_llm_config_value())
@@ -73,9 +76,16 @@ class MantellaConfigValueDefinitionsNew:
         tts_category.add_config_value(TTSDefinitions.get_xvasynth_folder_config_value())
         tts_category.add_config_value(TTSDefinitions.get_xtts_folder_config_value())
         tts_category.add_config_value(TTSDefinitions.get_piper_folder_config_value(is_integrated))
+        tts_category.add_config_value(TTSDefinitions.get_piper_backend_config_value())
+        tts_category.add_config_value(TTSDefinitions.get_piper_loaded_voices_config_value())
         tts_category.add_config_value(TTSDefinitions.get_lipgen_folder_config_value(is_integrated))
         tts_category.add_config_value(TTSDefinitions.get_facefx_folder_config_value(is_integrated))
         tts_category.add_config_value(TTSDefinitions.get_number_words_tts_config_value())
+        tts_category.add_config_value(TTSDefinitions.get_tts_queue_size_config_value())
+        tts_category.add_config_value(TTSDefinitions.get_voiceline_cache_size_config_value())
+        tts_category.add_config_value(TTSDefinitions.get_voiceline_warmup_enabled_config_value())
+        tts_category.add_config_value(TTSDefinitions.get_tts_request_timeout_config_value())
+        tts_category.add_config_value(TTSDefinitions.get_tts_chunk_concurrency_config_value())
         tts_category.add_config_value(TTSDefinitions.get_lip_generation_config_value())
         tts_category.add_config_value(TTSDefinitions.get_fast_response_mode_config_value())
         tts_category.add_config_value(TTSDefinitions.get_fast_response_mode_volume_config_value())
@@ -87,6 +97,7 @@ class MantellaConfigValueDefinitionsNew:
         tts_category.add_config_value(TTSDefinitions.get_xtts_lowvram_config_value())
         tts_category.add_config_value(TTSDefinitions.get_xtts_data_config_value())
         tts_category.add_config_value(TTSDefinitions.get_xtts_accent_config_value())
+        tts_category.add_config_value(TTSDefinitions.get_xtts_streaming_config_value())
         tts_category.add_config_value(TTSDefinitions.get_tts_print_config_value())
         tts_category.add_config_value(TTSDefinitions.get_tts_process_device_config_value())
         tts_category.add_config_value(TTSDefinitions.get_pace_config_value())
@@ -108,6 +119,8 @@ class MantellaConfigValueDefinitionsNew:
         stt_category.add_config_value(STTDefinitions.get_whisper_model_size_config_value())
         stt_category.add_config_value(STTDefinitions.get_proactive_mic_mode_config_value())
         stt_category.add_config_value(STTDefinitions.get_min_refresh_secs_config_value())
+        stt_category.add_config_value(STTDefinitions.get_incremental_transcription_config_value())
+        stt_category.add_config_value(STTDefinitions.get_speculative_response_config_value())
         stt_category.add_config_value(STTDefinitions.get_external_whisper_service_config_value())
         stt_category.add_config_value(STTDefinitions.get_whisper_url_config_value())
         stt_category.add_config_value(STTDefinitions.get_stt_language_config_value())
@@ -138,6 +151,7 @@ class MantellaConfigValueDefinitionsNew:
         actions_category = ConfigValueGroup("Actions", "Actions", "Settings for in-game actions.", on_value_change_callback)
         actions_category.add_config_value(ActionDefinitions.get_advanced_actions_enabled_config_value())
         actions_category.add_config_value(ActionDefinitions.get_custom_function_model_config_value())
+        actions_category.add_config_value(ActionDefinitions.get_concurrent_function_llm_call_config_value())
         actions_category.add_config_value(ActionDefinitions.get_function_llm_api_config_value())
         actions_category.add_config_value(ActionDefinitions.get_function_llm_model_config_value())
         actions_category.add_config_value(ActionDefinitions.get_function_llm_custom_token_count_config_value())
@@ -161,6 +175,7 @@ class MantellaConfigValueDefinitionsNew:
         prompts_category.add_config_value(PromptDefinitions.get_memory_prompt_config_value())
         prompts_category.add_config_value(PromptDefinitions.get_memory_prompt_datetime_prefix_config_value())
         prompts_category.add_config_value(PromptDefinitions.get_resummarize_prompt_config_value())
+        prompts_category.add_config_value(PromptDefinitions.get_compaction_prompt_config_value())
         prompts_category.add_config_value(PromptDefinitions.get_vision_prompt_config_value())
         prompts_category.add_config_value(PromptDefinitions.get_function_llm_prompt_config_value())
         prompts_category.add_config_value(PromptDefinitions.get_radiant_start_prompt_config_value())
@@ -191,6 +206,8 @@ class MantellaConfigValueDefinitionsNew:
         other_category.add_config_value(OtherDefinitions.get_voice_player_input())
         other_category.add_config_value(OtherDefinitions.get_player_voice_model())
         other_category.add_config_value(OtherDefinitions.get_conversation_summary_enabled_config_value())
+        other_category.add_config_value(OtherDefinitions.get_background_compaction_enabled_config_value())
+        other_category.add_config_value(OtherDefinitions.get_background_compaction_threshold_config_value())
         other_category.add_config_value(OtherDefinitions.get_enable_character_tag_reading_config_value())
         other_category.add_config_value(OtherDefinitions.get_save_audio_data_to_character_folder_config_value())
         other_category.add_config_value(OtherDefinitions.get_port_config_value())
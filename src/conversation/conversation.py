@@ -1,11 +1,12 @@
+from bisect import bisect_left
+from concurrent.futures import Future, wait
 from enum import Enum
-from threading import Thread, Lock
+from threading import Lock
 import time
 from typing import Any
 from src.llm.ai_client import AIClient
 from src.llm.sentence_content import SentenceTypeEnum, SentenceContent
 from opentelemetry import context as OpenTelemetryContext
-from src.telemetry.telemetry import set_parent_context
 from src.characters_manager import Characters
 from src.conversation.conversation_log import conversation_log
 from src.conversation.action import Action
@@ -15,6 +16,7 @@ from src.remember.remembering import Remembering
 from src.output_manager import ChatManager
 from src.llm.messages import AssistantMessage, SystemMessage, UserMessage
 from src.conversation.context import Context
+from src.conversation.message_compactor import MessageCompactor
 from src.llm.message_thread import message_thread
 from src.conversation.conversation_type import conversation_type, multi_npc, pc_to_npc, radiant
 from src.character_manager import Character
@@ -35,7 +37,7 @@ class Conversation:
     TOKEN_LIMIT_PERCENT: float = 0.9
     TOKEN_LIMIT_RELOAD_MESSAGES: float = 0.1
     """Controls the flow of a conversation."""
-    def __init__(self, context_for_conversation: Context, output_manager: ChatManager, rememberer: Remembering, llm_client: AIClient, stt: Transcriber | None, mic_input: bool, mic_ptt: bool, game = None) -> None:
+    def __init__(self, context_for_conversation: Context, output_manager: ChatManager, rememberer: Remembering, llm_client: AIClient, stt: Transcriber | None, mic_input: bool, mic_ptt: bool, game = None, summary_client: AIClient | None = None) -> None:
         
         self.__context: Context = context_for_conversation
         self.__game = game
@@ -46,6 +48,13 @@ class Conversation:
         self.__stt: Transcriber | None = stt
         self.__events_refresh_time: float = context_for_conversation.config.events_refresh_time  # Time in seconds before events are considered stale
         self.__transcribed_text: str | None = None
+        # Start the response on the interim transcription while the player pauses, see __start_speculative_response
+        self.__speculative_response_enabled: bool = context_for_conversation.config.speculative_response and context_for_conversation.config.proactive_mic_mode
+        self.__speculative_message: UserMessage | None = None
+        self.__messages_before_speculation: int = 0
+        # State the speculative response may change through tool calls, restored if it is discarded: (end conversation requested, listen requested, temporary pause)
+        self.__state_before_speculation: tuple[bool, bool, float | None] = (False, False, None)
+        self.__speculative_events: list[str] = [] # the in-game events the speculative response was started with
         
         # Silence auto-response settings
         self.__silence_auto_response_enabled: bool = context_for_conversation.config.silence_auto_response_enabled
@@ -65,8 +74,11 @@ class Conversation:
         self.__has_already_ended: bool = False
         self.__allow_mic_input: bool = True # this flag ensures mic input is disabled on conversation end
         self.__sentences: SentenceQueue = SentenceQueue()
-        self.__generation_thread: Thread | None = None
+        self.__generation: Future | None = None
         self.__generation_start_lock: Lock = Lock()
+        self.__message_compactor: MessageCompactor | None = None
+        if context_for_conversation.config.background_compaction_enabled:
+            self.__message_compactor = MessageCompactor(llm_client, context_for_conversation.config, context_for_conversation.language['language'], summary_client)
         
         # Set up Listen action callback to apply extended pause to STT
         if stt:
@@ -106,6 +118,8 @@ class Conversation:
             new_character (Character): the character to add or update
         """
         characters_removed_by_update = self.__context.add_or_update_characters(new_character, len(self.__messages))
+        self.__output_manager.preload_voices(new_character)
+        self.__output_manager.warm_up_voicelines(new_character)
         if len(characters_removed_by_update) > 0:
             self.__save_conversation(is_reload=True, departed_npcs=characters_removed_by_update)
 
@@ -134,9 +148,14 @@ class Conversation:
         """
         if self.has_already_ended:
             return comm_consts.KEY_REPLYTYPE_ENDCONVERSATION, None        
+        if self.__message_compactor:
+            self.__apply_message_compaction()
         if self.__llm_client.is_too_long(self.__messages, self.TOKEN_LIMIT_PERCENT):
             # Check if conversation too long and if yes initiate intermittent reload
             self.__initiate_reload_conversation()
+        elif self.__message_compactor and self.__llm_client.is_too_long(self.__messages, self.__context.config.background_compaction_threshold):
+            # Condense the oldest messages in the background long before the reload is needed
+            self.__message_compactor.start(self.__messages, self.__context.npcs_in_conversation, self.__llm_client.get_token_budget(self.TOKEN_LIMIT_RELOAD_MESSAGES))
 
         # interrupt response if player has spoken
         if self.__stt and self.__stt.has_player_spoken:
@@ -236,8 +255,9 @@ class Conversation:
                 
                 # Start tracking how long it has taken to receive a player response
                 input_wait_start_time = time.time()
+                on_speech_paused = self.__start_speculative_response if self.__speculative_response_enabled and not self.__has_already_ended else None
                 while not player_text:
-                    player_text = self.__stt.get_latest_transcription(silence_timeout=silence_timeout)
+                    player_text = self.__stt.get_latest_transcription(silence_timeout=silence_timeout, on_speech_paused=on_speech_paused)
                     
                     # Handle silence timeout (None returned)
                     if player_text is None:
@@ -257,6 +277,7 @@ class Conversation:
                     # If too much time has passed, in-game events need to be updated
                     events_need_updating = True
                     logger.debug('Updating game events...')
+                    self.__discard_speculative_response()
                     return player_text, events_need_updating, None
                 
                 # Stop listening once input has been detected to give the NPC a chance to speak
@@ -264,10 +285,14 @@ class Conversation:
                 # otherwise the player could constantly speak over the NPC and never hear a response
                 self.__stt.stop_listening()
             
-            new_message: UserMessage = UserMessage(self.__context.config, player_text, player_character.name, False)
-            new_message.is_multi_npc_message = self.__context.npcs_in_conversation.contains_multiple_npcs()
-            new_message = self.update_game_events(new_message)
-            self.__messages.add_message(new_message)
+            speculative_message = self.__commit_speculative_response(player_text)
+            if speculative_message:
+                new_message = speculative_message
+            else:
+                new_message: UserMessage = UserMessage(self.__context.config, player_text, player_character.name, False)
+                new_message.is_multi_npc_message = self.__context.npcs_in_conversation.contains_multiple_npcs()
+                new_message = self.update_game_events(new_message)
+                self.__messages.add_message(new_message)
             player_voiceline = self.__get_player_voiceline(player_character, player_text)
             text = new_message.text
             logger.log(23, f"Text passed to NPC: {text}")
@@ -278,11 +303,77 @@ class Conversation:
         elif self.__has_conversation_ended(text):
             new_message.is_system_generated_message = True # Flag message containing goodbye as a system message to exclude from summary
             self.initiate_end_sequence()
-        else:
+        elif not speculative_message: # a committed speculative response is already being generated
             self.__start_generating_npc_sentences()
 
         return player_text, events_need_updating, player_voiceline
 
+    @utils.time_it
+    def __start_speculative_response(self, interim_text: str):
+        """Starts generating the response to what the player has said so far while they pause. Replaces the previous speculative response if there is one.
+        Called by the STT while process_player_input waits for the player, so the generation start lock is already held
+        """
+        player_character = self.__context.npcs_in_conversation.get_player_character()
+        if not player_character:
+            return
+        self.__discard_speculative_response()
+        if self.__does_dismiss_npc_from_conversation(interim_text) or self.__has_conversation_ended(interim_text):
+            return # these are handled once the player has finished speaking
+
+        logger.debug(f"Starting speculative response to: {interim_text}")
+        self.__messages_before_speculation = len(self.__messages)
+        self.__state_before_speculation = (self.__output_manager.end_conversation_requested, self.__output_manager.listen_requested, self.__stt.temporary_pause)
+        self.__speculative_events = list(self.__context.get_context_ingame_events())
+        speculative_message = UserMessage(self.__context.config, interim_text, player_character.name, False)
+        speculative_message.is_multi_npc_message = self.__context.npcs_in_conversation.contains_multiple_npcs()
+        self.__speculative_message = self.update_game_events(speculative_message, consume_events=False)
+        self.__messages.add_message(self.__speculative_message)
+        self.__begin_generation()
+
+    @utils.time_it
+    def __discard_speculative_response(self):
+        """Stops the speculative response if there is one and undoes everything it changed: its messages in the thread
+        and the requests to end the conversation or listen longer it made through tool calls
+        """
+        if not self.__speculative_message:
+            return
+        self.__stop_generation()
+        self.__sentences.clear()
+        self.__messages.truncate(self.__messages_before_speculation)
+        self.__speculative_message = None
+
+        end_conversation_requested, listen_requested, temporary_pause = self.__state_before_speculation
+        if not end_conversation_requested:
+            self.__output_manager.clear_end_conversation_requested()
+        if not listen_requested:
+            self.__output_manager.clear_listen_requested()
+        self.__stt.temporary_pause = temporary_pause
+
+    @utils.time_it
+    def __commit_speculative_response(self, player_text: str) -> UserMessage | None:
+        """Keeps the speculative response if it answers what the player has said, else discards it
+
+        Returns:
+            UserMessage | None: the speculative message now holding the player's text, or None if there is no speculative response to keep
+        """
+        speculative_message = self.__speculative_message
+        if not speculative_message:
+            return None
+        if utils.clean_text(speculative_message.text) != utils.clean_text(player_text):
+            logger.debug(f"Discarding speculative response to '{speculative_message.text}', the player said '{player_text}'")
+            self.__discard_speculative_response()
+            return None
+        if self.__context.get_context_ingame_events() != self.__speculative_events:
+            logger.debug("Discarding speculative response, in-game events have happened since it was started")
+            self.__discard_speculative_response()
+            return None
+
+        logger.log(23, "Player said what the speculative response was started for, keeping it")
+        self.__speculative_message = None
+        speculative_message.text = player_text
+        self.__consume_game_events() # only the events the speculative message already holds, see above
+        return speculative_message
+
     def __get_mic_prompt(self):
         mic_prompt = f"This is a conversation with {self.__context.get_character_names_as_text(False)} in {self.__context.location}."
         #logger.log(23, f'Context for mic transcription: {mic_prompt}')
@@ -338,25 +429,35 @@ class Conversation:
                 self.__messages: message_thread = message_thread(self.__context.config, new_prompt)
             else:
                 self.__conversation_type.adjust_existing_message_thread(new_prompt, self.__messages)
-                self.__messages.reload_message_thread(new_prompt, self.__llm_client.is_too_long, self.TOKEN_LIMIT_RELOAD_MESSAGES)
+                self.__messages.reload_message_thread(new_prompt, self.__llm_client.get_message_token_count, self.__llm_client.get_token_budget(self.TOKEN_LIMIT_RELOAD_MESSAGES))
 
     @utils.time_it
-    def update_game_events(self, message: UserMessage) -> UserMessage:
-        """Add in-game events to player's response"""
+    def update_game_events(self, message: UserMessage, consume_events: bool = True) -> UserMessage:
+        """Add in-game events to player's response
+
+        Args:
+            message (UserMessage): the message to add the events to
+            consume_events (bool, optional): whether the events are cleared from the context, so they are not added to the next message. Defaults to True.
+        """
 
-        all_ingame_events = self.__context.get_context_ingame_events()
+        all_ingame_events = list(self.__context.get_context_ingame_events())
         if self.__is_player_interrupting:
             all_ingame_events.append('Interrupting...')
-            self.__is_player_interrupting = False
         max_events = min(len(all_ingame_events) ,self.__context.config.max_count_events)
         message.add_event(all_ingame_events[-max_events:])
-        self.__context.clear_context_ingame_events()        
+        if not consume_events:
+            return message
+        self.__consume_game_events()
 
         if message.count_ingame_events() > 0:            
             logger.log(28, f'In-game events since previous exchange:\n{message.get_ingame_events_text()}')
 
         return message
 
+    def __consume_game_events(self):
+        self.__is_player_interrupting = False
+        self.__context.clear_context_ingame_events()
+
     @utils.time_it
     def resume_after_interrupting_action(self) -> bool:
         """Inject a synthetic user message once action results arrive so the LLM can continue
@@ -455,30 +556,30 @@ class Conversation:
     
     @utils.time_it
     def __start_generating_npc_sentences(self, allow_tool_use: bool = True):
-        """Starts a background Thread to generate sentences into the SentenceQueue"""    
+        """Starts generating sentences into the SentenceQueue in the background"""    
         with self.__generation_start_lock:
-            if not self.__generation_thread or not self.__generation_thread.is_alive():
-                self.__sentences.is_more_to_come = True
-                # Generate tools if advanced actions are enabled
-                tools = None
-                if self.context.config.advanced_actions_enabled and allow_tool_use:
-                    tools = FunctionManager.generate_context_aware_tools(self.__context, self.__game)
-                # Capture current OpenTelemetry context for the new thread
-                opentelemetry_context = OpenTelemetryContext.get_current()
-                def thread_target():
-                    set_parent_context(opentelemetry_context)
-                    self.__output_manager.generate_response(self.__messages, self.__context.npcs_in_conversation, self.__sentences, self.context.config.actions, tools, self.__game)
-                self.__generation_thread = Thread(target=thread_target)
-                self.__generation_thread.start()
+            self.__begin_generation(allow_tool_use)
+
+    def __begin_generation(self, allow_tool_use: bool = True):
+        """Starts generating sentences unless a generation is already running. Must be called while holding the generation start lock"""
+        if not self.__generation or self.__generation.done():
+            self.__sentences.is_more_to_come = True
+            # Generate tools if advanced actions are enabled
+            tools = None
+            if self.context.config.advanced_actions_enabled and allow_tool_use:
+                tools = FunctionManager.generate_context_aware_tools(self.__context, self.__game)
+            # Capture current OpenTelemetry context for the generation loop
+            opentelemetry_context = OpenTelemetryContext.get_current()
+            self.__generation = self.__output_manager.start_generating_response(self.__messages, self.__context.npcs_in_conversation, self.__sentences, self.context.config.actions, tools, self.__game, opentelemetry_context)
 
     @utils.time_it
     def __stop_generation(self):
         """Stops the current generation of sentences if there is one
         """
         self.__output_manager.stop_generation()
-        while self.__generation_thread and self.__generation_thread.is_alive():
-            time.sleep(0.1)
-        self.__generation_thread = None
+        if self.__generation:
+            wait([self.__generation])
+        self.__generation = None
 
     @utils.time_it
     def __prepare_eject_npc_from_conversation(self, npc: Character):
@@ -523,6 +624,26 @@ class Conversation:
 
         self.__rememberer.save_conversation_state(self.__messages, npcs_to_summarize, npcs, self.__context.world_id, is_reload, pending_shares, end_timestamp)
 
+    @utils.time_it
+    def __apply_message_compaction(self):
+        """Splices a finished background compaction into the message thread. Waits until no response is being generated, as the generation may add messages to the thread"""
+        if self.__generation and not self.__generation.done():
+            return
+        compaction = self.__message_compactor.apply(self.__messages)
+        if not compaction:
+            return
+        compacted_messages, replaced_indices = compaction
+        # Keep the transcript of the compacted messages, the same way a reload does
+        for npc in self.__context.npcs_in_conversation.get_non_player_characters():
+            conversation_log.save_conversation_log(npc, self.__messages.transform_to_openai_messages(compacted_messages), self.__context.world_id)
+
+        first_replaced_index = replaced_indices[0]
+        def remap_index(index: int) -> int:
+            if index <= first_replaced_index:
+                return index
+            return index - bisect_left(replaced_indices, index) + 1 # + 1 for the summary message in place of the replaced messages
+        self.__context.npcs_in_conversation.remap_participation_log(remap_index)
+
     @utils.time_it
     def __initiate_reload_conversation(self):
         """Places a "gather thoughts" sentence add the front of the queue that also prompts the game to request a reload of the conversation using an action"""
@@ -545,7 +666,7 @@ class Conversation:
         self.__save_conversation(is_reload=True)
         # Reload
         new_prompt = self.__conversation_type.generate_prompt(self.__context)
-        self.__messages.reload_message_thread(new_prompt, self.__llm_client.is_too_long, self.TOKEN_LIMIT_RELOAD_MESSAGES)
+        self.__messages.reload_message_thread(new_prompt, self.__llm_client.get_message_token_count, self.__llm_client.get_token_budget(self.TOKEN_LIMIT_RELOAD_MESSAGES))
 
     @utils.time_it
     def __has_conversation_ended(self, last_user_text: str) -> bool:
@@ -0,0 +1,126 @@
+from concurrent.futures import Future
+from threading import Thread
+from src.config.config_loader import ConfigLoader
+from src.config.definitions.game_definitions import GameEnum
+from src.characters_manager import Characters
+from src.llm.ai_client import AIClient
+from src.llm.client_base import ClientBase
+from src.llm.message_thread import message_thread
+from src.llm.messages import CompactionMessage, Message, UserMessage
+import src.utils as utils
+
+logger = utils.get_logger()
+
+
+class MessageCompactor:
+    """Condenses the oldest messages of a long conversation into a single summary message on a background thread.
+
+    Compaction is started once the conversation crosses a lower watermark and the summary is spliced into the
+    message_thread once it is ready, so the conversation carries on in the meantime and the blocking reload
+    (which waits for a full summary round trip) is rarely reached.
+    """
+    MIN_MESSAGES_TO_COMPACT: int = 2
+
+    def __init__(self, client: AIClient, config: ConfigLoader, language_name: str, summary_client: AIClient | None = None) -> None:
+        self.__client: AIClient = client
+        if not summary_client and isinstance(client, ClientBase):
+            # The summary must not hold the generation lock of the client that streams the NPC responses
+            summary_client = client.with_own_generation_lock()
+        self.__summary_client: AIClient = summary_client if summary_client else client
+        self.__config: ConfigLoader = config
+        self.__language_name: str = language_name
+        self.__messages_being_compacted: list[Message] = []
+        self.__summary: Future | None = None
+
+    @property
+    def is_compacting(self) -> bool:
+        return self.__summary is not None
+
+    @utils.time_it
+    def start(self, messages: message_thread, characters: Characters, token_budget_to_keep: float) -> bool:
+        """Starts summarizing the oldest messages of the thread in the background. Does nothing if a compaction is already running
+
+        Args:
+            messages (message_thread): the messages of the conversation
+            characters (Characters): the characters in the conversation
+            token_budget_to_keep (float): how many tokens the newest messages may use and stay untouched
+
+        Returns:
+            bool: True if a compaction has been started
+        """
+        if self.is_compacting:
+            return False
+        messages_to_compact = messages.get_messages_to_compact(self.__client.get_message_token_count, token_budget_to_keep)
+        if len(messages_to_compact) < self.MIN_MESSAGES_TO_COMPACT:
+            return False
+
+        # Format the text here rather than on the worker, the messages may change once the worker runs
+        text_to_summarize = message_thread.transform_to_dict_representation(messages_to_compact)
+        prompt = self.__get_prompt(characters)
+        logger.info(f"Compacting the oldest {len(messages_to_compact)} messages of the conversation in the background...")
+
+        summary: Future = Future()
+        def summarize():
+            try:
+                summary.set_result(self.__summarize(text_to_summarize, prompt))
+            except Exception as e:
+                logger.error(f"Failed to compact conversation: {e}")
+                summary.set_result(None)
+        self.__messages_being_compacted = messages_to_compact
+        self.__summary = summary
+        Thread(target=summarize, name="MessageCompactor", daemon=True).start()
+        return True
+
+    @utils.time_it
+    def apply(self, messages: message_thread) -> tuple[list[Message], list[int]] | None:
+        """Replaces the compacted messages with their summary if the background compaction has finished. Never blocks
+
+        Args:
+            messages (message_thread): the messages of the conversation
+
+        Returns:
+            tuple[list[Message], list[int]] | None: the messages that have been replaced and their former indices, None if nothing has been changed
+        """
+        if not self.__summary or not self.__summary.done():
+            return None
+        summary: str | None = self.__summary.result()
+        messages_to_replace = self.__messages_being_compacted
+        self.discard()
+        if not summary:
+            return None
+
+        replaced_indices = messages.replace_messages(messages_to_replace, CompactionMessage(self.__config, summary))
+        if replaced_indices is None:
+            # The conversation has been reloaded while summarizing
+            logger.debug("Discarded background compaction, the compacted messages are no longer part of the conversation")
+            return None
+        logger.info(f"Compacted {len(replaced_indices)} messages of the conversation into a summary")
+        return messages_to_replace, replaced_indices
+
+    def discard(self):
+        """Forgets about a running or finished compaction without applying it
+        """
+        self.__messages_being_compacted = []
+        self.__summary = None
+
+    def __get_prompt(self, characters: Characters) -> str:
+        if self.__config.game.base_game == GameEnum.FALLOUT4:
+            location: str = 'the Commonwealth'
+        else:
+            location: str = "Skyrim"
+        return self.__config.compaction_prompt.format(
+            name=', '.join([c.name for c in characters.get_non_player_characters()]),
+            language=self.__language_name,
+            game=location,
+            player_name=characters.get_player_name() or "the player"
+        )
+
+    @utils.time_it
+    def __summarize(self, text_to_summarize: str, prompt: str) -> str | None:
+        messages = message_thread(self.__config, prompt)
+        messages.add_message(UserMessage(self.__config, text_to_summarize))
+        summary = self.__summary_client.request_call(messages)
+        if not summary:
+            logger.error("Compacting conversation failed.")
+            return None
+        return summary.strip()
@@ -39,6 +39,7 @@ class GameStateManager:
         self.__config: ConfigLoader = config
         self.__language_info: dict[Hashable, str] = language_info
         self.__client: LLMClient = client
+        self.__summary_client: SummaryLLMClient | None = summary_client
         self.__chat_manager: ChatManager = chat_manager
         self.__rememberer: Remembering = Summaries(game, config, client, language_info['language'], summary_client)
         self.__talk: Conversation | None = None
@@ -67,9 +68,10 @@ class GameStateManager:
         if input_json.__contains__(comm_consts.KEY_INPUTTYPE):
             self.process_stt_setup(input_json)
         
+        self.__chat_manager.clear_preloaded_voices()
         conversation_client = self._build_random_conversation_client() or self.__client
         context_for_conversation = Context(world_id, self.__config, conversation_client, self.__rememberer, self.__language_info)
-        self.__talk = Conversation(context_for_conversation, self.__chat_manager, self.__rememberer, conversation_client, self.__stt, self.__mic_input, self.__mic_ptt, self.__game)
+        self.__talk = Conversation(context_for_conversation, self.__chat_manager, self.__rememberer, conversation_client, self.__stt, self.__mic_input, self.__mic_ptt, self.__game, self.__summary_client)
         self.__update_context(input_json)
         self.__try_preload_voice_model()
         self.__talk.start_conversation()
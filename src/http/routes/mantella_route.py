@@ -9,6 +9,7 @@ from src.games.skyrim import Skyrim
 from src.output_manager import ChatManager
 from src.llm.llm_client import LLMClient
 from src.llm.summary_client import SummaryLLMClient
+from src.llm.http_client_pool import get_http_client_pool
 from src.game_manager import GameStateManager
 from src.http.routes.routeable import routeable
 from src.http.communication_constants import communication_constants as comm_consts
@@ -32,6 +33,7 @@ class mantella_route(routeable):
         super().__init__(config)
         self.__language_info: dict[Hashable, str] = language_info
         self.__game: GameStateManager | None = None
+        self.__chat_manager: ChatManager | None = None
 
         # if not self._can_route_be_used():
         #     error_message = "MantellaSoftware settings faulty. Please check MantellaSoftware's window or log."
@@ -41,6 +43,7 @@ class mantella_route(routeable):
     def _setup_route(self):
         if self.__game:
             self.__game.end_conversation({})
+        self.__shutdown()
 
         game: Gameable
         game_enum = self._config.game
@@ -51,6 +54,7 @@ class mantella_route(routeable):
 
         tts: TTSable = create_tts(self._config.tts_service, self._config, game)
 
+        get_http_client_pool().configure(self._config.llm_max_connections, self._config.llm_keepalive_expiry, self._config.llm_http2)
         llm_client = LLMClient(self._config)
 
         summary_client: SummaryLLMClient | None = None
@@ -58,10 +62,23 @@ class mantella_route(routeable):
             summary_client = SummaryLLMClient(self._config)
 
         chat_manager = ChatManager(self._config, tts, llm_client, game)
+        self.__chat_manager = chat_manager
         self.__game = GameStateManager(game, chat_manager, self._config, self.__language_info, llm_client, summary_client)
+        # Pre-voice goodbyes etc in the background as NPCs join conversations
+        chat_manager.start_voiceline_warmup()
+
+    def __shutdown(self):
+        """Stops response generation and the TTS services of the current chat manager, eg before it is replaced"""
+        if self.__chat_manager:
+            self.__chat_manager.shutdown_generation_loop()
+            self.__chat_manager.close_tts_services()
 
     @utils.time_it
     def add_route_to_server(self, app: FastAPI):
+        @app.on_event("shutdown")
+        def shutdown():
+            self.__shutdown()
+
         @app.post("/mantella")
         async def mantella(request: Request):
             if not self._can_route_be_used():
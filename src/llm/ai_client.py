@@ -49,6 +49,18 @@ class AIClient(ABC):
         """
         pass
 
+    @abstractmethod
+    def get_token_budget(self, token_limit_percent: float) -> float:
+        """Returns how many tokens a list of messages may use before it is too long for token_limit_percent of the context size of the model
+        """
+        pass
+
+    @abstractmethod
+    def get_message_token_count(self, message: Message) -> int:
+        """Returns the number of tokens used by a single message as part of a request
+        """
+        pass
+
     @staticmethod
     @abstractmethod
     def get_model_list(service: str, default_model: str = "mistralai/mistral-small-3.1-24b-instruct:free", is_vision: bool = False, is_tool_calling: bool = False) -> LLMModelList:
@@ -1,5 +1,8 @@
+import asyncio
+import copy
+from contextlib import asynccontextmanager
 from threading import Lock
-from typing import AsyncGenerator, Any
+from typing import AsyncGenerator, AsyncIterable, Any
 from enum import Enum
 from openai import APIConnectionError, BadRequestError, OpenAI, AsyncOpenAI, RateLimitError
 from openai.types.chat import ChatCompletion
@@ -17,6 +20,7 @@ import src.utils as utils
 from src.telemetry.telemetry import create_span_from_thread
 from src.actions.function_manager import FunctionManager
 from src.llm.claude_cache_connector import ClaudeCacheConnector
+from src.llm.http_client_pool import get_http_client_pool
 
 logger = utils.get_logger()
 
@@ -140,30 +144,40 @@ class ClientBase(AIClient):
 
     @utils.time_it
     def generate_async_client(self) -> AsyncOpenAI:
-        """Generates a new AsyncOpenAI client already setup to be used right away.
-        Close the client after usage using 'await client.close()'
-
-        The client needs to be closed after every call (and a new one created for the next call) to avoid connection issues
+        """Generates an AsyncOpenAI client already setup to be used right away.
+        The client sends its requests through the shared connection pool of this endpoint, so do not close it after usage
 
         Use :func:`streaming_call` for a normal streaming call to the LLM
 
         Returns:
-            AsyncOpenAI: The new async client object
+            AsyncOpenAI: The async client object
         """
-        return AsyncOpenAI(api_key=self._api_key, base_url=self._base_url, default_headers=self._header)
+        http_client = get_http_client_pool().get_async_client(self._base_url)
+        return AsyncOpenAI(api_key=self._api_key, base_url=self._base_url, default_headers=self._header, http_client=http_client)
 
 
     @utils.time_it
     def generate_sync_client(self) -> OpenAI:
-        """Generates a new OpenAI client already setup to be used right away.
-        Close the client after usage using 'client.close()'
+        """Generates an OpenAI client already setup to be used right away.
+        The client sends its requests through the shared connection pool of this endpoint, so do not close it after usage
 
         Use :func:`request_call` for a normal call to the LLM
 
         Returns:
-            OpenAI: The new sync client object
+            OpenAI: The sync client object
         """
-        return OpenAI(api_key=self._api_key, base_url=self._base_url, default_headers=self._header)
+        http_client = get_http_client_pool().get_sync_client(self._base_url)
+        return OpenAI(api_key=self._api_key, base_url=self._base_url, default_headers=self._header, http_client=http_client)
+
+
+    def with_own_generation_lock(self) -> 'ClientBase':
+        """Returns a copy of this client that uses the same endpoint and model, but serializes its requests separately
+
+        Background requests made through the copy never make the responses of this client wait
+        """
+        client = copy.copy(self)
+        client._generation_lock = Lock()
+        return client
 
 
     @utils.time_it
@@ -207,8 +221,6 @@ class ClientBase(AIClient):
             except RateLimitError:
                 logger.warning('Could not connect to LLM API, retrying in 5 seconds...')
                 time.sleep(5)
-            finally:
-                sync_client.close()
 
             return chat_completion
 
@@ -241,7 +253,7 @@ class ClientBase(AIClient):
     @utils.time_it
     async def streaming_call(self, messages: Message | message_thread, is_multi_npc: bool, tools: list[dict] = None) -> AsyncGenerator[tuple[str, str | list] | None, None]:
         with create_span_from_thread("llm_streaming_call") as span:
-            with self._generation_lock:
+            async with self.__hold_generation_lock():
                 logger.log(28, 'Getting LLM response...')
 
                 if self._request_params:
@@ -273,9 +285,13 @@ class ClientBase(AIClient):
                         self._enable_vision_next_call = False  # Reset flag after use
 
                     # Handle tool calling: use dedicated function client if available, otherwise use main LLM
+                    concurrent_tool_calls: asyncio.Future | None = None
                     if tools:
-                        if self._function_client:
-                            pre_fetched_tool_calls = self._function_client.check_for_actions(messages, tools)
+                        if self._function_client and self._function_client.run_concurrently:
+                            # Ask the function client in the background and merge its tool calls into the stream as soon as they arrive
+                            concurrent_tool_calls = asyncio.ensure_future(asyncio.to_thread(self._function_client.check_for_actions, messages, tools))
+                        elif self._function_client:
+                            pre_fetched_tool_calls = await asyncio.to_thread(self._function_client.check_for_actions, messages, tools)
                             if pre_fetched_tool_calls:
                                 yield ("tool_calls", pre_fetched_tool_calls)
                         else:
@@ -289,55 +305,63 @@ class ClientBase(AIClient):
                         except Exception as e:
                             logger.debug(f"Claude caching transform failed: {e}")
 
-                    # Create async client for main LLM streaming (after function client has run if applicable)
-                    if self._startup_async_client:
-                        async_client = self._startup_async_client
-                        self._startup_async_client = None # do not reuse the same client
-                    else:
-                        async_client = self.generate_async_client()
+                    # Get async client for main LLM streaming (after function client has run if applicable)
+                    # The connection pool prepared by the startup client is adopted by this event loop on first use
+                    self._startup_async_client = None
+                    async_client = self.generate_async_client()
                     
                     # Dict to track partial tool calls by index
                     accumulated_tool_calls = {}
                     
-                    async for chunk in await async_client.chat.completions.create(
+                    response_stream = await async_client.chat.completions.create(
                         model=self.model_name, 
                         messages=openai_messages, 
                         stream=True,
                         **request_params,
-                    ):
-                        try:
-                            if chunk and chunk.choices and chunk.choices[0].delta:
-                                delta = chunk.choices[0].delta
+                    )
+                    try:
+                        async for chunk in self.__merge_concurrent_tool_calls(response_stream, concurrent_tool_calls):
+                            if isinstance(chunk, tuple): # tool calls from the concurrently running function client
+                                yield chunk
+                                continue
+                            try:
+                                if chunk and chunk.choices and chunk.choices[0].delta:
+                                    delta = chunk.choices[0].delta
                                 
-                                # Handle regular content
-                                if delta.content:
-                                    yield ("content", delta.content)
+                                    # Handle regular content
+                                    if delta.content:
+                                        yield ("content", delta.content)
                                 
-                                # Accumulate tool calls by index
-                                if delta.tool_calls:
-                                    for tool_call in delta.tool_calls:
-                                        idx = tool_call.index
-                                        if idx not in accumulated_tool_calls:
-                                            accumulated_tool_calls[idx] = {
-                                                "id": tool_call.id if tool_call.id else "",
-                                                "type": "function",
-                                                "function": {
-                                                    "name": "",
-                                                    "arguments": ""
+                                    # Accumulate tool calls by index
+                                    if delta.tool_calls:
+                                        for tool_call in delta.tool_calls:
+                                            idx = tool_call.index
+                                            if idx not in accumulated_tool_calls:
+                                                accumulated_tool_calls[idx] = {
+                                                    "id": tool_call.id if tool_call.id else "",
+                                                    "type": "function",
+                                                    "function": {
+                                                        "name": "",
+                                                        "arguments": ""
+                                                    }
                                                 }
-                                            }
                                         
-                                        # Accumulate the parts
-                                        if tool_call.id:
-                                            accumulated_tool_calls[idx]["id"] = tool_call.id
-                                        if tool_call.function and tool_call.function.name:
-                                            accumulated_tool_calls[idx]["function"]["name"] += tool_call.function.name
-                                        if tool_call.function and tool_call.function.arguments:
-                                            accumulated_tool_calls[idx]["function"]["arguments"] += tool_call.function.arguments
+                                            # Accumulate the parts
+                                            if tool_call.id:
+                                                accumulated_tool_calls[idx]["id"] = tool_call.id
+                                            if tool_call.function and tool_call.function.name:
+                                                accumulated_tool_calls[idx]["function"]["name"] += tool_call.function.name
+                                            if tool_call.function and tool_call.function.arguments:
+                                                accumulated_tool_calls[idx]["function"]["arguments"] += tool_call.function.arguments
                                 
-                        except Exception as e:
-                            logger.error(f"LLM API Connection Error: {e}")
-                            break
+                            except Exception as e:
+                                logger.error(f"LLM API Connection Error: {e}")
+                                break
+                    finally:
+                        # Release the HTTP response immediately, also when the caller stops reading or the generation is cancelled
+                        await response_stream.close()
+                        if concurrent_tool_calls and not concurrent_tool_calls.done():
+                            concurrent_tool_calls.cancel()
                     
                     # After streaming completes, yield any accumulated tool calls
                     if accumulated_tool_calls:
@@ -361,9 +385,77 @@ class ClientBase(AIClient):
                             logger.error(f"LLM API Streaming Error: {e}")
                     else:
                         logger.error(f"LLM API Streaming Error: {e}")
-                finally:
-                    if async_client:
-                        await async_client.close()
+
+
+    @asynccontextmanager
+    async def __hold_generation_lock(self) -> AsyncGenerator[None, None]:
+        """Holds the generation lock without blocking the event loop while another request owns it
+
+        The lock is acquired on a worker thread. If the waiting generation is cancelled, the lock is released again as soon as the worker gets it
+        """
+        acquiring: asyncio.Future = asyncio.ensure_future(asyncio.to_thread(self._generation_lock.acquire))
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            acquiring.add_done_callback(lambda f: self._generation_lock.release() if not f.cancelled() and f.exception() is None else None)
+            raise
+        try:
+            yield
+        finally:
+            self._generation_lock.release()
+
+
+    @staticmethod
+    async def __merge_concurrent_tool_calls(response_stream: AsyncIterable, concurrent_tool_calls: asyncio.Future | None) -> AsyncGenerator[Any, None]:
+        """Yields the chunks of the response stream and, as soon as the concurrent tool call request finishes, a ("tool_calls", list) tuple
+
+        Args:
+            response_stream (AsyncIterable): The streamed response of the main LLM
+            concurrent_tool_calls (asyncio.Future | None): The running request to the function client, if any
+        """
+        if not concurrent_tool_calls:
+            async for chunk in response_stream:
+                yield chunk
+            return
+
+        stream_iterator = response_stream.__aiter__()
+        next_chunk: asyncio.Future = asyncio.ensure_future(stream_iterator.__anext__())
+        pending_tool_calls: asyncio.Future | None = concurrent_tool_calls
+        try:
+            while True:
+                waiting_for = {next_chunk, pending_tool_calls} if pending_tool_calls else {next_chunk}
+                done, _ = await asyncio.wait(waiting_for, return_when=asyncio.FIRST_COMPLETED)
+                if pending_tool_calls in done:
+                    tool_calls = ClientBase.__get_concurrent_tool_calls_result(pending_tool_calls)
+                    pending_tool_calls = None
+                    if tool_calls:
+                        yield ("tool_calls", tool_calls)
+                if next_chunk in done:
+                    try:
+                        chunk = next_chunk.result()
+                    except StopAsyncIteration:
+                        break
+                    yield chunk
+                    next_chunk = asyncio.ensure_future(stream_iterator.__anext__())
+
+            # The text stream finished first, wait for the tool calls before ending the response
+            if pending_tool_calls:
+                await asyncio.wait({pending_tool_calls})
+                tool_calls = ClientBase.__get_concurrent_tool_calls_result(pending_tool_calls)
+                pending_tool_calls = None
+                if tool_calls:
+                    yield ("tool_calls", tool_calls)
+        finally:
+            if not next_chunk.done():
+                next_chunk.cancel()
+
+    @staticmethod
+    def __get_concurrent_tool_calls_result(concurrent_tool_calls: asyncio.Future) -> list[dict] | None:
+        try:
+            return concurrent_tool_calls.result()
+        except Exception as e:
+            logger.error(f"Tool calling LLM error: {e}. Skipping tool calling for this turn.")
+            return None
 
 
     @classmethod
@@ -529,6 +621,28 @@ For more information, see here: https://art-from-the-machine.github.io/Mantella/
         countTokens: int = self.get_count_tokens(messages)
         return countTokens > self.token_limit * token_limit_percent
 
+    def get_token_budget(self, token_limit_percent: float) -> float:
+        '''Returns how many tokens a list of messages may use before it is too long for the given percentage of the token limit
+
+        Args:
+            token_limit_percent (float): The share of the token limit the messages may use
+
+        Returns:
+            float: The number of tokens available to the messages themselves
+        '''
+        return self.token_limit * token_limit_percent - 2  # every reply is primed with <im_start>assistant
+
+    def get_message_token_count(self, message: Message) -> int:
+        '''Returns the token count of a single message as part of a request. The count is cached on the message until its content changes
+
+        Args:
+            message (Message): The message to count tokens for
+
+        Returns:
+            int: The estimated token count of this message
+        '''
+        return message.get_token_count(self._encoding.name, self.__count_message_tokens)
+
     @utils.time_it
     def __num_tokens_from_messages(self, messages: message_thread | list[Message]) -> int:
         '''Calculates token count for a list of messages formatted for OpenAI API calls
@@ -539,23 +653,30 @@ For more information, see here: https://art-from-the-machine.github.io/Mantella/
         Returns:
             num_tokens (int): The estimated total token count
         '''
-        messages_to_check = []
+        # Per message counts are cached on the messages themselves and only recounted when their content changes
         if isinstance(messages, message_thread):
-            messages_to_check = messages.get_openai_messages()
+            num_tokens = messages.get_token_count(self._encoding.name, self.__count_message_tokens)
         else:
-            for m in messages:
-                messages_to_check.append(m.get_openai_message())
+            num_tokens = sum(self.get_message_token_count(m) for m in messages)
+        num_tokens += 2  # every reply is primed with <im_start>assistant
+        return num_tokens
 
+    def __count_message_tokens(self, message: Message) -> int:
+        '''Counts the tokens of a single message as it is sent to the OpenAI API
+
+        Args:
+            message (Message): The message to count tokens for
+
+        Returns:
+            num_tokens (int): The estimated token count of this message
+        '''
         # note: this calculation is based on GPT-3.5, future models may deviate from this
-        num_tokens = 0
-        for message in messages_to_check:
-            num_tokens += 4  # every message follows <im_start>{role/name}\n{content}<im_end>\n
-            for key, value in message.items():
-                if isinstance(value, str):
-                    num_tokens += len(self._encoding.encode(value))
-                    if key == "name":  # if there's a name, the role is omitted
-                        num_tokens += -1  # role is always required and always 1 token
-        num_tokens += 2  # every reply is primed with <im_start>assistant
+        num_tokens = 4  # every message follows <im_start>{role/name}\n{content}<im_end>\n
+        for key, value in message.get_openai_message().items():
+            if isinstance(value, str):
+                num_tokens += len(self._encoding.encode(value))
+                if key == "name":  # if there's a name, the role is omitted
+                    num_tokens += -1  # role is always required and always 1 token
         return num_tokens
     
     @utils.time_it
@@ -18,6 +18,7 @@ class FunctionClient(ClientBase):
     def __init__(self, config: ConfigLoader) -> None:
         self.__config = config
         self.__function_prompt: str = config.function_llm_prompt.format(game=config.game.display_name)
+        self.__run_concurrently: bool = config.concurrent_function_llm_call
         
         # Use custom function model config values
         profile_manager = get_profile_manager()
@@ -43,6 +44,13 @@ class FunctionClient(ClientBase):
             logger.log(23, f"Running Mantella with custom tool calling model '{config.function_llm}'")
 
 
+    @property
+    def run_concurrently(self) -> bool:
+        """Should the tool calling request run at the same time as the main LLM request?
+        """
+        return self.__run_concurrently
+
+
     @utils.time_it
     def request_call_with_tools(self, messages: Message | message_thread, tools: list[dict] | None = None) -> list[ChatCompletionMessageToolCall] | None:
         """Make a request with tools and return tool calls
@@ -0,0 +1,148 @@
+import asyncio
+import importlib.util
+from threading import Lock
+import httpx
+import src.utils as utils
+
+logger = utils.get_logger()
+
+
+class HttpClientPool:
+    '''Keeps one pooled httpx client per LLM endpoint so connections (and their TCP / TLS handshakes) are reused between requests
+
+    Sync clients are shared across threads. Async clients are bound to the event loop they are used on,
+    so one is kept per endpoint and event loop.
+    '''
+    def __init__(self, max_connections: int = 10, keepalive_expiry: float = 30.0, http2: bool = False) -> None:
+        self.__lock: Lock = Lock()
+        self.__max_connections: int = max_connections
+        self.__keepalive_expiry: float = keepalive_expiry
+        self.__http2: bool = http2
+        self.__sync_clients: dict[str, httpx.Client] = {}
+        self.__async_clients: dict[tuple[str, asyncio.AbstractEventLoop | None], httpx.AsyncClient] = {}
+
+    @property
+    def max_connections(self) -> int:
+        return self.__max_connections
+
+    @property
+    def keepalive_expiry(self) -> float:
+        return self.__keepalive_expiry
+
+    @property
+    def http2(self) -> bool:
+        return self.__http2
+
+    @utils.time_it
+    def configure(self, max_connections: int, keepalive_expiry: float, http2: bool):
+        '''Updates the pool settings. Clients created with different settings are closed and recreated on next use
+
+        Args:
+            max_connections (int): Maximum number of open connections per endpoint
+            keepalive_expiry (float): Seconds an idle connection is kept open for reuse
+            http2 (bool): Whether to negotiate HTTP/2 (requires the 'h2' package)
+        '''
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 for LLM connections requires the 'h2' package (pip install httpx[http2]). Falling back to HTTP/1.1")
+            http2 = False
+
+        with self.__lock:
+            if (max_connections, keepalive_expiry, http2) == (self.__max_connections, self.__keepalive_expiry, self.__http2):
+                return
+            self.__max_connections = max_connections
+            self.__keepalive_expiry = keepalive_expiry
+            self.__http2 = http2
+            sync_clients = list(self.__sync_clients.values())
+            async_clients = list(self.__async_clients.items())
+            self.__sync_clients.clear()
+            self.__async_clients.clear()
+
+        for sync_client in sync_clients:
+            sync_client.close()
+        for (_, loop), async_client in async_clients:
+            self.__close_async_client(async_client, loop)
+
+    def __get_limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.__max_connections, max_keepalive_connections=self.__max_connections, keepalive_expiry=self.__keepalive_expiry)
+
+    @utils.time_it
+    def get_sync_client(self, base_url: str) -> httpx.Client:
+        '''Returns the shared sync client for the given endpoint. Do not close the returned client
+
+        Args:
+            base_url (str): The endpoint URL
+        '''
+        with self.__lock:
+            client = self.__sync_clients.get(base_url)
+            if client is None or client.is_closed:
+                client = httpx.Client(limits=self.__get_limits(), http2=self.__http2, timeout=None)
+                self.__sync_clients[base_url] = client
+            return client
+
+    @utils.time_it
+    def get_async_client(self, base_url: str) -> httpx.AsyncClient:
+        '''Returns the shared async client for the given endpoint and the currently running event loop. Do not close the returned client
+
+        A client requested outside of a running event loop (eg to prepare a connection at startup) is
+        adopted by the first event loop that asks for a client for the same endpoint.
+
+        Args:
+            base_url (str): The endpoint URL
+        '''
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        with self.__lock:
+            client = self.__async_clients.get((base_url, loop))
+            if (client is None or client.is_closed) and loop is not None:
+                unbound_client = self.__async_clients.pop((base_url, None), None)
+                if unbound_client is not None and not unbound_client.is_closed:
+                    client = unbound_client
+                    self.__async_clients[(base_url, loop)] = client
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(limits=self.__get_limits(), http2=self.__http2, timeout=None)
+                self.__async_clients[(base_url, loop)] = client
+            return client
+
+    async def aclose_loop_clients(self):
+        '''Closes all async clients bound to the running event loop. Call this before stopping the loop
+        '''
+        loop = asyncio.get_running_loop()
+        with self.__lock:
+            keys = [key for key in self.__async_clients if key[1] is loop]
+            clients = [self.__async_clients.pop(key) for key in keys]
+        for client in clients:
+            await client.aclose()
+
+    @utils.time_it
+    def close(self):
+        '''Closes all sync clients and any async clients whose event loop is still running
+        '''
+        with self.__lock:
+            sync_clients = list(self.__sync_clients.values())
+            async_clients = list(self.__async_clients.items())
+            self.__sync_clients.clear()
+            self.__async_clients.clear()
+        for sync_client in sync_clients:
+            sync_client.close()
+        for (_, loop), async_client in async_clients:
+            self.__close_async_client(async_client, loop)
+
+    @staticmethod
+    def __close_async_client(client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop | None):
+        if loop is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        # Clients that were never used by a running loop hold no open connections and can simply be dropped
+
+
+_instance: HttpClientPool | None = None
+
+
+def get_http_client_pool() -> HttpClientPool:
+    """Return the shared :class:`HttpClientPool` singleton."""
+    global _instance
+    if _instance is None:
+        _instance = HttpClientPool()
+    return _instance
@@ -29,7 +29,7 @@ class LLMClient(ClientBase):
         else:
             logger.log(23, f"Running Mantella with '{config.llm}'. The language model can be changed in the Mantella UI: http://localhost:4999/ui")
 
-        self._startup_async_client: AsyncOpenAI | None = self.generate_async_client() # initialize first client in advance of sending first LLM request to save time
+        self._startup_async_client: AsyncOpenAI | None = self.generate_async_client() # initialize first client in advance of sending first LLM request to save time (its connection pool is adopted by the generation loop)
 
         if config.vision_enabled:
             logger.info(f"Setting up vision language model...")
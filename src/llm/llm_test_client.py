@@ -54,6 +54,16 @@ class LLMTestClient(AIClient):
         """
         return False
 
+    def get_token_budget(self, token_limit_percent: float) -> float:
+        """Returns how many tokens a list of messages may use before it is too long for token_limit_percent of the context size of the model
+        """
+        return float("inf")
+
+    def get_message_token_count(self, message: Message) -> int:
+        """Returns the number of tokens used by a single message as part of a request
+        """
+        return 0
+
     @staticmethod
     def get_model_list(service: str, default_model: str = "mistralai/mistral-small-3.1-24b-instruct:free", is_vision: bool = False, is_tool_calling: bool = False) -> LLMModelList:
         """Returns a list of available LLM models
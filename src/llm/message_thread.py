@@ -12,11 +12,13 @@ class message_thread():
     def __init__(self, config: ConfigLoader, initial_system_message: str | SystemMessage | None) -> None:
         self.__messages: list[Message] = []
         self.__config = config
+        self.__token_totals: dict[str, int] = {}
         if not initial_system_message:
             return
         if isinstance(initial_system_message, str):
             initial_system_message = SystemMessage(initial_system_message, config)
         self.__messages.append(initial_system_message)
+        initial_system_message._add_to_thread(self)
     
     def __len__(self) -> int:
         return self.__messages.__len__()
@@ -58,8 +60,50 @@ class message_thread():
     def get_openai_messages(self) -> list[ChatCompletionMessageParam]:
         return message_thread.transform_to_openai_messages(self.__messages)
 
+    def __on_messages_changed(self):
+        """Drops the running token totals. Call this whenever messages are added to, removed from or replaced in this thread
+        """
+        self.__token_totals.clear()
+
+    def _on_message_content_changed(self):
+        """Called by messages that have been added to this thread when their content changes.
+        Messages that have since been removed from the thread may still call it, which only costs counting the tokens again
+        """
+        self.__token_totals.clear()
+
+    @utils.time_it
+    def get_token_count(self, encoding_name: str, count_message_tokens: Callable[[Message], int]) -> int:
+        """Returns the summed token count of all messages in this thread. 
+        Uses the cached count of each message, so only messages whose content changed since the last call are counted again
+
+        Args:
+            encoding_name (str): The name of the encoding the tokens are counted for
+            count_message_tokens (Callable[[Message], int]): Counts the tokens of a single message for this encoding
+
+        Returns:
+            int: The sum of the token counts of all messages
+        """
+        total = self.__token_totals.get(encoding_name)
+        if total is None:
+            total = sum(m.get_token_count(encoding_name, count_message_tokens) for m in self.__messages)
+            self.__token_totals[encoding_name] = total
+        return total
+
     def add_message(self, new_message: UserMessage | AssistantMessage | ImageMessage | ImageDescriptionMessage | ToolMessage):
         self.__messages.append(new_message)
+        new_message._add_to_thread(self)
+        self.__on_messages_changed()
+
+    @utils.time_it
+    def truncate(self, length: int):
+        """Removes all messages after the first `length` messages, eg to take back messages added for a response that was thrown away
+
+        Args:
+            length (int): the number of messages to keep
+        """
+        if length < len(self.__messages):
+            del self.__messages[length:]
+            self.__on_messages_changed()
 
     @utils.time_it
     def add_non_system_messages(self, new_messages: list[Message]):
@@ -71,27 +115,88 @@ class message_thread():
         for new_message in new_messages:
             if not isinstance(Message, SystemMessage):
                 self.__messages.append(new_message)
+                new_message._add_to_thread(self)
+        self.__on_messages_changed()
     
     @utils.time_it
-    def reload_message_thread(self, new_prompt: str, is_too_long: Callable[[list[Message], float], bool], percent_modifier: float):
-        """Reloads this message_thread with a new system_message prompt and drops all but the last X messages
+    def reload_message_thread(self, new_prompt: str, count_message_tokens: Callable[[Message], int], token_budget: float):
+        """Reloads this message_thread with a new system_message prompt and drops all but the latest messages that fit into the token budget.
+        Walks the messages from newest to oldest and counts each message only once, so a reload is a single pass over the thread
 
         Args:
             new_prompt (str): the new prompt for the system_message
-            last_messages_to_keep (int): how many of the last messages to keep
+            count_message_tokens (Callable[[Message], int]): returns the token count of a single message
+            token_budget (float): how many tokens the kept messages may use in total
         """
         result: list[Message] = []
         result.append(SystemMessage(new_prompt, self.__config))
         messages_to_keep: list[Message]  = []
-        for talk_message in reversed(self.get_talk_only()):
-            messages_to_keep.append(talk_message)
-            if is_too_long(messages_to_keep, percent_modifier):
-                messages_to_keep = messages_to_keep[:-1]
+        used_tokens = 0
+        for talk_message in reversed(self.__messages):
+            if not message_thread.__is_talk_message(talk_message):
+                continue
+            used_tokens += count_message_tokens(talk_message)
+            if used_tokens > token_budget:
                 break
+            messages_to_keep.append(deepcopy(talk_message))
             
         messages_to_keep.reverse()
         result.extend(messages_to_keep)
+        for message in result:
+            message._add_to_thread(self)
+        self.__messages = result
+        self.__on_messages_changed()
+
+    @utils.time_it
+    def get_messages_to_compact(self, count_message_tokens: Callable[[Message], int], token_budget_to_keep: float, min_messages_to_keep: int = 2) -> list[Message]:
+        """Returns the oldest talk messages that do not fit into the token budget together with the newer ones.
+        Returns the messages themselves rather than copies so they can be passed to replace_messages later on
+
+        Args:
+            count_message_tokens (Callable[[Message], int]): returns the token count of a single message
+            token_budget_to_keep (float): how many tokens the newest messages may use and stay untouched
+            min_messages_to_keep (int): how many of the newest talk messages are never returned, regardless of their size
+
+        Returns:
+            list[Message]: the oldest talk messages, in order. Never ends between an assistant message with tool calls and its tool results. Empty if everything fits into the budget
+        """
+        talk_messages = [m for m in self.__messages if message_thread.__is_talk_message(m, include_system_generated_messages=True)]
+        used_tokens = 0
+        for index in range(len(talk_messages) - 1, -1, -1):
+            used_tokens += count_message_tokens(talk_messages[index])
+            if used_tokens > token_budget_to_keep:
+                cut = min(index + 1, max(0, len(talk_messages) - min_messages_to_keep))
+                # Tool results must directly follow the assistant message that called the tools, so the pair is never split up
+                while 0 < cut < len(talk_messages) and isinstance(talk_messages[cut], ToolMessage):
+                    cut -= 1
+                return talk_messages[:cut]
+        return []
+
+    @utils.time_it
+    def replace_messages(self, old_messages: list[Message], new_message: Message) -> list[int] | None:
+        """Replaces a selection of messages with a single message placed where the first of them used to be
+
+        Args:
+            old_messages (list[Message]): the messages to replace
+            new_message (Message): the message to put in their place
+
+        Returns:
+            list[int] | None: the former indices of the replaced messages. None if the thread has not been changed because any of the messages is no longer part of it
+        """
+        ids_to_replace = {id(m) for m in old_messages}
+        replaced_indices = [i for i, m in enumerate(self.__messages) if id(m) in ids_to_replace]
+        if len(replaced_indices) == 0 or len(replaced_indices) != len(ids_to_replace):
+            return None
+        result: list[Message] = []
+        for i, m in enumerate(self.__messages):
+            if i == replaced_indices[0]:
+                result.append(new_message)
+            if id(m) not in ids_to_replace:
+                result.append(m)
         self.__messages = result
+        new_message._add_to_thread(self)
+        self.__on_messages_changed()
+        return replaced_indices
 
     @utils.time_it
     def get_talk_only(self, include_system_generated_messages: bool = False) -> list[Message]:
@@ -105,12 +210,15 @@ class message_thread():
         """
         result = []
         for message in self.__messages:
-            if isinstance(message, (AssistantMessage, UserMessage, ToolMessage)):
-                if include_system_generated_messages:
-                    result.append(deepcopy(message)) # TODO: Once assistant_message uses Character instead of str, this needs to be improved, don't want deepcopies of Character
-                elif isinstance(message, ToolMessage) or not message.is_system_generated_message:
-                    result.append(deepcopy(message))
+            if message_thread.__is_talk_message(message, include_system_generated_messages):
+                result.append(deepcopy(message)) # TODO: Once assistant_message uses Character instead of str, this needs to be improved, don't want deepcopies of Character
         return result
+
+    @staticmethod
+    def __is_talk_message(message: Message, include_system_generated_messages: bool = False) -> bool:
+        if not isinstance(message, (AssistantMessage, UserMessage, ToolMessage)):
+            return False
+        return include_system_generated_messages or isinstance(message, ToolMessage) or not message.is_system_generated_message
     
     @utils.time_it
     def get_last_message(self) -> Message:
@@ -145,6 +253,7 @@ class message_thread():
                 m.is_multi_npc_message = multi_npc_conversation
             for m in messages_to_remove:
                 self.__messages.remove(m)
+            self.__on_messages_changed()
     
     def has_message_type(self, message_type: type) -> bool:
         """Checks if there is any message of the specified type in the messages.
@@ -169,6 +278,8 @@ class message_thread():
                 self.__messages[idx] = new_message
                 # Move the new message to the end of the list
                 self.__messages.append(self.__messages.pop(idx))
+                new_message._add_to_thread(self)
+                self.__on_messages_changed()
                 break
             
     def delete_all_message_type(self, message_type: type):
@@ -178,6 +289,7 @@ class message_thread():
             message_type (type): The type of messages to delete.
         """
         self.__messages = [msg for msg in self.__messages if not isinstance(msg, message_type)]
+        self.__on_messages_changed()
 
     def replace_or_add_message(self, message_instance, message_type: type):
         if self.has_message_type(message_type):
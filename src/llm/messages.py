@@ -1,4 +1,6 @@
 from abc import ABC, abstractmethod
+from typing import Callable, TYPE_CHECKING
+from weakref import WeakSet
 from openai.types.chat import ChatCompletionMessageParam
 from src.config.definitions.llm_definitions import NarrationIndicatorsEnum
 from src.config.config_loader import ConfigLoader
@@ -8,10 +10,15 @@ from src.character_manager import Character
 from src.llm.sentence import Sentence
 from src import utils
 
+if TYPE_CHECKING:
+    from src.llm.message_thread import message_thread
+
 class Message(ABC):
     """Base class for messages 
     """
     def __init__(self, text: str, config: ConfigLoader | None = None, is_system_generated_message: bool = False):
+        self.__token_counts: dict[str, int] = {}
+        self.__threads: WeakSet["message_thread"] = WeakSet() # the message threads that have been given this message
         self.__text: str = text
         self.__is_multi_npc_message: bool = False
         self.__is_system_generated_message = is_system_generated_message
@@ -37,6 +44,7 @@ class Message(ABC):
     @text.setter
     def text(self, text: str):
         self.__text = text
+        self._on_content_changed()
 
     @property
     def narration_start(self) -> str:
@@ -52,7 +60,9 @@ class Message(ABC):
     
     @is_multi_npc_message.setter
     def is_multi_npc_message(self, is_multi_npc_message: bool):
-        self.__is_multi_npc_message = is_multi_npc_message
+        if self.__is_multi_npc_message != is_multi_npc_message: # the formatting of some messages depends on this
+            self.__is_multi_npc_message = is_multi_npc_message
+            self._on_content_changed()
 
     @property
     def is_system_generated_message(self) -> bool:
@@ -62,6 +72,43 @@ class Message(ABC):
     def is_system_generated_message(self, is_system_generated_message: bool):
         self.__is_system_generated_message = is_system_generated_message
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_Message__threads'] # copies are not part of any thread until they are added to one
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__threads = WeakSet()
+
+    def _add_to_thread(self, thread: "message_thread"):
+        """Lets a message thread know when the content of this message changes, so it can drop the token totals that include it
+        """
+        self.__threads.add(thread)
+
+    def _on_content_changed(self):
+        """Drops the cached token counts of this message and of the threads it has been added to. Call this whenever something changes that affects the content sent to the LLM
+        """
+        self.__token_counts.clear()
+        for thread in list(self.__threads):
+            thread._on_message_content_changed()
+
+    def get_token_count(self, encoding_name: str, count_tokens: Callable[["Message"], int]) -> int:
+        """Returns the number of tokens of this message, only counting them again if the message has changed since the last count
+
+        Args:
+            encoding_name (str): The name of the encoding the tokens are counted for
+            count_tokens (Callable[[Message], int]): Counts the tokens of a message for this encoding
+
+        Returns:
+            int: The number of tokens of this message
+        """
+        token_count = self.__token_counts.get(encoding_name)
+        if token_count is None:
+            token_count = count_tokens(self)
+            self.__token_counts[encoding_name] = token_count
+        return token_count
+
     @abstractmethod
     def get_openai_message(self) -> ChatCompletionMessageParam:
         """Returns the message in form of an appropriately formatted openai.types.chat.ChatCompletionMessageParam
@@ -111,6 +158,7 @@ class AssistantMessage(Message):
     
     def add_sentence(self, new_sentence: Sentence):
         self.__sentences.append(new_sentence.content)
+        self._on_content_changed()
     
     @property
     def tool_calls(self) -> list[dict] | None:
@@ -121,6 +169,7 @@ class AssistantMessage(Message):
     def tool_calls(self, value: list[dict] | None):
         """Set the tool calls for this assistant message"""
         self.__tool_calls = value
+        self._on_content_changed()
 
     def get_formatted_content(self) -> str:
         if len(self.__sentences) < 1:
@@ -195,6 +244,7 @@ class UserMessage(Message):
         for event in events:
             if len(event) > 0:
                 self.__ingame_events.append(event)
+        self._on_content_changed()
     
     def count_ingame_events(self) -> int:
         return len(self.__ingame_events)
@@ -207,12 +257,24 @@ class UserMessage(Message):
     
     def set_ingame_time(self, time: str, time_group: str):
         self.__time = time, time_group
+        self._on_content_changed()
 
     def append_text(self, text_to_append: str):
         """Appends a string to the system message text."""
         self.text += text_to_append
 
 
+class CompactionMessage(UserMessage):
+    """A synthetic user message that stands in for the oldest messages of a long conversation after they have been summarized.
+    Unlike a regular user message it is never prefixed with the player's name or in-game events
+    """
+    def __init__(self, config: ConfigLoader, summary: str):
+        super().__init__(config, summary)
+
+    def get_formatted_content(self) -> str:
+        return utils.remove_extra_whitespace(f"{self.narration_start}Summary of the conversation so far: {self.text.strip()}{self.narration_end}")
+
+
 class ImageMessage(Message):
     """A image message sent to the LLM. Contains the a base64 encode image and accompanying description text.
     """
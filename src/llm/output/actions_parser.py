@@ -28,3 +28,6 @@ class actions_parser(output_parser):
     
     def get_cut_indicators(self) -> list[str]:
         return [":"]
+
+    def get_cut_triggers(self) -> str | None:
+        return ""
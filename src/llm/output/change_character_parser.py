@@ -59,3 +59,6 @@ class change_character_parser(output_parser):
     
     def get_cut_indicators(self) -> list[str]:
         return [":"]
+
+    def get_cut_triggers(self) -> str | None:
+        return ":"
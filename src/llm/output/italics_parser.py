@@ -20,6 +20,9 @@ class italics_parser(output_parser):
     def get_cut_indicators(self) -> list[str]:
         return []
 
+    def get_cut_triggers(self) -> str | None:
+        return "*"
+
     def cut_sentence(self, output: str, current_settings: sentence_generation_settings) -> tuple[SentenceContent | None, str]:
         modified_output = self.__strip_inline_italics(output)
         return None, modified_output
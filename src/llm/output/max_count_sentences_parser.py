@@ -11,6 +11,9 @@ class max_count_sentences_parser(output_parser):
     def cut_sentence(self, output: str, current_settings: sentence_generation_settings) -> tuple[SentenceContent|None, str|None]:
         return None, output
 
+    def get_cut_triggers(self) -> str | None:
+        return ""
+
     def modify_sentence_content(self, cut_content: SentenceContent, last_content: SentenceContent | None, settings: sentence_generation_settings) -> tuple[SentenceContent | None, SentenceContent | None]:
         self.__sentence_counter = self.__sentence_counter + 1
         if self.__sentence_counter >= self.__max_sentences and not self.__is_radiant:
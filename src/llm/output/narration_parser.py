@@ -28,12 +28,15 @@ class narration_parser(output_parser):
         else:
             self.__start_speech_reg = never_match_anything_regex
             self.__end_speech_reg = never_match_anything_regex
+        self.__indicator_chars: frozenset[str] = frozenset(''.join(self.get_cut_indicators()))
     
     def get_cut_indicators(self) -> list[str]:
         return self.__narration_start_chars + self.__narration_end_chars + self.__speech_start_chars + self.__speech_end_chars
 
     def cut_sentence(self, output: str, current_settings: sentence_generation_settings) -> tuple[SentenceContent | None, str]:
         output = output.lstrip()
+        if self.__indicator_chars.isdisjoint(output): #No indicator anywhere in the text, none of the regexes below can match
+            return None, output
         while True: #loop will only be run a maximum of two times
             if current_settings.current_text_state == MarkedTextStateEnum.UNMARKED: #If we are currently in unmarked text, which is the default
                 match = self.__start_narration_reg.match(output) #First, try to locate a start of a narration. The default assumption is that unmarked text is speech
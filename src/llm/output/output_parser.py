@@ -91,3 +91,9 @@ class output_parser(ABC):
     
     def get_cut_indicators(self) -> list[str]:
         return []
+
+    def get_cut_triggers(self) -> str | None:
+        """Returns the characters that must be part of a text for cut_sentence to change it.
+        None if cut_sentence needs to run on every text, an empty string if cut_sentence never changes the text
+        """
+        return None
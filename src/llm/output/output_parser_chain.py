@@ -0,0 +1,62 @@
+from src.llm.output.output_parser import output_parser, sentence_generation_settings
+from src.llm.sentence_content import SentenceContent
+
+
+class output_parser_chain(output_parser):
+    """Runs a list of output_parsers as a single parser.
+
+    The chain is compiled once per response: the cut indicators and cut triggers of all parsers are merged up front.
+    Each text passed to cut_sentence is scanned once for all triggers, and parsers whose cut_sentence cannot act on the text are skipped.
+    A sentence returned by cut_sentence already has the modifications of all parsers applied.
+    Sentences held back by a parser (eg short sentences waiting to be merged) are kept by the chain, see pending_sentence.
+    """
+    def __init__(self, parsers: list[output_parser]) -> None:
+        super().__init__()
+        self.__parsers: list[output_parser] = parsers
+        self.__pending_sentence: SentenceContent | None = None
+
+        cut_indicators: list[str] = []
+        all_triggers: set[str] = set()
+        self.__cut_triggers: list[set[str] | None] = []
+        for parser in parsers:
+            for indicator in parser.get_cut_indicators():
+                if indicator not in cut_indicators:
+                    cut_indicators.append(indicator)
+            triggers = parser.get_cut_triggers()
+            if triggers is None:
+                self.__cut_triggers.append(None)
+            else:
+                self.__cut_triggers.append(set(triggers))
+                all_triggers.update(triggers)
+        self.__cut_indicators: list[str] = cut_indicators
+        self.__all_triggers: frozenset[str] = frozenset(all_triggers)
+
+    @property
+    def pending_sentence(self) -> SentenceContent | None:
+        return self.__pending_sentence
+
+    def take_pending_sentence(self) -> SentenceContent | None:
+        """Returns the sentence currently held back by the parsers and removes it from the chain"""
+        pending_sentence = self.__pending_sentence
+        self.__pending_sentence = None
+        return pending_sentence
+
+    def get_cut_indicators(self) -> list[str]:
+        return self.__cut_indicators
+
+    def cut_sentence(self, output: str, current_settings: sentence_generation_settings) -> tuple[SentenceContent | None, str]:
+        # Text only ever loses characters on its way through the chain, so a single scan up front is enough to know which parsers can act
+        present_triggers = self.__all_triggers.intersection(output)
+        parsed_sentence: SentenceContent | None = None
+        for parser, triggers in zip(self.__parsers, self.__cut_triggers):
+            if not parsed_sentence and (triggers is None or not triggers.isdisjoint(present_triggers)):  # Try to extract a complete sentence
+                parsed_sentence, output = parser.cut_sentence(output, current_settings)
+            if parsed_sentence:  # Apply modifications if we already have a sentence
+                parsed_sentence, self.__pending_sentence = parser.modify_sentence_content(parsed_sentence, self.__pending_sentence, current_settings)
+            if current_settings.stop_generation:
+                break
+        return parsed_sentence, output
+
+    def modify_sentence_content(self, cut_content: SentenceContent, last_content: SentenceContent | None, settings: sentence_generation_settings) -> tuple[SentenceContent | None, SentenceContent | None]:
+        # Modifications of all parsers are already applied in cut_sentence
+        return cut_content, last_content
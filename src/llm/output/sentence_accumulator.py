@@ -5,44 +5,122 @@ from src.llm.output.clean_sentence_parser import clean_sentence_parser
 
 class sentence_accumulator:
     """Accumulates the token-wise output of an LLM into raw sentences.
+
+    A sentence ends at the first sentence-ending punctuation after at least one word character,
+    together with any punctuation directly following it. A period only counts if it is standalone (not part of an ellipsis).
+
+    Incoming text is kept as a list of chunks and scanned incrementally: the scan position is remembered between calls,
+    so every character is only examined once, no matter how long the output grows before a sentence ends.
     """
+    __WORD_CHAR = re.compile(r"\w")
+
     def __init__(self, cut_indicators: list[str]) -> None:
         self.__cut_indicators = cut_indicators
-        self.__cleaned_llm_output: str = ""
-        # Match at least one word character, then the first sentence-ending punctuation.
-        # A standalone period (not part of an ellipsis) or any other end-of-sentence char.
         other_chars = [c for c in cut_indicators if c != '.']
         other_chars_escaped = ''.join([re.escape(c) for c in other_chars])
-        self.__sentence_end_reg = re.compile(rf"^.*?\w.*?(?:(?<!\.)\.(?!\.)|[{other_chars_escaped}])+")
+        self.__sentence_end_chars: set[str] = set(''.join(other_chars))
+        self.__sentence_end_reg = re.compile(rf"[.{other_chars_escaped}]")
+        self.__chunks: list[str] = []
+        # Scan state, only ever moves forward until a sentence is cut
+        self.__scan_chunk: int = 0
+        self.__scan_offset: int = 0
+        self.__has_word: bool = False
         self.__unparseable: str = ""
         self.__prepared_match: str = ""
         self.__cleaner = clean_sentence_parser()
-    
+
     def has_next_sentence(self) -> bool:
         if len(self.__prepared_match) > 0:
             return True
-        
-        match = self.__sentence_end_reg.match(self.__cleaned_llm_output)
-        if not match:
+
+        end = self.__scan_for_sentence_end()
+        if not end:
             return False
         else:
-            self.__prepared_match = match.group()
-            self.__cleaned_llm_output = self.__cleaned_llm_output.removeprefix(self.__prepared_match)
+            self.__prepared_match = self.__cut(*end)
             return True
-    
+
     def get_next_sentence(self) -> str:
         result = self.__unparseable + self.__prepared_match
         self.__unparseable = ""
         self.__prepared_match = ""
         return result
-    
+
     def accumulate(self, llm_output: str):
         llm_output = self.__cleaner.clean_sentence(llm_output)
-        self.__cleaned_llm_output += llm_output
-    
+        if len(llm_output) > 0:
+            self.__chunks.append(llm_output)
+
     def refuse(self, refused_text: str):
         self.__unparseable = refused_text
-    
 
+    def __char_before(self, chunk_index: int, offset: int) -> str:
+        if offset > 0:
+            return self.__chunks[chunk_index][offset - 1]
+        if chunk_index > 0:
+            return self.__chunks[chunk_index - 1][-1]
+        return ""
+
+    def __char_after(self, chunk_index: int, offset: int) -> str:
+        chunk = self.__chunks[chunk_index]
+        if offset + 1 < len(chunk):
+            return chunk[offset + 1]
+        if chunk_index + 1 < len(self.__chunks):
+            return self.__chunks[chunk_index + 1][0]
+        return "" # Nothing more has arrived yet, so a trailing period counts as the end of a sentence
+
+    def __is_sentence_end(self, chunk_index: int, offset: int) -> bool:
+        char = self.__chunks[chunk_index][offset]
+        if char == '.':
+            return self.__char_before(chunk_index, offset) != '.' and self.__char_after(chunk_index, offset) != '.'
+        return char in self.__sentence_end_chars
+
+    def __scan_for_sentence_end(self) -> tuple[int, int] | None:
+        """Continues scanning the not yet examined text for the end of a sentence
+
+        Returns:
+            tuple[int, int] | None: chunk index and offset directly behind the end of the sentence, None if there is no complete sentence yet
+        """
+        while self.__scan_chunk < len(self.__chunks):
+            chunk = self.__chunks[self.__scan_chunk]
+            if not self.__has_word:
+                word_match = self.__WORD_CHAR.search(chunk, self.__scan_offset)
+                if not word_match:
+                    self.__scan_chunk += 1
+                    self.__scan_offset = 0
+                    continue
+                self.__has_word = True
+                self.__scan_offset = word_match.end()
+
+            end_match = self.__sentence_end_reg.search(chunk, self.__scan_offset)
+            while end_match and not self.__is_sentence_end(self.__scan_chunk, end_match.start()):
+                end_match = self.__sentence_end_reg.search(chunk, end_match.start() + 1)
+            if not end_match:
+                self.__scan_chunk += 1
+                self.__scan_offset = 0
+                continue
+            return self.__consume_following_sentence_ends(self.__scan_chunk, end_match.end())
+        return None
+
+    def __consume_following_sentence_ends(self, chunk_index: int, offset: int) -> tuple[int, int]:
+        """Extends the end of a sentence over any directly following sentence-ending punctuation (eg '?!')"""
+        while True:
+            if offset >= len(self.__chunks[chunk_index]):
+                if chunk_index + 1 >= len(self.__chunks):
+                    return chunk_index, offset
+                chunk_index += 1
+                offset = 0
+            if not self.__is_sentence_end(chunk_index, offset):
+                return chunk_index, offset
+            offset += 1
 
-    
+    def __cut(self, chunk_index: int, offset: int) -> str:
+        """Removes everything up to chunk_index/offset from the accumulated text and returns it. Resets the scan"""
+        last_chunk = self.__chunks[chunk_index]
+        sentence = ''.join(self.__chunks[:chunk_index]) + last_chunk[:offset]
+        remainder = [last_chunk[offset:]] if offset < len(last_chunk) else []
+        self.__chunks = remainder + self.__chunks[chunk_index + 1:]
+        self.__scan_chunk = 0
+        self.__scan_offset = 0
+        self.__has_word = False
+        return sentence
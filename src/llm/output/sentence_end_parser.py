@@ -28,3 +28,6 @@ class sentence_end_parser(output_parser):
     
     def get_cut_indicators(self) -> list[str]:
         return self.__end_of_sentence_chars
+
+    def get_cut_triggers(self) -> str | None:
+        return ''.join(self.__end_of_sentence_chars)
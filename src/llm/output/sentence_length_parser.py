@@ -9,6 +9,9 @@ class sentence_length_parser(output_parser):
     def cut_sentence(self, output: str, current_settings: sentence_generation_settings) -> tuple[SentenceContent|None, str|None]:
         return None, output
 
+    def get_cut_triggers(self) -> str | None:
+        return ""
+
     def __count_words(self, text: str) -> int:
         return len(text.split())
 
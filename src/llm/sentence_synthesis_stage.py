@@ -0,0 +1,107 @@
+import queue
+import threading
+from typing import Callable, Iterable
+from src.llm.sentence import Sentence
+from src.llm.sentence_content import SentenceContent
+from src.llm.sentence_queue import SentenceQueue
+from src import utils
+
+logger = utils.get_logger()
+
+
+class SentenceSynthesisStage:
+    """Pipeline stage that voices parsed sentences on a worker thread
+
+    The LLM stream keeps being drained while the worker synthesizes. Items are processed strictly in the order
+    they were submitted, so sentences (and pre-built sentences such as action-only ones) arrive in the
+    output SentenceQueue in the same order the parser chain produced them.
+    """
+    __STOP = object()
+
+    def __init__(self, generate_sentences: Callable[[SentenceContent], Iterable[Sentence]], output_queue: SentenceQueue, max_pending: int = 4) -> None:
+        """
+        Args:
+            generate_sentences (Callable[[SentenceContent], Iterable[Sentence]]): Function that voices a SentenceContent. Long texts can be voiced as several sentences, which are passed on one by one as soon as they are ready
+            output_queue (SentenceQueue): Queue finished sentences are put into
+            max_pending (int, optional): Maximum number of sentences waiting for synthesis before submitting blocks. Defaults to 4.
+        """
+        self.__generate_sentences = generate_sentences
+        self.__output_queue: SentenceQueue = output_queue
+        self.__pending: queue.Queue[SentenceContent | Sentence | object] = queue.Queue(maxsize=max(1, max_pending))
+        self.__worker: threading.Thread | None = None
+
+    @property
+    def is_running(self) -> bool:
+        return self.__worker is not None and self.__worker.is_alive()
+
+    def start(self):
+        if self.is_running:
+            return
+        self.__worker = threading.Thread(target=self.__run, name="SentenceSynthesisStage", daemon=True)
+        self.__worker.start()
+
+    def submit(self, content: SentenceContent):
+        """Queues a sentence for synthesis. Blocks while the stage is full"""
+        self.__pending.put(content)
+
+    def submit_sentence(self, sentence: Sentence):
+        """Queues an already finished sentence (eg an action-only sentence) so it keeps its place in the order"""
+        self.__pending.put(sentence)
+
+    def discard_pending(self) -> int:
+        """Drops all sentences that have not been picked up by the worker yet
+
+        Returns:
+            int: the number of sentences dropped
+        """
+        discarded = 0
+        try:
+            while True:
+                item = self.__pending.get_nowait()
+                if item is self.__STOP:
+                    # Never swallow the stop marker, put it back for the worker
+                    self.__pending.task_done()
+                    self.__pending.put_nowait(item)
+                    break
+                self.__pending.task_done()
+                discarded += 1
+        except queue.Empty:
+            pass
+        return discarded
+
+    def wait_until_done(self):
+        """Blocks until every submitted item has been put into the output queue"""
+        if self.is_running:
+            self.__pending.join()
+
+    def close(self, discard_pending: bool = False):
+        """Stops the worker after it finished all submitted items
+
+        Args:
+            discard_pending (bool, optional): Drop sentences that have not been synthesized yet. Defaults to False.
+        """
+        if discard_pending:
+            discarded = self.discard_pending()
+            if discarded > 0:
+                logger.debug(f"Discarded {discarded} sentence(s) waiting for synthesis")
+        if not self.is_running:
+            return
+        self.__pending.put(self.__STOP)
+        self.__worker.join()
+        self.__worker = None
+
+    def __run(self):
+        while True:
+            item = self.__pending.get()
+            try:
+                if item is self.__STOP:
+                    break
+                if isinstance(item, Sentence):
+                    self.__output_queue.put(item)
+                else:
+                    for sentence in self.__generate_sentences(item):
+                        self.__output_queue.put(sentence)
+            except Exception as e:
+                logger.error(f"Error synthesizing sentence: {e}")
+            finally:
+                self.__pending.task_done()
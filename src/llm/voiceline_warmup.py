@@ -0,0 +1,105 @@
+import queue
+import threading
+from typing import Callable
+from src.character_manager import Character
+from src.llm.sentence_content import SentenceContent, SentenceTypeEnum
+from src import utils
+
+logger = utils.get_logger()
+
+
+class VoicelineWarmup:
+    """Pre-renders fixed system voicelines (eg goodbyes) for NPCs on a worker thread as they join a conversation
+
+    The rendered voicelines end up in the voiceline cache of the TTS service, so speaking them later on the hot path
+    (eg while ending a conversation or recovering from an LLM error) needs no round trip to the TTS service.
+    A line is only started while no response is being generated. A response that starts while a line is being rendered still has to wait for that one line,
+    so only NPCs whose TTS service can hold their voice without switching models should be added (see TTSable.can_preload_voices).
+    Lines are rendered once per position in a response that needs its own rendering, eg both as first and later line for 'Lazy' lip generation.
+    """
+    __STOP = object()
+    __IDLE_CHECK_INTERVAL: float = 0.5
+
+    def __init__(self, prerender: Callable[[SentenceContent, bool], bool], wait_until_idle: Callable[[float], bool], get_line_positions: Callable[[Character], list[bool]], voicelines: list[str]) -> None:
+        """
+        Args:
+            prerender (Callable[[SentenceContent, bool], bool]): Function that voices a SentenceContent without passing it on, the bool states whether it is the first line of a response.
+                Returns False if it skipped the line because a response started in the meantime
+            wait_until_idle (Callable[[float], bool]): Blocks until no response is being generated or the timeout (in seconds) passed. Returns False on timeout
+            get_line_positions (Callable[[Character], list[bool]]): Returns for an NPC as which positions in a response (first line or not) the voicelines need to be rendered
+            voicelines (list[str]): The voicelines to pre-render for every NPC
+        """
+        self.__prerender = prerender
+        self.__wait_until_idle = wait_until_idle
+        self.__get_line_positions = get_line_positions
+        self.__voicelines: list[str] = [voiceline for voiceline in voicelines if voiceline and voiceline.strip()]
+        self.__pending: queue.Queue[Character | object] = queue.Queue()
+        self.__warmed_up: set[tuple] = set()
+        self.__warmed_up_lock = threading.Lock()
+        self.__stop = threading.Event()
+        self.__worker: threading.Thread | None = None
+
+    @property
+    def is_running(self) -> bool:
+        return self.__worker is not None and self.__worker.is_alive()
+
+    def start(self):
+        if self.is_running:
+            return
+        self.__stop.clear()
+        self.__worker = threading.Thread(target=self.__run, name="VoicelineWarmup", daemon=True)
+        self.__worker.start()
+
+    def stop(self):
+        """Stops the worker once it finished the voiceline it is currently rendering. NPCs waiting for their warm-up are dropped"""
+        if not self.is_running:
+            return
+        self.__stop.set()
+        self.__pending.put(self.__STOP)
+        self.__worker.join()
+        self.__worker = None
+
+    def add_characters(self, characters: list[Character]):
+        """Queues the voicelines of NPCs that have not been warmed up yet with their current voice"""
+        for character in characters:
+            if character.is_player_character:
+                continue
+            voice_key = self.__get_voice_key(character)
+            with self.__warmed_up_lock:
+                if voice_key in self.__warmed_up:
+                    continue
+                self.__warmed_up.add(voice_key)
+            self.__pending.put(character)
+
+    @staticmethod
+    def __get_voice_key(character: Character) -> tuple:
+        return (character.name, character.tts_service, character.tts_voice_model, character.in_game_voice_model, character.csv_in_game_voice_model, character.advanced_voice_model, character.voice_accent, character.is_in_combat)
+
+    def __run(self):
+        while not self.__stop.is_set():
+            character = self.__pending.get()
+            if character is self.__STOP:
+                break
+            try:
+                line_positions = self.__get_line_positions(character)
+            except Exception as e:
+                logger.debug(f"Could not pre-render system voicelines for {character.name}: {e}")
+                continue
+            for voiceline in self.__voicelines:
+                for is_first_line in line_positions:
+                    if not self.__render_when_idle(SentenceContent(character, voiceline, SentenceTypeEnum.SPEECH, True), is_first_line):
+                        return
+            logger.debug(f"Pre-rendered {len(self.__voicelines)} system voicelines for {character.name}")
+
+    def __render_when_idle(self, content: SentenceContent, is_first_line: bool) -> bool:
+        """Renders a voiceline once no response is being generated. Returns False if the warm-up was stopped before"""
+        while not self.__stop.is_set():
+            if not self.__wait_until_idle(self.__IDLE_CHECK_INTERVAL):
+                continue
+            try:
+                if self.__prerender(content, is_first_line):
+                    return True
+            except Exception as e:
+                logger.debug(f"Could not pre-render voiceline '{content.text}' for {content.speaker.name}: {e}")
+                return True
+        return False
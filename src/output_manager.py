@@ -1,5 +1,6 @@
 import asyncio
-from threading import Lock
+from concurrent.futures import Future
+from threading import Event, Lock, Thread
 import time
 import unicodedata
 from openai import APIConnectionError
@@ -12,10 +13,13 @@ from src.llm.output.change_character_parser import change_character_parser
 from src.llm.output.italics_parser import italics_parser
 from src.llm.output.narration_parser import narration_parser
 from src.llm.output.output_parser import output_parser, sentence_generation_settings
+from src.llm.output.output_parser_chain import output_parser_chain
 from src.llm.output.sentence_end_parser import sentence_end_parser
 from src.llm.sentence_content import SentenceTypeEnum, SentenceContent
 from src.conversation.action import Action
 from src.llm.sentence_queue import SentenceQueue
+from src.llm.sentence_synthesis_stage import SentenceSynthesisStage
+from src.llm.voiceline_warmup import VoicelineWarmup
 from src.config.config_loader import ConfigLoader
 from src.llm.sentence import Sentence
 from src import utils
@@ -24,6 +28,7 @@ from src.character_manager import Character
 from src.llm.message_thread import message_thread
 from src.llm.ai_client import AIClient
 from src.llm.client_base import ClientBase
+from src.llm.http_client_pool import get_http_client_pool
 from src.model_profile_manager import get_profile_manager, ModelProfileManager
 from src.actions.function_manager import FunctionManager
 from src.llm.messages import AssistantMessage, ToolMessage
@@ -31,14 +36,17 @@ from src.tts.ttsable import TTSable
 from src.tts.synthesization_options import SynthesizationOptions
 from src.tts.tts_factory import parse_tts_service, create_tts
 from src.config.definitions.tts_definitions import TTSEnum
-from src.telemetry.telemetry import create_span_from_thread
+from src.telemetry.telemetry import create_span_from_thread, set_parent_context
 from src.games.gameable import Gameable
-from typing import Callable
+from typing import Callable, Iterator
 
 logger = utils.get_logger()
 
 
 class ChatManager:
+    LLM_ERROR_RESPONSE: str = "I can't find the right words at the moment."
+    LLM_RETRY_DELAY_SECONDS: float = 5
+
     def __init__(self, config: ConfigLoader, tts: TTSable, client: AIClient, game: Gameable | None = None):
         self.loglevel = 28
         self.__config: ConfigLoader = config
@@ -46,7 +54,13 @@ class ChatManager:
         self.__client: AIClient = client
         self.__game: Gameable | None = game
         self.__is_generating: bool = False
-        self.__stop_generation = asyncio.Event()
+        self.__stop_generation = Event()
+        self.__generation_finished = Event()
+        self.__generation_finished.set()
+        self.__generation_task: asyncio.Task | None = None
+        self.__generation_loop: asyncio.AbstractEventLoop | None = None
+        self.__generation_loop_thread: Thread | None = None
+        self.__generation_loop_lock = Lock()
         self.__tts_access_lock = Lock()
         self.__is_first_sentence: bool = False
         self.__listen_requested: bool = False
@@ -57,6 +71,9 @@ class ChatManager:
         self.__per_character_clients: dict[str, AIClient] = {}
         self.__per_service_tts: dict[TTSEnum, TTSable] = {}
         self.__profile_manager: ModelProfileManager = get_profile_manager()
+        self.__voiceline_warmup: VoicelineWarmup | None = None
+        self.__preloaded_voices: set[tuple] = set() # voices handed to a TTS service to preload, loaded or still loading
+        self.__preloaded_voices_lock = Lock()
 
     @property
     def tts(self) -> TTSable:
@@ -181,21 +198,7 @@ class ChatManager:
 
         with self.__tts_access_lock:
             try:
-                if self.__config.narration_handling == NarrationHandlingEnum.USE_NARRATOR and content.sentence_type == SentenceTypeEnum.NARRATION:
-                    synth_options = SynthesizationOptions(False, self.__is_first_sentence)
-                    audio_file = self.__tts.synthesize(self.__config.narrator_voice, text, self.__config.narrator_voice, self.__config.narrator_voice, "en", synth_options, self.__config.narrator_voice)
-                else:
-                    synth_options = SynthesizationOptions(character_to_talk.is_in_combat, self.__is_first_sentence)
-                    selected_tts_service = parse_tts_service(character_to_talk.tts_service) if self.__config.allow_per_character_tts_overrides else None
-                    if selected_tts_service is not None:
-                        try:
-                            tts_instance = self._get_or_create_tts(selected_tts_service)
-                            audio_file = tts_instance.synthesize(character_to_talk.tts_voice_model, text, character_to_talk.in_game_voice_model, character_to_talk.csv_in_game_voice_model, character_to_talk.voice_accent, synth_options, character_to_talk.advanced_voice_model)
-                        except Exception as e:
-                            logger.warning(f"Per-character TTS '{character_to_talk.tts_service}' failed for {character_to_talk.name}: {e}. Falling back to default TTS.")
-                            audio_file = self.__tts.synthesize(character_to_talk.tts_voice_model, text, character_to_talk.in_game_voice_model, character_to_talk.csv_in_game_voice_model, character_to_talk.voice_accent, synth_options, character_to_talk.advanced_voice_model)
-                    else:
-                        audio_file = self.__tts.synthesize(character_to_talk.tts_voice_model, text, character_to_talk.in_game_voice_model, character_to_talk.csv_in_game_voice_model, character_to_talk.voice_accent, synth_options, character_to_talk.advanced_voice_model)
+                audio_file = self.__synthesize(character_to_talk, text, content.sentence_type, self.__is_first_sentence)
             except Exception as e:
                 utils.play_error_sound()
                 error_text = f"Text-to-Speech Error: {e}"
@@ -204,33 +207,297 @@ class ChatManager:
             self.__is_first_sentence = False
             return Sentence(SentenceContent(character_to_talk, text, content.sentence_type, content.is_system_generated_sentence, content.actions), audio_file, utils.get_audio_duration(audio_file))
 
+    def generate_sentences(self, content: SentenceContent) -> Iterator[Sentence]:
+        """Like generate_sentence, but long texts are voiced in chunks if the TTS service supports it (see tts_chunk_concurrency).
+        Every chunk is returned as its own sentence as soon as it is ready, so the first chunk can play while the rest are still being voiced
+
+        Args:
+            content (SentenceContent): The text to voice and the character to voice it
+
+        Yields:
+            Sentence: the sentence, or the sentences of the chunks of a long text in order
+        """
+        if self.__config.tts_chunk_concurrency <= 0 or len(content.text.strip()) <= TTSable.MAX_CHUNK_LENGTH:
+            yield self.generate_sentence(content)
+            return
+
+        character_to_talk = content.speaker
+        text = ' ' + content.text + ' '
+        with self.__tts_access_lock:
+            tts_instance, voice_arguments, aggro = self.__get_tts_for_sentence(character_to_talk, content.sentence_type)
+            if tts_instance.supports_chunked_synthesis:
+                actions = content.actions
+                try:
+                    voice, in_game_voice, csv_in_game_voice, voice_accent, advanced_voice_model = voice_arguments
+                    synth_options = SynthesizationOptions(aggro, self.__is_first_sentence)
+                    for chunk_text, audio_file in tts_instance.synthesize_chunks(voice, text, in_game_voice, csv_in_game_voice, voice_accent, synth_options, advanced_voice_model, self.__config.tts_chunk_concurrency):
+                        self.__is_first_sentence = False
+                        yield Sentence(SentenceContent(character_to_talk, chunk_text, content.sentence_type, content.is_system_generated_sentence, actions), audio_file, utils.get_audio_duration(audio_file))
+                        actions = [] # Actions are sent with the first chunk
+                except Exception as e:
+                    utils.play_error_sound()
+                    error_text = f"Text-to-Speech Error: {e}"
+                    logger.log(29, error_text)
+                    yield Sentence(SentenceContent(character_to_talk, text, content.sentence_type, True), "", 0, error_text)
+                return
+        yield self.generate_sentence(content)
+
+    def __get_tts_for_sentence(self, character_to_talk: Character, sentence_type: SentenceTypeEnum) -> tuple[TTSable, tuple[str, str, str, str, str | None], bool]:
+        """Returns the TTS service that voices a sentence, the voice arguments to pass to it (voice, in-game voice, CSV in-game voice, accent, advanced voice model) and whether to voice it aggressively"""
+        if self.__config.narration_handling == NarrationHandlingEnum.USE_NARRATOR and sentence_type == SentenceTypeEnum.NARRATION:
+            narrator_voice = self.__config.narrator_voice
+            return self.__tts, (narrator_voice, narrator_voice, narrator_voice, "en", narrator_voice), False
+
+        tts_instance = self.__tts
+        selected_tts_service = parse_tts_service(character_to_talk.tts_service) if self.__config.allow_per_character_tts_overrides else None
+        if selected_tts_service is not None:
+            tts_instance = self._get_or_create_tts(selected_tts_service)
+        voice_arguments = (character_to_talk.tts_voice_model, character_to_talk.in_game_voice_model, character_to_talk.csv_in_game_voice_model, character_to_talk.voice_accent, character_to_talk.advanced_voice_model)
+        return tts_instance, voice_arguments, character_to_talk.is_in_combat
+
+    def prerender_sentence(self, content: SentenceContent, is_first_line_of_response: bool) -> bool:
+        """Synthesizes the audio for a text without creating a sentence, so that the TTS service can serve it from its cache later on.
+        Gives way to responses: nothing is synthesized if a response started generating while waiting for the TTS service
+
+        Args:
+            content (SentenceContent): The text to voice and the character to voice it
+            is_first_line_of_response (bool): Whether to voice it as if it was the first line of a response
+
+        Returns:
+            bool: False if the text was skipped because a response is being generated
+        """
+        if len(content.text.strip()) < 3:
+            return True
+        with self.__tts_access_lock:
+            if not self.__generation_finished.is_set():
+                return False
+            self.__synthesize(content.speaker, ' ' + content.text + ' ', content.sentence_type, is_first_line_of_response)
+            return True
+
+    def start_voiceline_warmup(self):
+        """Starts pre-rendering the fixed system voicelines (goodbyes, error fallback etc) for NPCs as they join a conversation, see warm_up_voicelines
+        """
+        if not self.__config.voiceline_warmup_enabled or self.__config.voiceline_cache_size <= 0:
+            return
+        if not self.__voiceline_warmup:
+            voicelines = [self.__config.goodbye_npc_response, self.__config.collecting_thoughts_npc_response, self.LLM_ERROR_RESPONSE]
+            self.__voiceline_warmup = VoicelineWarmup(self.prerender_sentence, self.__generation_finished.wait, self.__get_warmup_line_positions, voicelines)
+        self.__voiceline_warmup.start()
+
+    def warm_up_voicelines(self, characters: list[Character]):
+        """Queues the fixed system voicelines of the given characters for pre-rendering. Does nothing if the warm-up has not been started.
+        Characters whose TTS service would have to switch voice models to voice them (see TTSable.can_preload_voices) are skipped, as the next reply would have to switch back
+        """
+        if self.__voiceline_warmup and self.__voiceline_warmup.is_running:
+            self.__voiceline_warmup.add_characters([character for character in characters if not character.is_player_character and self.__get_loaded_tts(character).can_preload_voices])
+
+    def __get_warmup_line_positions(self, character: Character) -> list[bool]:
+        """Returns as which positions in a response (first line or not) the voicelines of a character need to be pre-rendered.
+        Both positions only get their own rendering if their lip files differ, eg for 'Lazy' lip generation
+        """
+        tts_instance = self.__get_loaded_tts(character)
+        first_line_lip_mode = tts_instance._get_lip_mode(SynthesizationOptions(character.is_in_combat, True))
+        later_line_lip_mode = tts_instance._get_lip_mode(SynthesizationOptions(character.is_in_combat, False))
+        if first_line_lip_mode == later_line_lip_mode:
+            return [True]
+        return [True, False]
+
+    def preload_voices(self, characters: list[Character]):
+        """Loads the voice models of the given NPCs on a background thread, so the TTS service does not need to switch models once they speak.
+        Only TTS services that can hold several voice models at once (see TTSable.can_preload_voices) do anything with this
+        """
+        voices_to_preload: list[tuple[TTSable, Character]] = []
+        for character in characters:
+            if character.is_player_character:
+                continue
+            tts_instance = self.__get_loaded_tts(character)
+            if not tts_instance.can_preload_voices:
+                continue
+            voice_key = (tts_instance, character.tts_voice_model, character.in_game_voice_model, character.csv_in_game_voice_model, character.advanced_voice_model, character.voice_accent)
+            with self.__preloaded_voices_lock:
+                if voice_key in self.__preloaded_voices:
+                    continue
+                self.__preloaded_voices.add(voice_key)
+            voices_to_preload.append((tts_instance, character))
+        if len(voices_to_preload) == 0:
+            return
+
+        def preload():
+            for tts_instance, character in voices_to_preload:
+                try:
+                    tts_instance.preload_voice(character.tts_voice_model, character.in_game_voice_model, character.csv_in_game_voice_model, character.advanced_voice_model, character.voice_accent)
+                except Exception as e:
+                    logger.debug(f"Could not preload the voice of {character.name}: {e}")
+        Thread(target=preload, name="VoicePreload", daemon=True).start()
+
+    def clear_preloaded_voices(self):
+        """Forgets which voices have been preloaded, so the voices of the next conversation are preloaded again in case the TTS service has unloaded them since"""
+        with self.__preloaded_voices_lock:
+            self.__preloaded_voices.clear()
+
+    def __get_loaded_tts(self, character: Character) -> TTSable:
+        """Returns the TTS service that voices a character without starting a per-character TTS service that is not running yet"""
+        selected_tts_service = parse_tts_service(character.tts_service) if self.__config.allow_per_character_tts_overrides else None
+        if selected_tts_service is not None and selected_tts_service in self.__per_service_tts:
+            return self.__per_service_tts[selected_tts_service]
+        return self.__tts
+
+    def __synthesize(self, character_to_talk: Character, text: str, sentence_type: SentenceTypeEnum, is_first_line_of_response: bool) -> str:
+        """Voices a text with the TTS service of the character (or the narrator). Must be called while holding the TTS access lock
+
+        Returns:
+            str: the path to the voiceline's .wav file
+        """
+        if self.__config.narration_handling == NarrationHandlingEnum.USE_NARRATOR and sentence_type == SentenceTypeEnum.NARRATION:
+            synth_options = SynthesizationOptions(False, is_first_line_of_response)
+            return self.__tts.synthesize(self.__config.narrator_voice, text, self.__config.narrator_voice, self.__config.narrator_voice, "en", synth_options, self.__config.narrator_voice)
+
+        synth_options = SynthesizationOptions(character_to_talk.is_in_combat, is_first_line_of_response)
+        selected_tts_service = parse_tts_service(character_to_talk.tts_service) if self.__config.allow_per_character_tts_overrides else None
+        if selected_tts_service is not None:
+            try:
+                tts_instance = self._get_or_create_tts(selected_tts_service)
+                return tts_instance.synthesize(character_to_talk.tts_voice_model, text, character_to_talk.in_game_voice_model, character_to_talk.csv_in_game_voice_model, character_to_talk.voice_accent, synth_options, character_to_talk.advanced_voice_model)
+            except Exception as e:
+                logger.warning(f"Per-character TTS '{character_to_talk.tts_service}' failed for {character_to_talk.name}: {e}. Falling back to default TTS.")
+        return self.__tts.synthesize(character_to_talk.tts_voice_model, text, character_to_talk.in_game_voice_model, character_to_talk.csv_in_game_voice_model, character_to_talk.voice_accent, synth_options, character_to_talk.advanced_voice_model)
+
+    def _get_generation_loop(self) -> asyncio.AbstractEventLoop:
+        """Returns the long-lived event loop responses are generated on, starting its background thread if needed
+        """
+        with self.__generation_loop_lock:
+            if not self.__generation_loop or not self.__generation_loop_thread or not self.__generation_loop_thread.is_alive():
+                loop = asyncio.new_event_loop()
+                loop_thread = Thread(target=self.__run_generation_loop, args=(loop,), name="ChatManagerGenerationLoop", daemon=True)
+                loop_thread.start()
+                self.__generation_loop = loop
+                self.__generation_loop_thread = loop_thread
+            return self.__generation_loop
+
+    @staticmethod
+    def __run_generation_loop(loop: asyncio.AbstractEventLoop):
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    def shutdown_generation_loop(self):
+        """Stops the background event loop used for generating responses (eg on server shutdown)
+        """
+        if self.__voiceline_warmup:
+            self.__voiceline_warmup.stop()
+        with self.__generation_loop_lock:
+            loop = self.__generation_loop
+            loop_thread = self.__generation_loop_thread
+            self.__generation_loop = None
+            self.__generation_loop_thread = None
+        if loop and loop_thread and loop_thread.is_alive():
+            # Close the pooled LLM connections bound to this loop before stopping it
+            try:
+                asyncio.run_coroutine_threadsafe(get_http_client_pool().aclose_loop_clients(), loop).result(timeout=5)
+            except Exception as e:
+                logger.debug(f"Failed to close LLM connections of the generation loop: {e}")
+            loop.call_soon_threadsafe(loop.stop)
+            loop_thread.join()
+
+    def close_tts_services(self):
+        """Closes the TTS service and the TTS services started for character overrides (eg when the chat manager is replaced or on server shutdown)
+        """
+        for tts in [self.__tts, *self.__per_service_tts.values()]:
+            try:
+                tts.close()
+            except Exception as e:
+                logger.warning(f"Failed to close TTS service: {e}")
+        self.__per_service_tts.clear()
+        self.clear_preloaded_voices()
+
     @utils.time_it
-    def generate_response(self, messages: message_thread, characters: Characters, blocking_queue: SentenceQueue, actions: list[Action], tools: list[dict] | None, game: Gameable | None = None):
-        """Starts generating responses by the LLM for the current state of the input messages
+    def start_generating_response(self, messages: message_thread, characters: Characters, blocking_queue: SentenceQueue, actions: list[Action], tools: list[dict] | None, game: Gameable | None = None, parent_context = None) -> Future | None:
+        """Submits a generation job for the current state of the input messages to the generation loop and returns immediately
 
         Args:
-            messages (message_thread): _description_
-            characters (Characters): _description_
-            blocking_queue (SentenceQueue): _description_
-            actions (list[Action]): _description_
+            messages (message_thread): The messages to send to the LLM
+            characters (Characters): The characters in the conversation
+            blocking_queue (SentenceQueue): The queue the generated sentences are put into
+            actions (list[Action]): The actions available to the LLM
+            tools (list[dict] | None): The tools available to the LLM
             game (Gameable | None): The game instance for resolving action parameters (optional)
+            parent_context (optional): OpenTelemetry context to continue the trace from
+
+        Returns:
+            Future | None: Completes once the response has been fully generated. None if there is no character to respond
         """
         if(not characters.last_added_character):
-            return
+            return None
         self.__is_generating = True
+        self.__generation_finished.clear()
+
+        async def generation_job():
+            self.__generation_task = asyncio.current_task()
+            if parent_context is not None:
+                set_parent_context(parent_context)
+            try:
+                if not self.__stop_generation.is_set(): # the generation may have been stopped before it even started
+                    await self.process_response(characters.last_added_character, blocking_queue, messages, characters, actions, tools, game)
+            except asyncio.CancelledError:
+                logger.log(self.loglevel, "LLM response generation was cancelled")
+            finally:
+                self.__generation_task = None
+                self.__is_generating = False
+                self.__generation_finished.set()
         
-        asyncio.run(self.process_response(characters.last_added_character, blocking_queue, messages, characters, actions, tools, game))
+        return asyncio.run_coroutine_threadsafe(generation_job(), self._get_generation_loop())
+
+    @utils.time_it
+    def generate_response(self, messages: message_thread, characters: Characters, blocking_queue: SentenceQueue, actions: list[Action], tools: list[dict] | None, game: Gameable | None = None):
+        """Generates responses by the LLM for the current state of the input messages and returns once done
+
+        Args:
+            messages (message_thread): The messages to send to the LLM
+            characters (Characters): The characters in the conversation
+            blocking_queue (SentenceQueue): The queue the generated sentences are put into
+            actions (list[Action]): The actions available to the LLM
+            game (Gameable | None): The game instance for resolving action parameters (optional)
+        """
+        generation = self.start_generating_response(messages, characters, blocking_queue, actions, tools, game)
+        if generation:
+            generation.result()
     
     @utils.time_it
     def stop_generation(self):
         """Stops the current generation and only returns once this stop has been successful
+
+        The running generation task is cancelled, which aborts the LLM stream (and its HTTP response) immediately
+        instead of waiting for the next chunk to arrive
         """
         self.__stop_generation.set()
-        while self.__is_generating:
-            time.sleep(0.01)
+        loop = self.__generation_loop
+        if self.__is_generating and loop and not loop.is_closed():
+            loop.call_soon_threadsafe(self.__cancel_generation_task)
+        self.__generation_finished.wait()
         self.__stop_generation.clear()
         return
+
+    def __cancel_generation_task(self):
+        """Cancels the running generation task. Must be called from the generation loop
+        """
+        if self.__generation_task and not self.__generation_task.done():
+            self.__generation_task.cancel()
     
+    @staticmethod
+    async def __complete_in_thread(function: Callable, *args, **kwargs):
+        """Runs a blocking call on a worker thread, so it does not stall the generation loop that all responses share.
+        Waits for the call to finish even if the generation is cancelled in the meantime, for cleanup that must not be skipped
+        """
+        call = asyncio.ensure_future(asyncio.to_thread(function, *args, **kwargs))
+        while True:
+            try:
+                return await asyncio.shield(call)
+            except asyncio.CancelledError:
+                if call.done():
+                    return call.result()
+
     @utils.time_it
     def _add_tool_calls_to_history(self, messages: message_thread, tool_calls: list[dict]):
         """Helper method to add tool calls and their results to message history
@@ -259,32 +526,30 @@ class ChatManager:
             raw_response: str = ''  # Track the raw response
             first_token = True
             parsed_sentence: SentenceContent | None = None
-            pending_sentence: SentenceContent | None = None
             self.__is_first_sentence = True
             is_multi_npc = characters.contains_multiple_npcs()
             max_response_sentences = self.__config.max_response_sentences_single if not is_multi_npc else self.__config.max_response_sentences_multi
             max_retries = 5
             retries = 0
 
-            parser_chain: list[output_parser] = [
+            parsers: list[output_parser] = [
                 change_character_parser(characters),
                 italics_parser()]
             if self.__config.narration_handling != NarrationHandlingEnum.DEACTIVATE_HANDLING_OF_NARRATIONS:
-                parser_chain.append(narration_parser(self.__config.narration_start_indicators, self.__config.narration_end_indicators, 
+                parsers.append(narration_parser(self.__config.narration_start_indicators, self.__config.narration_end_indicators, 
                                                     self.__config.speech_start_indicators, self.__config.speech_end_indicators))
-            parser_chain.extend([
+            parsers.extend([
                 sentence_end_parser(),
                 actions_parser(actions),
                 sentence_length_parser(self.__config.number_words_tts),
                 max_count_sentences_parser(max_response_sentences, not characters.contains_player_character())
             ])
+            parser_chain: output_parser_chain = output_parser_chain(parsers)
+            accumulator: sentence_accumulator = sentence_accumulator(parser_chain.get_cut_indicators())
 
-            cut_indicators: set[str] = set()
-            for parser in parser_chain:
-                indicators = parser.get_cut_indicators()
-                for i in indicators:
-                    cut_indicators.add(i)
-            accumulator: sentence_accumulator = sentence_accumulator(list(cut_indicators))
+            # Voice sentences on a separate worker so the LLM stream keeps being read while the TTS service is busy
+            synthesis_stage = SentenceSynthesisStage(self.generate_sentences, blocking_queue, self.__config.tts_queue_size)
+            synthesis_stage.start()
         
             try:
                 current_sentence: str = ''
@@ -302,118 +567,123 @@ class ChatManager:
                 while not has_text_response and retries < max_retries:
                     try:
                         start_time = time.time()
-                        async for item in active_client.streaming_call(messages=messages, is_multi_npc=is_multi_npc, tools=current_tools):
-                            if self.__stop_generation.is_set():
-                                break
-                            if not item:
-                                continue
+                        response_stream = active_client.streaming_call(messages=messages, is_multi_npc=is_multi_npc, tools=current_tools)
+                        try:
+                            async for item in response_stream:
+                                if self.__stop_generation.is_set():
+                                    break
+                                if not item:
+                                    continue
 
-                            if first_token:
-                                logger.log(self.loglevel, f"LLM took {round(time.time() - start_time, 5)} seconds to respond")
-                                first_token = False
+                                if first_token:
+                                    logger.log(self.loglevel, f"LLM took {round(time.time() - start_time, 5)} seconds to respond")
+                                    first_token = False
                             
-                            # Handle different types of streaming data
-                            if isinstance(item, tuple) and len(item) == 2:
-                                item_type, item_data = item
+                                # Handle different types of streaming data
+                                if isinstance(item, tuple) and len(item) == 2:
+                                    item_type, item_data = item
                                 
-                                if item_type == "content":
-                                    # Handle regular text content
-                                    has_text_response = True
-                                    content = item_data
-                                    raw_response += content
-                                    accumulator.accumulate(content)
-                                elif item_type == "tool_calls":
-                                    # Collect tool calls
-                                    collected_tool_calls = item_data
-                                    logger.log(23, f"Received {len(collected_tool_calls)} tool call(s)")
+                                    if item_type == "content":
+                                        # Handle regular text content
+                                        has_text_response = True
+                                        content = item_data
+                                        raw_response += content
+                                        accumulator.accumulate(content)
+                                    elif item_type == "tool_calls":
+                                        # Collect tool calls
+                                        collected_tool_calls = item_data
+                                        logger.log(23, f"Received {len(collected_tool_calls)} tool call(s)")
                                     
-                                    # Add tool calls to message history
-                                    if not tool_calls_added_this_turn:
-                                        self._add_tool_calls_to_history(messages, collected_tool_calls)
-                                        tool_calls_added_this_turn = True
+                                        # Add tool calls to message history
+                                        if not tool_calls_added_this_turn:
+                                            self._add_tool_calls_to_history(messages, collected_tool_calls)
+                                            tool_calls_added_this_turn = True
                                     
-                                    # Parse tool calls
-                                    parsed_tools = FunctionManager.parse_function_calls(collected_tool_calls, characters, game)
+                                        # Parse tool calls
+                                        parsed_tools = FunctionManager.parse_function_calls(collected_tool_calls, characters, game)
                                     
-                                    # Check if vision was requested - filter it out from game actions
-                                    vision_requested = any(
-                                        tool.get('identifier') == 'mantella_npc_vision' 
-                                        for tool in parsed_tools if isinstance(tool, dict)
-                                    )
-                                    if vision_requested:
-                                        logger.log(23, "Vision requested for next LLM call")
-                                        settings.vision_requested = True
-                                        # Remove vision from parsed_tools so it doesn't go to the game
-                                        parsed_tools = [t for t in parsed_tools if t.get('identifier') != 'mantella_npc_vision']
+                                        # Check if vision was requested - filter it out from game actions
+                                        vision_requested = any(
+                                            tool.get('identifier') == 'mantella_npc_vision' 
+                                            for tool in parsed_tools if isinstance(tool, dict)
+                                        )
+                                        if vision_requested:
+                                            logger.log(23, "Vision requested for next LLM call")
+                                            settings.vision_requested = True
+                                            # Remove vision from parsed_tools so it doesn't go to the game
+                                            parsed_tools = [t for t in parsed_tools if t.get('identifier') != 'mantella_npc_vision']
                                     
-                                    # Check if listen was requested - filter it out from game actions
-                                    listen_requested = any(
-                                        tool.get('identifier') == 'mantella_npc_listen' 
-                                        for tool in parsed_tools if isinstance(tool, dict)
-                                    )
-                                    if listen_requested:
-                                        pause_seconds = FunctionManager.get_action_pause_seconds('mantella_npc_listen') or 10.0
-                                        logger.log(23, f"Listen action triggered: Pause threshold increased to {pause_seconds} seconds for one turn")
-                                        self.set_listen_requested(pause_seconds)
-                                        # Remove listen from parsed_tools so it doesn't go to the game
-                                        parsed_tools = [t for t in parsed_tools if t.get('identifier') != 'mantella_npc_listen']
+                                        # Check if listen was requested - filter it out from game actions
+                                        listen_requested = any(
+                                            tool.get('identifier') == 'mantella_npc_listen' 
+                                            for tool in parsed_tools if isinstance(tool, dict)
+                                        )
+                                        if listen_requested:
+                                            pause_seconds = FunctionManager.get_action_pause_seconds('mantella_npc_listen') or 10.0
+                                            logger.log(23, f"Listen action triggered: Pause threshold increased to {pause_seconds} seconds for one turn")
+                                            self.set_listen_requested(pause_seconds)
+                                            # Remove listen from parsed_tools so it doesn't go to the game
+                                            parsed_tools = [t for t in parsed_tools if t.get('identifier') != 'mantella_npc_listen']
                                     
-                                    # Check if end conversation was requested - filter it out from game actions
-                                    end_conversation_requested = any(
-                                        tool.get('identifier') == 'mantella_end_conversation' 
-                                        for tool in parsed_tools if isinstance(tool, dict)
-                                    )
-                                    if end_conversation_requested:
-                                        logger.log(23, "End conversation action triggered via tool call")
-                                        self.set_end_conversation_requested()
-                                        # Remove end_conversation from parsed_tools so it doesn't go to the game directly
-                                        parsed_tools = [t for t in parsed_tools if t.get('identifier') != 'mantella_end_conversation']
+                                        # Check if end conversation was requested - filter it out from game actions
+                                        end_conversation_requested = any(
+                                            tool.get('identifier') == 'mantella_end_conversation' 
+                                            for tool in parsed_tools if isinstance(tool, dict)
+                                        )
+                                        if end_conversation_requested:
+                                            logger.log(23, "End conversation action triggered via tool call")
+                                            self.set_end_conversation_requested()
+                                            # Remove end_conversation from parsed_tools so it doesn't go to the game directly
+                                            parsed_tools = [t for t in parsed_tools if t.get('identifier') != 'mantella_end_conversation']
                                     
-                                    # Send actions immediately as an action-only sentence (if any remain after filtering)
-                                    if parsed_tools:
-                                        # If any of the actions require an in-game response, pause text generation
-                                        requires_followup = FunctionManager.any_action_requires_response(parsed_tools)
-                                        if requires_followup:
-                                            settings.interrupting_action = True
-                                            settings.stop_generation = True
-
-                                        logger.log(23, f"Parsed actions: {parsed_tools}")
-                                        action_only_sentence = SentenceContent(active_character, "", SentenceTypeEnum.SPEECH, True, parsed_tools)
-                                        blocking_queue.put(Sentence(action_only_sentence, "", 0))
-                            else:
-                                # Fallback for backward compatibility (if item is just a string)
-                                has_text_response = True
-                                content = item
-                                raw_response += content
-                                accumulator.accumulate(content)
+                                        # Send actions immediately as an action-only sentence (if any remain after filtering)
+                                        if parsed_tools:
+                                            # If any of the actions require an in-game response, pause text generation
+                                            requires_followup = FunctionManager.any_action_requires_response(parsed_tools)
+                                            if requires_followup:
+                                                settings.interrupting_action = True
+                                                settings.stop_generation = True
+                                                if has_text_response:
+                                                    # The tool calls arrived while the verbal response was already streaming (concurrent function client)
+                                                    # Keep the sentences completed so far but discard the rest, the NPC needs to wait for the game's response
+                                                    logger.log(23, "Action requires a response from the game, discarding the rest of the verbal response")
+                                                    parsed_sentence = None
+                                                    parser_chain.take_pending_sentence()
+
+                                            logger.log(23, f"Parsed actions: {parsed_tools}")
+                                            action_only_sentence = SentenceContent(active_character, "", SentenceTypeEnum.SPEECH, True, parsed_tools)
+                                            await asyncio.to_thread(synthesis_stage.submit_sentence, Sentence(action_only_sentence, "", 0))
+                                            if requires_followup and has_text_response:
+                                                break
+                                else:
+                                    # Fallback for backward compatibility (if item is just a string)
+                                    has_text_response = True
+                                    content = item
+                                    raw_response += content
+                                    accumulator.accumulate(content)
                             
-                            # Only process sentences if we have text content
-                            if has_text_response:
-                                while accumulator.has_next_sentence():
-                                    current_sentence = accumulator.get_next_sentence()
-                                    parsed_sentence: SentenceContent | None = None
-                                    # Apply parsers
-                                    for parser in parser_chain:
-                                        if not parsed_sentence:  # Try to extract a complete sentence
-                                            parsed_sentence, current_sentence = parser.cut_sentence(current_sentence, settings)
-                                        if parsed_sentence:  # Apply modifications if we already have a sentence
-                                            parsed_sentence, pending_sentence = parser.modify_sentence_content(parsed_sentence, pending_sentence, settings)
+                                # Only process sentences if we have text content
+                                if has_text_response:
+                                    while accumulator.has_next_sentence():
+                                        current_sentence = accumulator.get_next_sentence()
+                                        # Apply parsers
+                                        parsed_sentence, current_sentence = parser_chain.cut_sentence(current_sentence, settings)
                                         if settings.stop_generation:
                                             break
+                                        accumulator.refuse(current_sentence)
+                                        # Process sentences from the parser chain
+                                        if parsed_sentence:
+                                            if not self.__config.narration_handling == NarrationHandlingEnum.CUT_NARRATIONS or parsed_sentence.sentence_type != SentenceTypeEnum.NARRATION:
+                                                await asyncio.to_thread(synthesis_stage.submit, parsed_sentence)
+                                                parsed_sentence = None
                                     if settings.stop_generation:
                                         break
-                                    accumulator.refuse(current_sentence)
-                                    # Process sentences from the parser chain
-                                    if parsed_sentence:
-                                        if not self.__config.narration_handling == NarrationHandlingEnum.CUT_NARRATIONS or parsed_sentence.sentence_type != SentenceTypeEnum.NARRATION:
-                                            new_sentence = self.generate_sentence(parsed_sentence)
-                                            blocking_queue.put(new_sentence)
-                                            parsed_sentence = None
-                                if settings.stop_generation:
-                                    break
-                                if settings.interrupting_action:
-                                    # If there is an interrupting action, stop the generation after the next sentence
-                                    settings.stop_generation = True
+                                    if settings.interrupting_action:
+                                        # If there is an interrupting action, stop the generation after the next sentence
+                                        settings.stop_generation = True
+                        finally:
+                            # Close the stream right away so the underlying HTTP response is released, even when stopping early
+                            await response_stream.aclose()
                         
                         # Check if a second call is needed for a text response
                         if collected_tool_calls and not has_text_response:
@@ -443,8 +713,10 @@ class ChatManager:
                         utils.play_error_sound()
                         logger.error(f"LLM API Error: {e}")
                         
-                        error_response = "I can't find the right words at the moment."
-                        new_sentence = self.generate_sentence(SentenceContent(active_character, error_response, SentenceTypeEnum.SPEECH, True))
+                        error_response = self.LLM_ERROR_RESPONSE
+                        # Let already parsed sentences play first and keep the error line in order
+                        await asyncio.to_thread(synthesis_stage.wait_until_done)
+                        new_sentence = await asyncio.to_thread(self.generate_sentence, SentenceContent(active_character, error_response, SentenceTypeEnum.SPEECH, True))
                         blocking_queue.put(new_sentence)
                         if new_sentence.error_message: # If the error message itself has an error, just give up
                             break
@@ -454,7 +726,7 @@ class ChatManager:
                             break
                         
                         logger.log(self.loglevel, 'Retrying connection to API...')
-                        time.sleep(5)
+                        await asyncio.sleep(self.LLM_RETRY_DELAY_SECONDS)
 
             except Exception as e:
                 utils.play_error_sound()
@@ -471,13 +743,15 @@ class ChatManager:
                 # Handle any remaining content
                 if parsed_sentence:
                     if not self.__config.narration_handling == NarrationHandlingEnum.CUT_NARRATIONS or parsed_sentence.sentence_type != SentenceTypeEnum.NARRATION:
-                        new_sentence = self.generate_sentence(parsed_sentence)
-                        blocking_queue.put(new_sentence)
+                        await self.__complete_in_thread(synthesis_stage.submit, parsed_sentence)
                 
+                pending_sentence = parser_chain.take_pending_sentence()
                 if pending_sentence:
                     if not self.__config.narration_handling == NarrationHandlingEnum.CUT_NARRATIONS or pending_sentence.sentence_type != SentenceTypeEnum.NARRATION:
-                        new_sentence = self.generate_sentence(pending_sentence)
-                        blocking_queue.put(new_sentence)
+                        await self.__complete_in_thread(synthesis_stage.submit, pending_sentence)
+                # Wait for the remaining sentences to be voiced before signalling the end of the response
+                # If the response was stopped, sentences that have not been voiced yet are no longer needed
+                await self.__complete_in_thread(synthesis_stage.close, discard_pending=self.__stop_generation.is_set())
                 logger.log(23, f"Full raw response ({active_client.get_count_tokens(raw_response)} tokens): {raw_response.strip()}")
                 blocking_queue.is_more_to_come = False
                 # This sentence is required to make sure there is one in case the game is already waiting for it
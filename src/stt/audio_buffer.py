@@ -0,0 +1,62 @@
+import numpy as np
+
+
+class AudioBuffer:
+    """Preallocated float32 buffer for microphone audio
+
+    Appending copies only the new chunk. Dropping audio from the front (eg to keep a lookback window while nobody speaks)
+    just moves the start of the buffer. The memory is reused between utterances and only grows (by doubling) if an utterance does not fit.
+    """
+    def __init__(self, capacity: int) -> None:
+        """
+        Args:
+            capacity (int): Number of samples to allocate up front
+        """
+        self.__data: np.ndarray = np.zeros(max(1, capacity), dtype=np.float32)
+        self.__start: int = 0
+        self.__end: int = 0
+
+    def __len__(self) -> int:
+        return self.__end - self.__start
+
+    @property
+    def capacity(self) -> int:
+        return len(self.__data)
+
+    def append(self, chunk: np.ndarray):
+        chunk_size = len(chunk)
+        if self.__end + chunk_size > len(self.__data):
+            self.__make_room(chunk_size)
+        self.__data[self.__end:self.__end + chunk_size] = chunk
+        self.__end += chunk_size
+
+    def keep_last(self, sample_count: int):
+        """Drops everything but the last sample_count samples"""
+        self.__start = max(self.__start, self.__end - sample_count)
+
+    def clear(self):
+        self.__start = 0
+        self.__end = 0
+
+    def view(self) -> np.ndarray:
+        """Returns the buffered audio without copying it. Only valid until the buffer is changed next"""
+        return self.__data[self.__start:self.__end]
+
+    def snapshot(self) -> np.ndarray:
+        """Returns a copy of the buffered audio that later changes to the buffer do not affect"""
+        return self.view().copy()
+
+    def __make_room(self, chunk_size: int):
+        length = len(self)
+        capacity = len(self.__data)
+        if length + chunk_size > capacity:
+            while length + chunk_size > capacity:
+                capacity *= 2
+            data = np.zeros(capacity, dtype=np.float32)
+            data[:length] = self.view()
+            self.__data = data
+        else:
+            # Move the audio back to the front of the buffer, the space before it is no longer used
+            self.__data[:length] = self.view()
+        self.__start = 0
+        self.__end = length
@@ -0,0 +1,193 @@
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Iterable, Iterator
+import numpy as np
+import soundfile as sf
+from scipy.signal import resample_poly
+import src.utils as utils
+
+logger = utils.get_logger()
+
+# Signature of a sounddevice input callback: (indata, frames, time, status), with indata of shape (frames, 1)
+AudioCallback = Callable[[np.ndarray, int, Any, Any], None]
+
+
+class AudioSource(ABC):
+    """Source of the mono float32 audio the Transcriber listens to
+
+    Audio is delivered in blocks of `chunk_size` samples to a callback with the signature of a sounddevice input callback,
+    so the microphone and recorded audio take the same path through voice activity detection and transcription.
+    """
+    @abstractmethod
+    def start(self, sampling_rate: int, chunk_size: int, callback: AudioCallback) -> None:
+        """Starts delivering audio to the callback from a background thread
+
+        Args:
+            sampling_rate (int): The sampling rate the audio is delivered at
+            chunk_size (int): The number of samples per block
+            callback (AudioCallback): Called with every block of audio
+        """
+        pass
+
+    @abstractmethod
+    def stop(self) -> None:
+        """Stops delivering audio. Does nothing if the source is not running"""
+        pass
+
+
+class MicrophoneSource(AudioSource):
+    """Records from the default input device"""
+    def __init__(self) -> None:
+        self.__stream = None
+
+    def start(self, sampling_rate: int, chunk_size: int, callback: AudioCallback) -> None:
+        from sounddevice import InputStream
+        self.__stream = InputStream(
+            samplerate=sampling_rate,
+            channels=1,
+            blocksize=chunk_size,
+            dtype=np.float32,
+            callback=callback,
+            latency = 'low'
+        )
+        self.__stream.start()
+
+    def stop(self) -> None:
+        if self.__stream:
+            self.__stream.stop()
+            self.__stream.close()
+            self.__stream = None
+
+
+class GeneratorSource(AudioSource):
+    """Replays audio from an iterable of sample arrays, eg to test or benchmark speech-to-text without a microphone
+
+    The arrays can be of any length, they are split into blocks of the requested chunk size. The last block is padded with silence.
+    Blocks are delivered at the pace a microphone would deliver them (or faster, see `speed`), each one once the audio it contains would have been recorded.
+    """
+    def __init__(self, audio: Iterable[np.ndarray], speed: float = 1.0, trailing_silence_seconds: float = 0) -> None:
+        """
+        Args:
+            audio (Iterable[np.ndarray]): Mono float32 samples at the sampling rate passed to start(). A generator can only be replayed once
+            speed (float, optional): 1 for real time, 2 for twice as fast etc. 0 delivers the audio as fast as the callback takes it. Defaults to 1.0.
+            trailing_silence_seconds (float, optional): Seconds of silence delivered after the audio, eg for the end of speech to be detected. Defaults to 0.
+        """
+        self.__audio: Iterable[np.ndarray] = audio
+        self.__speed: float = speed
+        self.__trailing_silence_seconds: float = trailing_silence_seconds
+        self.__thread: threading.Thread | None = None
+        self.__stop_requested = threading.Event()
+        self.__finished = threading.Event()
+        self.__audio_end_time: float | None = None
+
+    @property
+    def is_finished(self) -> bool:
+        """Whether all audio (and the trailing silence) has been delivered"""
+        return self.__finished.is_set()
+
+    @property
+    def audio_end_time(self) -> float | None:
+        """`time.perf_counter()` of when the block with the last sample of the audio (ie before the trailing silence) was delivered"""
+        return self.__audio_end_time
+
+    def wait_until_finished(self, timeout: float | None = None) -> bool:
+        return self.__finished.wait(timeout)
+
+    def start(self, sampling_rate: int, chunk_size: int, callback: AudioCallback) -> None:
+        self.stop()
+        self.__stop_requested.clear()
+        self.__finished.clear()
+        self.__audio_end_time = None
+        self.__thread = threading.Thread(target=self.__deliver, args=(sampling_rate, chunk_size, callback), daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        self.__stop_requested.set()
+        if self.__thread and self.__thread is not threading.current_thread():
+            self.__thread.join()
+        self.__thread = None
+
+    def _get_audio(self, sampling_rate: int) -> Iterable[np.ndarray]:
+        """Returns the audio to replay at the given sampling rate"""
+        return self.__audio
+
+    def __deliver(self, sampling_rate: int, chunk_size: int, callback: AudioCallback):
+        chunk_duration = chunk_size / sampling_rate
+        start_time = time.perf_counter()
+        chunk_count = 0
+        for chunk, is_audio in self.__get_chunks(sampling_rate, chunk_size):
+            if self.__stop_requested.is_set():
+                return
+            chunk_count += 1
+            if self.__speed > 0:
+                delay = start_time + chunk_count * chunk_duration / self.__speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            callback(chunk.reshape(-1, 1), chunk_size, None, None)
+            if is_audio:
+                self.__audio_end_time = time.perf_counter()
+        self.__finished.set()
+
+    def __get_chunks(self, sampling_rate: int, chunk_size: int) -> Iterator[tuple[np.ndarray, bool]]:
+        """Splits the audio into blocks of chunk_size samples, followed by blocks of trailing silence
+
+        Yields:
+            tuple[np.ndarray, bool]: the block and whether it contains any of the audio
+        """
+        pending = np.zeros(0, dtype=np.float32)
+        for samples in self._get_audio(sampling_rate):
+            pending = np.concatenate((pending, np.asarray(samples, dtype=np.float32).reshape(-1)))
+            while len(pending) >= chunk_size:
+                yield pending[:chunk_size], True
+                pending = pending[chunk_size:]
+        if len(pending) > 0:
+            yield np.concatenate((pending, np.zeros(chunk_size - len(pending), dtype=np.float32))), True
+        for _ in range(math.ceil(self.__trailing_silence_seconds * sampling_rate / chunk_size)):
+            yield np.zeros(chunk_size, dtype=np.float32), False
+
+
+class ArraySource(GeneratorSource):
+    """Replays a numpy array of audio, resampled to the sampling rate the Transcriber listens at"""
+    def __init__(self, audio: np.ndarray, sampling_rate: int, speed: float = 1.0, trailing_silence_seconds: float = 0) -> None:
+        """
+        Args:
+            audio (np.ndarray): The samples, either mono or of shape (samples, channels). Channels are mixed down to mono
+            sampling_rate (int): The sampling rate of the audio
+            speed (float, optional): See GeneratorSource. Defaults to 1.0.
+            trailing_silence_seconds (float, optional): See GeneratorSource. Defaults to 0.
+        """
+        super().__init__([], speed, trailing_silence_seconds)
+        audio = np.asarray(audio, dtype=np.float32)
+        self.__samples: np.ndarray = audio.mean(axis=1) if audio.ndim > 1 else audio
+        self.__sampling_rate: int = sampling_rate
+
+    @property
+    def duration(self) -> float:
+        """Seconds of audio, without the trailing silence"""
+        return len(self.__samples) / self.__sampling_rate
+
+    def _get_audio(self, sampling_rate: int) -> Iterable[np.ndarray]:
+        if sampling_rate == self.__sampling_rate:
+            return [self.__samples]
+        divisor = math.gcd(sampling_rate, self.__sampling_rate)
+        return [resample_poly(self.__samples, sampling_rate // divisor, self.__sampling_rate // divisor).astype(np.float32)]
+
+
+class WavFileSource(ArraySource):
+    """Replays an audio file (eg a .wav recording of the player), resampled to the sampling rate the Transcriber listens at"""
+    def __init__(self, file_path: str, speed: float = 1.0, trailing_silence_seconds: float = 0) -> None:
+        """
+        Args:
+            file_path (str): Path to the audio file
+            speed (float, optional): See GeneratorSource. Defaults to 1.0.
+            trailing_silence_seconds (float, optional): See GeneratorSource. Defaults to 0.
+        """
+        audio, sampling_rate = sf.read(file_path, dtype='float32', always_2d=True)
+        super().__init__(audio, sampling_rate, speed, trailing_silence_seconds)
+        self.__file_path: str = file_path
+
+    @property
+    def file_path(self) -> str:
+        return self.__file_path
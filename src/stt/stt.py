@@ -4,23 +4,24 @@ from faster_whisper import WhisperModel
 from src.config.config_loader import ConfigLoader
 from src.llm.client_base import ClientBase
 from src.stt.ptt_controller import PTTController
+from src.stt.audio_buffer import AudioBuffer
+from src.stt.audio_source import AudioSource, MicrophoneSource
 import src.utils as utils
 import requests
 import json
 import io
 from pathlib import Path
 from openai import OpenAI
-from typing import Optional, TYPE_CHECKING
+from typing import Callable, Optional
 from datetime import datetime
 import queue
 import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 import time
 import os
 import wave
 import onnxruntime as ort
 from scipy.io import wavfile
-if TYPE_CHECKING:
-    from sounddevice import InputStream
 from silero_vad_lite import SileroVAD
 
 logger = utils.get_logger()
@@ -45,9 +46,18 @@ class Transcriber:
     CHUNK_DURATION = CHUNK_SIZE / SAMPLING_RATE  # Explicit calculation of chunk duration in seconds
     LOOKBACK_CHUNKS = 5  # Number of chunks to keep in buffer when not recording
     MIN_PTT_DURATION = 0.3  # Minimum seconds of audio to accept from a PTT press
+    INITIAL_BUFFER_SECONDS = 31  # Seconds of audio to allocate the audio buffer for up front, it grows if an utterance is longer
+    INCREMENTAL_OVERLAP_SECONDS = 0.5  # Seconds of already committed audio that are transcribed again for context in incremental mode
+    INCREMENTAL_COMMIT_MARGIN_SECONDS = 1.0  # Words ending closer than this to the end of the audio are not committed yet, as they can still change
+    SPECULATION_POLL_SECONDS = 0.05  # How often to check for a pause in speech while waiting for a transcription with on_speech_paused
     
     @utils.time_it
-    def __init__(self, config: ConfigLoader):
+    def __init__(self, config: ConfigLoader, audio_source: AudioSource | None = None):
+        """
+        Args:
+            config (ConfigLoader): The config to load the STT settings from
+            audio_source (AudioSource | None, optional): Where to listen for speech, eg a recording for benchmarks. Defaults to None for the microphone.
+        """
         self.loglevel = 27
         self.language = config.stt_language
         self.task = "translate" if config.stt_translate == 1 else "transcribe"
@@ -69,6 +79,9 @@ class Transcriber:
         self.proactive_mic_mode = config.proactive_mic_mode
         self.min_refresh_secs = config.min_refresh_secs # Minimum time between transcription updates
         self.refresh_freq = self.min_refresh_secs // self.CHUNK_DURATION # Number of chunks between transcription updates
+        self.incremental_transcription = config.incremental_transcription
+        # Text (and the audio it covers) of the current utterance that incremental transcription no longer changes: (utterance id, text, samples)
+        self._committed_transcription: tuple[int, str, int] = (-1, '', 0)
         self.pause_threshold = config.pause_threshold
         self._temporary_pause_override: float | None = None  # Temporary pause threshold for Listen action
         self.audio_threshold = config.audio_threshold
@@ -136,35 +149,85 @@ class Transcriber:
         self.vad = SileroVAD(self.SAMPLING_RATE)
         
         # Audio processing state
-        self._audio_buffer = np.array([], dtype=np.float32)
+        self._audio_buffer = AudioBuffer(int(min(self.listen_timeout + 1, self.INITIAL_BUFFER_SECONDS) * self.SAMPLING_RATE))
         self._audio_queue = queue.Queue()
-        self._stream: Optional[InputStream] = None
+        self.__audio_source: AudioSource = audio_source if audio_source else MicrophoneSource()
         
         # Threading and synchronization
         self._lock = threading.Lock()
         self._processing_thread: Optional[threading.Thread] = None
         self._running = False
+        # Transcription runs on its own thread, so audio keeps being captured and checked for speech while the model is busy
+        self._transcription_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='Transcription')
+        self._refresh_future: Future | None = None # proactive transcription of the current utterance that is in progress
+        self._utterance_id = 0 # changes whenever the audio buffer starts a new utterance, so late results of an old one are dropped
         
         # Speech detection state
         self._speech_detected = False
+        self._speech_paused = False # speech has been detected, but the latest chunks are silent
+        self._pause_start_samples = 0 # length of the audio buffer when the current pause started
+        self._transcribed_samples = 0 # length of the audio buffer the current proactive transcription covers
         self._speech_end_time = 0
         self._last_update_time = 0
         self._current_transcription = ""
         self._transcription_ready = threading.Event()
         self._consecutive_empty_count = 0
         self._max_consecutive_empty = 10
+        self.__on_speech_end: Callable[[], None] | None = None
+        self.__on_utterance_transcribed: Callable[[str | None], None] | None = None
 
     @property
     def is_listening(self) -> bool:
         """Returns True if actively listening."""
         return self._processing_thread is not None and self._processing_thread.is_alive()
 
+    @property
+    def audio_source(self) -> AudioSource:
+        return self.__audio_source
+
+    @audio_source.setter
+    def audio_source(self, audio_source: AudioSource):
+        """Changes where to listen for speech. Takes effect the next time listening starts"""
+        self.__audio_source = audio_source
+
     @property
     def has_player_spoken(self) -> bool:
         """Check if speech has been detected."""
         with self._lock:
             return self._speech_detected
     
+    @property
+    def temporary_pause(self) -> float | None:
+        """The pause threshold override set by set_temporary_pause, or None"""
+        with self._lock:
+            return self._temporary_pause_override
+
+    @temporary_pause.setter
+    def temporary_pause(self, pause_seconds: float | None):
+        """Restores a pause threshold override, eg one read from temporary_pause before it was changed"""
+        with self._lock:
+            self._temporary_pause_override = pause_seconds
+
+    def set_on_speech_end(self, callback: Callable[[], None] | None) -> None:
+        """Set a callback to be invoked whenever the end of an utterance is detected, before its final transcription starts
+
+        Called on the audio processing thread, so it must return quickly. Eg to measure how long the end of speech takes to detect.
+
+        Args:
+            callback: Function without arguments, or None to remove the callback
+        """
+        self.__on_speech_end = callback
+
+    def set_on_utterance_transcribed(self, callback: Callable[[str | None], None] | None) -> None:
+        """Set a callback to be invoked whenever the final transcription of an utterance is ready
+
+        Called on the transcription thread, after get_latest_transcription has been notified.
+
+        Args:
+            callback: Function that accepts the transcription, None if nothing could be transcribed. None to remove the callback
+        """
+        self.__on_utterance_transcribed = callback
+
     def set_temporary_pause(self, pause_seconds: float) -> None:
         """Set a temporary pause threshold override for the next transcription
         
@@ -221,12 +284,19 @@ If you would prefer to run speech-to-text locally, please ensure the `Speech-to-
 
 
     @utils.time_it
-    def _transcribe(self, audio: np.ndarray) -> str:
-        """Transcribe audio using Moonshine model."""
+    def _transcribe(self, audio: np.ndarray, utterance_id: int | None = None) -> str:
+        """Transcribe audio using Moonshine model.
+
+        Args:
+            audio: The audio of the utterance so far.
+            utterance_id: Set for proactive transcription updates, which can then be transcribed incrementally.
+        """
         # Count speech end time from when the last transcribe is called
         self._speech_end_time = time.time()
         if self.stt_service == 'moonshine':
             transcription = self.moonshine_transcribe(audio)
+        elif utterance_id is not None and self.incremental_transcription and self.transcribe_model:
+            transcription = self.whisper_transcribe_incremental(audio, utterance_id)
         else:
             transcription = self.whisper_transcribe(audio, self.prompt)
 
@@ -295,6 +365,39 @@ If you would prefer to run speech-to-text locally, please ensure the `Speech-to-
                 return response_data['text'].strip()
             
 
+    @utils.time_it
+    def whisper_transcribe_incremental(self, audio: np.ndarray, utterance_id: int) -> str:
+        """Transcribes the utterance so far with the local Whisper model, reusing the text committed by earlier updates of the same utterance
+
+        Only the audio after the committed text (plus a short overlap for context) is transcribed. Words centred in the overlap are dropped, as they
+        are already part of the committed text. Their timestamps shift a little between passes, so a word ending just past the overlap is still dropped. Words that end well before the end of the audio are committed for the next update.
+        """
+        committed_utterance_id, committed_text, committed_samples = self._committed_transcription
+        if committed_utterance_id != utterance_id:
+            committed_text, committed_samples = '', 0
+
+        window_start = max(0, committed_samples - int(self.INCREMENTAL_OVERLAP_SECONDS * self.SAMPLING_RATE))
+        window = audio[window_start:]
+        overlap_seconds = (committed_samples - window_start) / self.SAMPLING_RATE
+        prompt = f'{self.prompt} {committed_text}'.strip()
+        segments, _ = self.transcribe_model.transcribe(window, task=self.task, language=self.language, beam_size=5, vad_filter=False, initial_prompt=prompt, word_timestamps=True)
+        words = [word for segment in segments for word in (segment.words or []) if (word.start + word.end) / 2 > overlap_seconds]
+
+        commit_limit = len(window) / self.SAMPLING_RATE - self.INCREMENTAL_COMMIT_MARGIN_SECONDS
+        committed_word_count = 0
+        while committed_word_count < len(words) and words[committed_word_count].end <= commit_limit:
+            committed_word_count += 1
+        if committed_word_count > 0:
+            committed_text += ''.join(word.word for word in words[:committed_word_count])
+            committed_samples = window_start + int(words[committed_word_count - 1].end * self.SAMPLING_RATE)
+        self._committed_transcription = (utterance_id, committed_text, committed_samples)
+
+        result_text = (committed_text + ''.join(word.word for word in words[committed_word_count:])).strip()
+        if utils.clean_text(result_text) in self.__ignore_list: # common phrases hallucinated by Whisper
+            return ''
+        return result_text
+
+
     @utils.time_it
     def moonshine_transcribe(self, audio: np.ndarray) -> str:
         """Transcribe audio using Moonshine model"""
@@ -331,16 +434,7 @@ If you would prefer to run speech-to-text locally, please ensure the `Speech-to-
         self.prompt = prompt
         
         # Start audio stream
-        from sounddevice import InputStream
-        self._stream = InputStream(
-            samplerate=self.SAMPLING_RATE,
-            channels=1,
-            blocksize=self.CHUNK_SIZE,
-            dtype=np.float32,
-            callback=self._create_input_callback(self._audio_queue),
-            latency = 'low'
-        )
-        self._stream.start()
+        self.__audio_source.start(self.SAMPLING_RATE, self.CHUNK_SIZE, self._create_input_callback(self._audio_queue))
         
         # Start processing thread
         self._processing_thread = threading.Thread(
@@ -383,20 +477,66 @@ If you would prefer to run speech-to-text locally, please ensure the `Speech-to-
 
 
     def _finalize_transcription(self, *, transcribe: bool = True, save: bool = True) -> None:
-        """Transcribe buffered audio, signal readiness, and reset state.
+        """Hand the buffered audio to the transcription worker, which signals readiness once done, and reset state.
 
         Must be called while holding ``self._lock``.
 
         Args:
-            transcribe: Whether to run transcription on the current buffer.
+            transcribe: Whether to run transcription on the current buffer. If not, the latest proactive transcription is used.
             save: Whether to save the audio buffer to disk (if ``save_mic_input`` also set).
         """
-        if transcribe and len(self._audio_buffer) > 0:
-            self._current_transcription = self._transcribe(self._audio_buffer)
-        if save and self.__save_mic_input and len(self._audio_buffer) > 0:
-            self._save_audio(self._audio_buffer)
-        self._transcription_ready.set()
+        audio = self._audio_buffer.snapshot() if len(self._audio_buffer) > 0 else None
+        audio_to_transcribe = audio if transcribe else None
+        audio_to_save = audio if save and self.__save_mic_input else None
+        self._transcription_executor.submit(self._complete_utterance, audio_to_transcribe, audio_to_save, self._refresh_future)
         self._reset_state()
+        if self.__on_speech_end:
+            self.__on_speech_end()
+
+
+    def _complete_utterance(self, audio_to_transcribe: np.ndarray | None, audio_to_save: np.ndarray | None, refresh_future: Future | None) -> None:
+        """Runs on the transcription worker. Produces the final transcription of an utterance and signals readiness
+
+        Args:
+            audio_to_transcribe: The audio of the utterance, or None to use the latest proactive transcription.
+            audio_to_save: The audio to save to disk, or None.
+            refresh_future: The last proactive transcription of the utterance. The worker runs one job at a time, so it has finished by now.
+        """
+        transcription: str | None = None
+        try:
+            if audio_to_transcribe is not None:
+                transcription = self._transcribe(audio_to_transcribe)
+            elif refresh_future is not None and not refresh_future.cancelled() and refresh_future.exception() is None:
+                transcription = refresh_future.result()
+            if audio_to_save is not None:
+                self._save_audio(audio_to_save)
+        except Exception as e:
+            logger.log(23, f'STT WARNING: Error transcribing mic input: {str(e)}')
+        with self._lock:
+            if transcription:
+                self._current_transcription = transcription
+            self._transcription_ready.set()
+        if self.__on_utterance_transcribed:
+            self.__on_utterance_transcribed(transcription)
+
+
+    def _refresh_transcription(self, audio: np.ndarray, utterance_id: int) -> str:
+        """Runs on the transcription worker. Transcribes the utterance so far in proactive mode
+
+        Returns:
+            The interim transcription
+        """
+        transcription = self._transcribe(audio, utterance_id)
+        with self._lock:
+            if utterance_id != self._utterance_id:
+                return transcription # The utterance has ended in the meantime, its final transcription takes the result from the returned future
+            self._current_transcription = transcription
+            self._transcribed_samples = len(audio)
+            if self._consecutive_empty_count >= self._max_consecutive_empty:
+                logger.warning(f'Could not transcribe input')
+                self._transcription_ready.set()
+                self._reset_state()
+        return transcription
 
 
     def _process_ptt_chunk(self, chunk: np.ndarray) -> None:
@@ -411,7 +551,7 @@ If you would prefer to run speech-to-text locally, please ensure the `Speech-to-
 
         if is_pressed:
             # Accumulate audio while key is held
-            self._audio_buffer = np.concatenate((self._audio_buffer, chunk))
+            self._audio_buffer.append(chunk)
             if not self._ptt_active:
                 logger.log(self.loglevel, 'PTT pressed')
                 self._ptt_active = True
@@ -429,7 +569,7 @@ If you would prefer to run speech-to-text locally, please ensure the `Speech-to-
                 self._reset_state()
         else:
             # Idle: clear buffer so stale data doesn't accumulate
-            self._audio_buffer = np.array([], dtype=np.float32)
+            self._audio_buffer.clear()
 
         # Timeout guard: prevent unbounded buffering from a stuck key
         if self._ptt_active and (len(self._audio_buffer) / self.SAMPLING_RATE) > self.listen_timeout:
@@ -451,16 +591,17 @@ If you would prefer to run speech-to-text locally, please ensure the `Speech-to-
             The (possibly reset) chunk_count for the caller to carry forward.
         """
         # Update audio buffer
-        self._audio_buffer = np.concatenate((self._audio_buffer, chunk))
+        self._audio_buffer.append(chunk)
         if not self._speech_detected:
             # Keep limited lookback buffer when not recording
-            self._audio_buffer = self._audio_buffer[-lookback_size:]
+            self._audio_buffer.keep_last(lookback_size)
 
         # Process with VAD
         probability = self.vad.process(chunk)
 
         if probability > self.audio_threshold:
             self._last_update_time = time.time()
+            self._speech_paused = False
 
         if probability > self.audio_threshold and not self._speech_detected:
             logger.log(self.loglevel, 'Speech detected')
@@ -475,22 +616,22 @@ If you would prefer to run speech-to-text locally, please ensure the `Speech-to-
             return chunk_count
         chunk_count += 1
 
+        if probability <= self.audio_threshold and not self._speech_paused:
+            self._speech_paused = True
+            self._pause_start_samples = len(self._audio_buffer)
+        is_pause_transcribed = not self._speech_paused or self._transcribed_samples >= self._pause_start_samples
+
         # Check for maximum speech duration
         if (len(self._audio_buffer) / self.SAMPLING_RATE) > self.listen_timeout:
             logger.warning(f'Listen timeout of {self.listen_timeout} seconds reached. Processing mic input...')
             self._finalize_transcription(save=False)
             return chunk_count
 
-        # Periodic proactive transcription update
-        if self.proactive_mic_mode and chunk_count >= self.refresh_freq:
+        # Periodic proactive transcription update, and one as soon as the player pauses so the interim transcription covers everything they said.
+        # Skipped while the previous one is still running, so slow transcriptions do not pile up
+        if self.proactive_mic_mode and (chunk_count >= self.refresh_freq or not is_pause_transcribed) and (self._refresh_future is None or self._refresh_future.done()):
             logger.debug(f'Transcribing {self.min_refresh_secs} of mic input...')
-            self._current_transcription = self._transcribe(self._audio_buffer)
-
-            if self._consecutive_empty_count >= self._max_consecutive_empty:
-                logger.warning(f'Could not transcribe input')
-                self._transcription_ready.set()
-                self._reset_state()
-
+            self._refresh_future = self._transcription_executor.submit(self._refresh_transcription, self._audio_buffer.snapshot(), self._utterance_id)
             chunk_count = 0
 
         return chunk_count
@@ -516,7 +657,11 @@ If you would prefer to run speech-to-text locally, please ensure the `Speech-to-
             self._ptt_active = False
         except Exception:
             pass
-        self._audio_buffer = np.array([], dtype=np.float32)
+        self._audio_buffer.clear()
+        self._refresh_future = None
+        self._utterance_id += 1
+        self._speech_paused = False
+        self._transcribed_samples = 0
         self.vad = SileroVAD(self.SAMPLING_RATE)
         self._consecutive_empty_count = 0
 
@@ -534,12 +679,47 @@ If you would prefer to run speech-to-text locally, please ensure the `Speech-to-
             wf.writeframes(audio_int16.tobytes())
 
 
+    def get_speculative_transcription(self) -> str | None:
+        """Returns the proactive transcription of the current utterance if the player is pausing and it covers everything said before the pause
+
+        The player may still continue speaking, so the transcription can turn out to be incomplete.
+        """
+        with self._lock:
+            if self._speech_detected and self._speech_paused and self._transcribed_samples >= self._pause_start_samples and self._current_transcription:
+                return self._current_transcription
+            return None
+
+
+    def __wait_for_transcription(self, timeout: float | None, on_speech_paused: Callable[[str], None] | None) -> bool:
+        """Waits until a transcription is ready. If on_speech_paused is set, it is called with the speculative transcription whenever the player pauses after saying something new
+
+        Returns:
+            Whether a transcription is ready
+        """
+        if on_speech_paused is None:
+            return self._transcription_ready.wait(timeout=timeout)
+
+        deadline = None if timeout is None else time.time() + timeout
+        last_speculative_transcription = None
+        while True:
+            wait_seconds = self.SPECULATION_POLL_SECONDS if deadline is None else min(self.SPECULATION_POLL_SECONDS, deadline - time.time())
+            if wait_seconds <= 0:
+                return self._transcription_ready.is_set()
+            if self._transcription_ready.wait(timeout=wait_seconds):
+                return True
+            speculative_transcription = self.get_speculative_transcription()
+            if speculative_transcription and speculative_transcription != last_speculative_transcription:
+                last_speculative_transcription = speculative_transcription
+                on_speech_paused(speculative_transcription)
+
+
     @utils.time_it
-    def get_latest_transcription(self, silence_timeout: float = 0) -> str | None:
+    def get_latest_transcription(self, silence_timeout: float = 0, on_speech_paused: Callable[[str], None] | None = None) -> str | None:
         """Get the latest transcription, blocking until speech ends or silence timeout
         
         Args:
             silence_timeout: How long to wait (in seconds) for speech before returning None. If 0 or negative, waits indefinitely.
+            on_speech_paused: Called on the waiting thread with the speculative transcription (see get_speculative_transcription) whenever the player pauses after saying something new. Proactive mode only.
         
         Returns:
             The transcribed text, or None if silence_timeout elapsed without any speech being detected
@@ -549,7 +729,7 @@ If you would prefer to run speech-to-text locally, please ensure the `Speech-to-
             use_timeout = silence_timeout > 0 and not self._speech_detected
             timeout_value = silence_timeout if use_timeout else None
             
-            received_transcription = self._transcription_ready.wait(timeout=timeout_value)
+            received_transcription = self.__wait_for_transcription(timeout_value, on_speech_paused)
             
             if not received_transcription and use_timeout and not self._speech_detected:
                 logger.log(self.loglevel, f"Silence timeout of {silence_timeout} seconds reached without speech")
@@ -585,10 +765,7 @@ If you would prefer to run speech-to-text locally, please ensure the `Speech-to-
         self._speech_detected = False
         
         # Stop and clean up audio stream
-        if self._stream:
-            self._stream.stop()
-            self._stream.close()
-            self._stream = None
+        self.__audio_source.stop()
         
         # Wait for processing thread to finish
         if self._processing_thread:
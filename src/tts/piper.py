@@ -6,11 +6,13 @@ import time
 import wave
 from src import utils
 import sys
-from threading import Thread
+from threading import Thread, Lock, Event
 from queue import Queue, Empty
 from src.tts.synthesization_options import SynthesizationOptions
+from src.tts.piper_onnx_engine import PiperOnnxEngine
 from src.games.gameable import Gameable
 from pathlib import Path
+from collections import OrderedDict
 
 # https://stackoverflow.com/a/4896288/25532567
 ON_POSIX = 'posix' in sys.builtin_module_names
@@ -18,19 +20,60 @@ ON_POSIX = 'posix' in sys.builtin_module_names
 logger = utils.get_logger()
 
 
-def enqueue_output(out, queue, stop_flag):
+PIPER_EXITED = object() # put on the output queue once Piper's stdout closes, so waits on the queue end right away when the process stops
+
+def enqueue_output(out, queue, stop_event: Event):
     for line in iter(out.readline, ''):
         queue.put(line)
-        if stop_flag():
+        if stop_event.is_set():
             break
     out.close()
+    queue.put(PIPER_EXITED)
+
+def stop_piper_process(process: subprocess.Popen, t: Thread, stop_event: Event):
+    """Terminates a piper.exe process and waits for the thread reading its stdout to end"""
+    stop_event.set()
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+    if t.is_alive():
+        t.join(timeout=5)
 
 class TTSServiceFailure(Exception):
     pass
 
+class PiperWorker:
+    """A piper.exe process that is kept running in the background with a voice model loaded, while another process is in use
+    """
+    def __init__(self, voice: str, process: subprocess.Popen, q: Queue, t: Thread, stop_event: Event, is_loading: bool = False) -> None:
+        self.voice: str = voice
+        self.process: subprocess.Popen = process
+        self.q: Queue = q
+        self.t: Thread = t
+        self.stop_event: Event = stop_event # stops the thread reading the stdout of this process only
+        self.is_loading: bool = is_loading # the voice model was preloaded and Piper has not confirmed it is loaded yet
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def stop(self):
+        stop_piper_process(self.process, self.t, self.stop_event)
+
 class Piper(TTSable):
     """Piper TTS handler
     """
+    # Longest wait for a voiceline before Piper is restarted
+    __SYNTHESIS_TIMEOUT: float = 5
+    # Longest wait on stdout before looking at the output file, in case Piper does not report a finished voiceline
+    __FILE_CHECK_INTERVAL: float = 0.02
+    # Longest wait for a preloaded voice model to finish loading before its process is reused for another voice
+    __MODEL_LOAD_TIMEOUT: float = 5
+    # Upper bound for a single wait on stdout while waiting for a voice model to load
+    __MAX_OUTPUT_WAIT: float = 0.5
+
     @utils.time_it
     def __init__(self, config: ConfigLoader, game: Gameable) -> None:
         super().__init__(config)
@@ -43,9 +86,22 @@ class Piper(TTSable):
         self.__waiting_for_voice_load = False
         self._current_actor_gender = None
         self._current_actor_race = None
+        self.__engine: PiperOnnxEngine | None = None
+        # Piper.exe processes that keep the voice models of recent speakers loaded, least recently used first. The active process is not part of it
+        self.__max_workers: int = config.piper_loaded_voices
+        self.__parked_workers: OrderedDict[str, PiperWorker] = OrderedDict()
+        self.__workers_lock = Lock() # voices are preloaded from a background thread
+
+        if config.piper_backend == 'in-process':
+            if PiperOnnxEngine.is_available():
+                logger.log(self._loglevel, f'Running Piper in-process...')
+                self.__engine = PiperOnnxEngine(self.__models_path, config.piper_loaded_voices)
+            else:
+                logger.warning("piper_phonemize is not available, falling back to piper.exe. Please install piper-phonemize to run Piper in-process")
 
-        logger.log(self._loglevel, f'Connecting to Piper...')
-        self._check_if_piper_is_running()
+        if not self.__engine:
+            logger.log(self._loglevel, f'Connecting to Piper...')
+            self._check_if_piper_is_running()
 
         self.__available_models = self.get_available_models(self.__models_path)
 
@@ -83,36 +139,38 @@ class Piper(TTSable):
         voiceline = voiceline.replace('*','') # Drop *. Piper reads them aloud. "*She waves.*" -> "Asterisk She waves. Asterisk"
         voiceline = voiceline.replace('\n', ' ').replace('\r', ' ')
 
+        if self.__engine:
+            self.__synthesize_in_process(voiceline, final_voiceline_file)
+            return
+
         attempts = 0
         max_attempts = 5
         while attempts < max_attempts:
+            self.__clear_output()
             self.__write_to_stdin(f"synthesize {voiceline}\n")
-            max_wait_time = 5
             start_time = time.time()
 
             crashed = False
-            while time.time() - start_time < max_wait_time:
+            while True:
+                remaining_time = self.__SYNTHESIS_TIMEOUT - (time.time() - start_time)
+                if remaining_time <= 0:
+                    break
+                # Output from Piper (eg a finished voiceline or its stdout closing) ends the wait right away
+                line = self.__wait_for_output(min(remaining_time, self.__FILE_CHECK_INTERVAL))
                 exit_code = self.process.poll()
-                if exit_code is not None and exit_code != 0:
-                    logger.error(f"Piper process has crashed with exit code: {exit_code}")
+                if line is PIPER_EXITED or exit_code is not None:
+                    logger.error(f"Piper process has stopped with exit code: {exit_code}")
                     self._run_piper()
                     if self.__selected_voice:
                         self.change_voice(self.__selected_voice)
                         self._check_voice_changed()
                     crashed = True
                     break
-                elif os.path.exists(final_voiceline_file):
-                    try: # don't just check if .wav exists, check if it has contents
-                        with wave.open(final_voiceline_file, 'rb') as wav_file:
-                            frames = wav_file.getnframes()
-                            rate = wav_file.getframerate()
-                            duration = frames / float(rate) if rate else 0.0
-                            logger.debug(f'"{voiceline}" is {duration} seconds long')
-                            if duration > 0:
-                                return
-                    except:
-                        pass
-                time.sleep(0.01)
+
+                duration = self.__get_voiceline_duration(final_voiceline_file)
+                if duration > 0:
+                    logger.debug(f'"{voiceline}" is {duration} seconds long, synthesized in {time.time() - start_time:.3f} seconds')
+                    return
 
             if crashed:
                 attempts += 1
@@ -132,31 +190,89 @@ class Piper(TTSable):
         )
         raise TTSServiceFailure(f"Piper failed after {attempts} attempts (timeout/crash)")
     
+    def __get_voiceline_duration(self, voiceline_file: str) -> float:
+        """Returns the length of the synthesized audio, 0 if the file has not been (completely) written yet"""
+        if not os.path.exists(voiceline_file):
+            return 0.0
+        try: # don't just check if .wav exists, check if it has contents
+            with wave.open(voiceline_file, 'rb') as wav_file:
+                frames = wav_file.getnframes()
+                rate = wav_file.getframerate()
+                return frames / float(rate) if rate else 0.0
+        except:
+            return 0.0
+
+    def __wait_for_output(self, timeout: float) -> str | object | None:
+        """Blocks until Piper writes a line to stdout
+
+        Returns:
+            str | object | None: the line, PIPER_EXITED if the process has stopped, None if nothing was written before the timeout
+        """
+        if timeout <= 0:
+            return None
+        try:
+            return self.q.get(timeout=timeout)
+        except Empty:
+            return None
+
+    def __clear_output(self):
+        """Drops stdout lines of earlier commands, so they are not mistaken for a reply to the next one"""
+        try:
+            while True:
+                self.q.get_nowait()
+        except Empty:
+            pass
+
+    @utils.time_it
+    def __synthesize_in_process(self, voiceline: str, final_voiceline_file: str):
+        """Synthesizes the voiceline with the in-process engine and writes it to final_voiceline_file in a single write"""
+        if not self.__selected_voice:
+            raise TTSServiceFailure("No Piper voice model selected")
+        try:
+            audio, sample_rate = self.__engine.synthesize(self.__selected_voice, voiceline)
+        except Exception as e:
+            logger.error(f"Piper failed to synthesize with voice {self.__selected_voice}: {e}")
+            raise TTSServiceFailure(f"Piper failed to synthesize with voice {self.__selected_voice}") from e
+        if audio.size == 0:
+            raise TTSServiceFailure(f"Piper produced no audio for '{voiceline[:50]}'")
+        with wave.open(final_voiceline_file, 'wb') as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(sample_rate)
+            wav_file.writeframes(audio.tobytes())
+        logger.debug(f'"{voiceline}" is {audio.size / sample_rate} seconds long')
+
     @utils.time_it
     def _check_voice_changed(self, max_retries: int = 5):
+        if self.__engine:
+            return True
         for attempt in range(max_retries + 1):
             max_wait_time = 5
             start_time = time.time()
 
             crashed = False
-            while time.time() - start_time < max_wait_time:
+            while True:
+                remaining_time = max_wait_time - (time.time() - start_time)
+                if remaining_time <= 0:
+                    break
                 exit_code = self.process.poll()
                 if exit_code is not None and exit_code != 0:
                     logger.error(f"Piper process has crashed with exit code: {exit_code}")
                     self.__waiting_for_voice_load = False
                     crashed = True
                     break
-                
-                try:  
-                    line = self.q.get_nowait() # or q.get(timeout=.1)
-                    if "Model loaded" in line:
-                        logger.log(self._loglevel, f'Model {self.__selected_voice} loaded')
-                        self.__waiting_for_voice_load = False
-                        self._last_voice = self.__selected_voice
-                        return True
-                except Empty:
-                    pass
-                time.sleep(0.01)
+
+                line = self.__wait_for_output(min(remaining_time, self.__MAX_OUTPUT_WAIT))
+                if line is PIPER_EXITED:
+                    logger.error(f"Piper process has stopped with exit code: {self.process.poll()}")
+                    self.__waiting_for_voice_load = False
+                    crashed = True
+                    break
+                if line and "Model loaded" in line:
+                    logger.log(self._loglevel, f'Model {self.__selected_voice} loaded in {time.time() - start_time:.3f} seconds')
+                    self.__waiting_for_voice_load = False
+                    self._last_voice = self.__selected_voice
+                    return True
 
             if attempt >= max_retries:
                 break
@@ -203,27 +319,165 @@ class Piper(TTSable):
         if voice_race is not None:
             self._current_actor_race = voice_race
 
-        if self.__waiting_for_voice_load:
+        if self.__engine:
+            logger.log(self._loglevel, 'Loading voice model...')
+            self.__selected_voice = self._select_voice_type(voice, in_game_voice, csv_in_game_voice, advanced_voice_model, self._current_actor_gender, self._current_actor_race)
+            if self.__selected_voice:
+                try:
+                    self.__engine.load_voice(self.__selected_voice)
+                    self._last_voice = self.__selected_voice
+                    logger.log(self._loglevel, f'Model {self.__selected_voice} loaded')
+                except Exception as e:
+                    logger.error(f'Could not load Piper voice model {self.__selected_voice}: {e}')
+        elif self.__waiting_for_voice_load:
             self._check_voice_changed()
         else:
             logger.log(self._loglevel, 'Loading voice model...')
 
-            self.__selected_voice = self._select_voice_type(voice, in_game_voice, csv_in_game_voice, advanced_voice_model, self._current_actor_gender, self._current_actor_race)
+            selected_voice = self._select_voice_type(voice, in_game_voice, csv_in_game_voice, advanced_voice_model, self._current_actor_gender, self._current_actor_race)
+            if self.__switch_worker(selected_voice):
+                if not self.__waiting_for_voice_load:
+                    logger.log(self._loglevel, f'Model {selected_voice} loaded')
+                return
+            self.__selected_voice = selected_voice
             model_path = self.__models_path / f'{self.__selected_voice}.onnx'
 
             self.__write_to_stdin(f"load_model {model_path}\n")
             self.__waiting_for_voice_load = True
 
+    def __switch_worker(self, voice: str | None) -> bool:
+        """Makes the Piper process that should serve a voice the active one.
+        Each of up to piper_loaded_voices processes keeps its voice model loaded, so switching between recent speakers does not reload any model.
+        If no process has the voice loaded, either a new process is started or the process with the least recently used voice is reused.
+
+        Returns:
+            bool: True if the voice is already loaded in the now active process, False if the voice model still needs to be loaded
+        """
+        if self.__max_workers <= 1 or not voice or voice == self.__selected_voice:
+            return False
+
+        with self.__workers_lock:
+            parked_worker = self.__parked_workers.pop(voice, None)
+            if parked_worker and not parked_worker.is_alive():
+                logger.warning(f'Piper process of voice model "{voice}" has stopped, loading it again')
+                parked_worker = None
+
+            if parked_worker:
+                self.__park_active_worker()
+                self.__activate_worker(parked_worker)
+                self.__selected_voice = voice
+                if parked_worker.is_loading:
+                    self.__waiting_for_voice_load = True
+                else:
+                    self._last_voice = voice
+                return True
+
+            if self.__selected_voice and self.process.poll() is None:
+                if 1 + len(self.__parked_workers) < self.__max_workers:
+                    self.__park_active_worker()
+                    self._run_piper()
+                elif len(self.__parked_workers) > 0:
+                    _, least_recently_used_worker = self.__parked_workers.popitem(last=False)
+                    self.__park_active_worker()
+                    if self.__finish_pending_load(least_recently_used_worker):
+                        self.__activate_worker(least_recently_used_worker)
+                    else:
+                        least_recently_used_worker.stop()
+                        self._run_piper()
+            return False
+
+    def __finish_pending_load(self, worker: PiperWorker) -> bool:
+        """Waits for a preloaded voice model to finish loading before the process is given another model.
+        Otherwise Piper's "Model loaded" line for the preloaded model would be taken as confirmation for the next one
+
+        Returns:
+            bool: True if the process is ready for the next model, False if the pending load never finished
+        """
+        if worker.is_loading:
+            start_time = time.time()
+            while True:
+                remaining_time = self.__MODEL_LOAD_TIMEOUT - (time.time() - start_time)
+                if remaining_time <= 0:
+                    return False
+                try:
+                    line = worker.q.get(timeout=remaining_time)
+                except Empty:
+                    return False
+                if line is PIPER_EXITED:
+                    return False
+                if "Model loaded" in line:
+                    break
+            worker.is_loading = False
+        try:
+            while True:
+                worker.q.get_nowait()
+        except Empty:
+            pass
+        return True
+
+    def __park_active_worker(self):
+        if self.__selected_voice:
+            self.__parked_workers[self.__selected_voice] = PiperWorker(self.__selected_voice, self.process, self.q, self.t, self.stop_event)
+
+    def __activate_worker(self, worker: PiperWorker):
+        self.process = worker.process
+        self.q = worker.q
+        self.t = worker.t
+        self.stop_event = worker.stop_event
+        self.__selected_voice = worker.voice
+
+    @utils.time_it
+    def preload_voice(self, voice: str, in_game_voice: str | None = None, csv_in_game_voice: str | None = None, advanced_voice_model: str | None = None, voice_accent: str | None = None, voice_gender: int | None = None, voice_race: str | None = None):
+        selected_voice = self._select_voice_type(voice, in_game_voice, csv_in_game_voice, advanced_voice_model, voice_gender, voice_race)
+        if not selected_voice:
+            return
+
+        if self.__engine:
+            try:
+                self.__engine.load_voice(selected_voice)
+            except Exception as e:
+                logger.warning(f'Could not preload Piper voice model {selected_voice}: {e}')
+            return
+
+        if self.__max_workers <= 1:
+            return
+        with self.__workers_lock:
+            if selected_voice == self.__selected_voice or selected_voice in self.__parked_workers:
+                return
+            if 1 + len(self.__parked_workers) >= self.__max_workers:
+                return # Never push out the voices of recent speakers for a voice that might not be needed
+            process, q, t, stop_event = self.__start_piper_process()
+            model_path = self.__models_path / f'{selected_voice}.onnx'
+            if process.stdin:
+                process.stdin.write(f"load_model {model_path}\n")
+                process.stdin.flush()
+            self.__parked_workers[selected_voice] = PiperWorker(selected_voice, process, q, t, stop_event, is_loading=True)
+            self.__parked_workers.move_to_end(selected_voice, last=False) # Preloaded voices have not been used yet
+        logger.debug(f'Preloading Piper voice model {selected_voice}')
+
+    def _get_cache_voice_model(self, voice: str, in_game_voice: str | None, csv_in_game_voice: str | None, advanced_voice_model: str | None) -> str:
+        selected_voice = self._select_voice_type(voice, in_game_voice, csv_in_game_voice, advanced_voice_model, self._current_actor_gender, self._current_actor_race)
+        if not selected_voice:
+            return ''
+        return self._describe_model_file(str(self.__models_path / f'{selected_voice}.onnx'))
+
+    @property
+    def can_preload_voices(self) -> bool:
+        return self.__engine is not None or self.__max_workers > 1
+
     @utils.time_it
     def _check_if_piper_is_running(self):
         self._run_piper()
         
     @utils.time_it
     def _run_piper(self):
+        self.process, self.q, self.t, self.stop_event = self.__start_piper_process()
+
+    def __start_piper_process(self) -> tuple[subprocess.Popen, Queue, Thread, Event]:
         try:
             command = self.__piper_path / 'piper.exe'
 
-            self.process = subprocess.Popen(
+            process = subprocess.Popen(
                 command, 
                 cwd=self._voiceline_folder, 
                 stdin=subprocess.PIPE, 
@@ -235,11 +489,12 @@ class Piper(TTSable):
                 close_fds=ON_POSIX,
             )
 
-            self.q = Queue()
-            self.stop_thread = False
-            self.t = Thread(target=enqueue_output, args=(self.process.stdout, self.q, lambda: self.stop_thread))
-            self.t.daemon = True # thread dies with the program
-            self.t.start()
+            q = Queue()
+            stop_event = Event()
+            t = Thread(target=enqueue_output, args=(process.stdout, q, stop_event))
+            t.daemon = True # thread dies with the program
+            t.start()
+            return process, q, t, stop_event
         
         except Exception as e:
             utils.play_error_sound()
@@ -249,22 +504,19 @@ class Piper(TTSable):
     @utils.time_it
     def _restart_piper(self):
         """Restart the Piper process and reset all states"""
-        if self.process:
-            self.process.terminate()
-
-        try:
-            self.process.wait(timeout=5)
-        except subprocess.TimeoutExpired:
-            self.process.kill()
-            self.process.wait()
-
-        if hasattr(self, 'q'):
-            with self.q.mutex:
-                self.q.queue.clear()
+        stop_piper_process(self.process, self.t, self.stop_event)
 
-        if hasattr(self, 't') and self.t.is_alive():
-            self.stop_thread = True
-            self.t.join(timeout=5)
-            self.stop_thread = False
+        with self.q.mutex:
+            self.q.queue.clear()
 
         self._run_piper()
+
+    def close(self):
+        """Stops every piper.exe process, including the ones keeping the voice models of recent speakers loaded"""
+        with self.__workers_lock:
+            parked_workers = list(self.__parked_workers.values())
+            self.__parked_workers.clear()
+        for worker in parked_workers:
+            worker.stop()
+        if hasattr(self, 'process'):
+            stop_piper_process(self.process, self.t, self.stop_event)
@@ -0,0 +1,155 @@
+import json
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+import numpy as np
+import onnxruntime as ort
+from src import utils
+
+logger = utils.get_logger()
+
+try:
+    from piper_phonemize import phonemize_espeak, phonemize_codepoints
+    has_piper_phonemize = True
+except ModuleNotFoundError:
+    has_piper_phonemize = False
+
+
+class PiperOnnxVoice:
+    """A Piper voice model loaded into an onnxruntime session, together with the settings from its .onnx.json config
+    """
+    BOS = "^"
+    EOS = "$"
+    PAD = "_"
+
+    def __init__(self, name: str, session: ort.InferenceSession, config: dict) -> None:
+        self.__name: str = name
+        self.__session: ort.InferenceSession = session
+        self.__sample_rate: int = int(config["audio"]["sample_rate"])
+        self.__phoneme_type: str = config.get("phoneme_type", "espeak")
+        self.__espeak_voice: str = config.get("espeak", {}).get("voice", "en-us")
+        self.__phoneme_id_map: dict[str, list[int]] = config["phoneme_id_map"]
+        inference = config.get("inference", {})
+        self.__scales = np.array([inference.get("noise_scale", 0.667), inference.get("length_scale", 1.0), inference.get("noise_w", 0.8)], dtype=np.float32)
+        self.__is_multi_speaker: bool = config.get("num_speakers", 1) > 1
+        self.__input_names: set[str] = {model_input.name for model_input in session.get_inputs()}
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @property
+    def sample_rate(self) -> int:
+        return self.__sample_rate
+
+    def phonemize(self, text: str) -> list[list[str]]:
+        """Splits a text into sentences of phonemes"""
+        if self.__phoneme_type == "text":
+            return phonemize_codepoints(unicodedata.normalize("NFD", text))
+        return phonemize_espeak(text, self.__espeak_voice)
+
+    def phonemes_to_ids(self, phonemes: list[str]) -> list[int]:
+        ids: list[int] = list(self.__phoneme_id_map[self.BOS])
+        for phoneme in phonemes:
+            phoneme_ids = self.__phoneme_id_map.get(phoneme)
+            if phoneme_ids is None:
+                logger.debug(f"Piper voice {self.__name} has no id for phoneme '{phoneme}'")
+                continue
+            ids.extend(phoneme_ids)
+            ids.extend(self.__phoneme_id_map[self.PAD])
+        ids.extend(self.__phoneme_id_map[self.EOS])
+        return ids
+
+    def synthesize_ids(self, phoneme_ids: list[int]) -> np.ndarray:
+        """Runs the voice model on a sentence of phoneme ids
+
+        Returns:
+            np.ndarray: the audio of the sentence as int16 PCM
+        """
+        inputs: dict[str, np.ndarray] = {
+            "input": np.expand_dims(np.array(phoneme_ids, dtype=np.int64), 0),
+            "input_lengths": np.array([len(phoneme_ids)], dtype=np.int64),
+            "scales": self.__scales,
+        }
+        if self.__is_multi_speaker and "sid" in self.__input_names:
+            inputs["sid"] = np.array([0], dtype=np.int64)
+        audio: np.ndarray = self.__session.run(None, inputs)[0].squeeze()
+        return self.__audio_float_to_int16(audio)
+
+    @staticmethod
+    def __audio_float_to_int16(audio: np.ndarray, max_wav_value: float = 32767.0) -> np.ndarray:
+        audio_norm = audio * (max_wav_value / max(0.01, float(np.max(np.abs(audio))) if audio.size > 0 else 0.01))
+        return np.clip(audio_norm, -max_wav_value, max_wav_value).astype(np.int16)
+
+
+class PiperOnnxEngine:
+    """Runs Piper voice models in-process with onnxruntime instead of driving piper.exe
+
+    Up to max_loaded_voices voice models are kept resident, the least recently used one is unloaded when another voice is needed.
+    Audio is returned as PCM in memory. onnxruntime sessions can be run from several threads at once, so different voicelines can be synthesized concurrently.
+    Requires the piper_phonemize package to turn text into phonemes.
+    """
+    def __init__(self, models_path: Path, max_loaded_voices: int = 4) -> None:
+        if not has_piper_phonemize:
+            raise ModuleNotFoundError("piper_phonemize is not available, the in-process Piper engine cannot be used")
+        self.__models_path: Path = models_path
+        self.__max_loaded_voices: int = max(1, max_loaded_voices)
+        self.__voices: OrderedDict[str, PiperOnnxVoice] = OrderedDict()
+        self.__voices_lock = Lock()
+        self.__session_options = ort.SessionOptions()
+        self.__session_options.log_severity_level = 3
+
+    @staticmethod
+    def is_available() -> bool:
+        return has_piper_phonemize
+
+    def is_voice_loaded(self, voice: str) -> bool:
+        with self.__voices_lock:
+            return voice in self.__voices
+
+    @utils.time_it
+    def load_voice(self, voice: str) -> PiperOnnxVoice:
+        """Returns a loaded voice model, loading it if it is not resident yet
+
+        Args:
+            voice (str): the name of the voice model (the .onnx file name without extension)
+        """
+        with self.__voices_lock:
+            loaded_voice = self.__voices.get(voice)
+            if loaded_voice:
+                self.__voices.move_to_end(voice)
+                return loaded_voice
+
+        # Load outside of the lock, so voices that are already resident can be used in the meantime
+        model_path = self.__models_path / f'{voice}.onnx'
+        with open(f'{model_path}.json', 'r', encoding='utf-8') as config_file:
+            config = json.load(config_file)
+        session = ort.InferenceSession(str(model_path), sess_options=self.__session_options, providers=["CPUExecutionProvider"])
+        loaded_voice = PiperOnnxVoice(voice, session, config)
+        logger.debug(f'Loaded Piper voice model {voice}')
+
+        with self.__voices_lock:
+            self.__voices[voice] = loaded_voice
+            self.__voices.move_to_end(voice)
+            while len(self.__voices) > self.__max_loaded_voices:
+                unloaded_voice, _ = self.__voices.popitem(last=False)
+                logger.debug(f'Unloaded Piper voice model {unloaded_voice}')
+        return loaded_voice
+
+    @utils.time_it
+    def synthesize(self, voice: str, text: str) -> tuple[np.ndarray, int]:
+        """Synthesizes a text with a voice model
+
+        Args:
+            voice (str): the name of the voice model
+            text (str): the text to speak
+
+        Returns:
+            tuple[np.ndarray, int]: the audio as int16 PCM and its sample rate
+        """
+        loaded_voice = self.load_voice(voice)
+        sentence_audios = [loaded_voice.synthesize_ids(loaded_voice.phonemes_to_ids(phonemes)) for phonemes in loaded_voice.phonemize(text) if len(phonemes) > 0]
+        if len(sentence_audios) == 0:
+            return np.zeros(0, dtype=np.int16), loaded_voice.sample_rate
+        return np.concatenate(sentence_audios), loaded_voice.sample_rate
@@ -0,0 +1,45 @@
+from src import utils
+
+
+class SynthesisTiming:
+    """How long it took to produce the audio of a voiceline
+    """
+    def __init__(self, voiceline: str, voice: str, voiceline_file: str, synthesis_seconds: float, is_cached: bool) -> None:
+        self.__voiceline: str = voiceline
+        self.__voice: str = voice
+        self.__voiceline_file: str = voiceline_file
+        self.__synthesis_seconds: float = synthesis_seconds
+        self.__is_cached: bool = is_cached
+        self.__audio_seconds: float | None = None
+
+    @property
+    def voiceline(self) -> str:
+        return self.__voiceline
+
+    @property
+    def voice(self) -> str:
+        return self.__voice
+
+    @property
+    def synthesis_seconds(self) -> float:
+        return self.__synthesis_seconds
+
+    @property
+    def is_cached(self) -> bool:
+        return self.__is_cached
+
+    @property
+    def audio_seconds(self) -> float:
+        """The length of the voiceline's audio. Only read from the file when first asked for, to keep it off the synthesis path"""
+        if self.__audio_seconds is None:
+            try:
+                self.__audio_seconds = utils.get_audio_duration(self.__voiceline_file)
+            except Exception:
+                self.__audio_seconds = 0.0
+        return self.__audio_seconds
+
+    @property
+    def real_time_factor(self) -> float:
+        """Synthesis time divided by audio length, below 1 means faster than real time"""
+        audio_seconds = self.audio_seconds
+        return self.__synthesis_seconds / audio_seconds if audio_seconds > 0 else 0.0
@@ -0,0 +1,116 @@
+import time
+from threading import Lock
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+import src.utils as utils
+
+logger = utils.get_logger()
+
+
+class TTSHttpSession:
+    '''Pooled HTTP session to a TTS server (eg XTTS or xVASynth)
+
+    Connections are kept alive and reused between voicelines instead of being set up for every request.
+    Every request has a timeout, so a hung server raises an error instead of stalling voicing forever.
+    Requests that could not reach the server (or that the server rejected as temporarily unavailable) are retried with an increasing delay.
+    The latency of every request is logged.
+    '''
+    RETRY_STATUS_CODES: set[int] = {502, 503, 504}
+
+    def __init__(self, base_url: str, pool_size: int = 8, connect_timeout: float = 5.0, read_timeout: float = 120.0, max_retries: int = 2, backoff_seconds: float = 0.5) -> None:
+        '''
+        Args:
+            base_url (str): The URL of the TTS server, used for logging
+            pool_size (int, optional): Maximum number of connections kept open to the server. Defaults to 8.
+            connect_timeout (float, optional): Seconds to wait for a connection to the server. Defaults to 5.0.
+            read_timeout (float, optional): Seconds to wait for the server to respond. Defaults to 120.0.
+            max_retries (int, optional): How often a request that could not reach the server is retried. Defaults to 2.
+            backoff_seconds (float, optional): Delay before the first retry, doubled for every further retry. Defaults to 0.5.
+        '''
+        self.__base_url: str = base_url
+        self.__connect_timeout: float = connect_timeout
+        self.__read_timeout: float = read_timeout
+        self.__max_retries: int = max_retries
+        self.__backoff_seconds: float = backoff_seconds
+        self.__session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size), max_retries=0)
+        self.__session.mount('http://', adapter)
+        self.__session.mount('https://', adapter)
+
+    @property
+    def read_timeout(self) -> float:
+        return self.__read_timeout
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def request(self, method: str, url: str, timeout: float | tuple[float, float] | None = None, read_timeout: float | None = None, max_retries: int | None = None, **kwargs) -> requests.Response:
+        '''Sends a request to the TTS server
+
+        Args:
+            method (str): The HTTP method
+            url (str): The URL to send the request to
+            timeout (float | tuple[float, float] | None, optional): Overrides the (connect, read) timeout of the session. Defaults to None.
+            read_timeout (float | None, optional): Overrides only the read timeout of the session, eg with the timeout configured for the TTS service sending the request. Defaults to None.
+            max_retries (int | None, optional): Overrides how often the request is retried, eg 0 for health checks that are polled anyway. Defaults to None.
+
+        Raises:
+            requests.exceptions.RequestException: The server could not be reached after all retries or did not respond in time
+        '''
+        if timeout is None:
+            timeout = (self.__connect_timeout, self.__read_timeout if read_timeout is None else read_timeout)
+        if max_retries is None:
+            max_retries = self.__max_retries
+
+        attempt = 0
+        while True:
+            request_start = time.perf_counter()
+            try:
+                response = self.__session.request(method, url, timeout=timeout, **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                # Covers connect timeouts, but not read timeouts: a server that is busy with a request should not get it again
+                logger.debug(f'{method} {url} failed after {time.perf_counter() - request_start:.3f}s: {e}')
+                if attempt >= max_retries:
+                    raise
+            except requests.exceptions.RequestException as e:
+                logger.debug(f'{method} {url} failed after {time.perf_counter() - request_start:.3f}s: {e}')
+                raise
+            else:
+                logger.debug(f'{method} {url} returned {response.status_code} in {time.perf_counter() - request_start:.3f}s')
+                if response.status_code not in self.RETRY_STATUS_CODES or attempt >= max_retries:
+                    return response
+            self.__wait_before_retry(attempt, max_retries)
+            attempt += 1
+
+    def __wait_before_retry(self, attempt: int, max_retries: int):
+        delay = self.__backoff_seconds * (2 ** attempt)
+        logger.debug(f'Retrying request to {self.__base_url} in {delay:.2f}s ({attempt + 1}/{max_retries})')
+        time.sleep(delay)
+
+    def close(self):
+        self.__session.close()
+
+
+_sessions: dict[str, TTSHttpSession] = {}
+_sessions_lock = Lock()
+
+
+def get_tts_http_session(url: str) -> TTSHttpSession:
+    '''Returns the session shared by everything that talks to the TTS server at the given URL. Do not close or reconfigure the returned session,
+    pass settings that only apply to one user (eg its read timeout) with each request instead
+
+    Args:
+        url (str): Any URL of the TTS server, only its scheme and host are used
+    '''
+    parts = urlsplit(url)
+    base_url = f'{parts.scheme}://{parts.netloc}'
+    with _sessions_lock:
+        session = _sessions.get(base_url)
+        if session is None:
+            session = TTSHttpSession(base_url)
+            _sessions[base_url] = session
+        return session
@@ -6,7 +6,14 @@ from pathlib import Path
 from subprocess import DEVNULL
 import subprocess
 from src.tts.synthesization_options import SynthesizationOptions
-import requests
+from src.tts.voiceline_cache import VoicelineCache, get_voiceline_cache
+from src.tts.synthesis_timing import SynthesisTiming
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator
+import re
+import time
+from src.tts.tts_http_session import get_tts_http_session
 import shutil
 from src.config.definitions.game_definitions import GameEnum
 import platform
@@ -20,6 +27,12 @@ logger = utils.get_logger()
 class TTSable(ABC):
     """Base class for different TTS services
     """
+    LIP_MODE_GENERATED: str = "generated"
+    LIP_MODE_PLACEHOLDER: str = "placeholder"
+    LIP_MODE_NONE: str = "none"
+    MAX_SYNTHESIS_TIMINGS: int = 100
+    MAX_CHUNK_LENGTH: int = 150
+
     @utils.time_it
     def __init__(self, config: ConfigLoader) -> None:
         super().__init__()
@@ -37,6 +50,10 @@ class TTSable(ABC):
         self._language = config.language
         self._last_voice = '' # last active voice model
         self._lip_generation_enabled = config.lip_generation
+        self.__synthesis_timings: deque[SynthesisTiming] = deque(maxlen=self.MAX_SYNTHESIS_TIMINGS)
+        self._voiceline_cache: VoicelineCache | None = None
+        if config.voiceline_cache_size > 0:
+            self._voiceline_cache = get_voiceline_cache(f"{self._voiceline_folder}/cache", config.voiceline_cache_size)
         # determines whether the voiceline should play internally
         #self.debug_mode = config.debug_mode
         #self.play_audio_from_script = config.play_audio_from_script
@@ -47,31 +64,209 @@ class TTSable(ABC):
     def synthesize(self, voice: str, voiceline: str, in_game_voice: str, csv_in_game_voice: str, voice_accent: str, synth_options: SynthesizationOptions, advanced_voice_model: str | None = None):
         """Synthesizes a given voiceline
         """
+        synthesis_start = time.perf_counter()
+        new_wav_file_name = self.__get_voiceline_file_name(voice, voiceline)
+        lip_mode = self._get_lip_mode(synth_options)
+        # The voice model is only loaded when the voiceline is not cached, so repeated phrases never wait for a voice switch
+        requested_voice = self.__get_requested_voice(voice, in_game_voice, csv_in_game_voice, advanced_voice_model)
+        cache_key = self.__get_cache_key(requested_voice, voice_accent, voiceline, synth_options, lip_mode)
+        if self.__get_cached_voiceline(cache_key, voice, voiceline, new_wav_file_name, synthesis_start):
+            return new_wav_file_name
+
+        self.__ensure_voice(voice, in_game_voice, csv_in_game_voice, advanced_voice_model, voice_accent)
+        logger.log(22, f'Synthesizing voiceline: {voiceline.strip()}')
+
+        final_voiceline_file_name = 'out' # "out" is the file name used by XTTS
+        final_voiceline_file =  f"{self._voiceline_folder}/{final_voiceline_file_name}.wav"
+        self.__remove_voiceline_files(final_voiceline_file)
+
+        self.tts_synthesize(voiceline, final_voiceline_file, synth_options)
+        return self.__finish_voiceline(voice, voiceline, final_voiceline_file, new_wav_file_name, lip_mode, cache_key, synthesis_start)
+
+
+    @utils.time_it
+    def synthesize_chunks(self, voice: str, voiceline: str, in_game_voice: str, csv_in_game_voice: str, voice_accent: str, synth_options: SynthesizationOptions, advanced_voice_model: str | None = None, max_concurrent_chunks: int = 2) -> Iterator[tuple[str, str]]:
+        """Synthesizes a long voiceline as several shorter voicelines, see _split_voiceline
+
+        Up to max_concurrent_chunks chunks are sent to the TTS service at once. Lip sync files are still generated one chunk after the other.
+        Chunks are returned in order as soon as they are ready, so the first one can be played while the rest are still being voiced.
+
+        Yields:
+            tuple[str, str]: the text of a chunk and the path to its .wav file
+        """
+        chunks = self._split_voiceline(voiceline.strip(), self.MAX_CHUNK_LENGTH)
+        if len(chunks) <= 1:
+            yield voiceline, self.synthesize(voice, voiceline, in_game_voice, csv_in_game_voice, voice_accent, synth_options, advanced_voice_model)
+            return
+
+        synthesis_start = time.perf_counter()
+        requested_voice = self.__get_requested_voice(voice, in_game_voice, csv_in_game_voice, advanced_voice_model)
+        is_voice_ready = False
+        logger.log(22, f'Synthesizing voiceline in {len(chunks)} chunks: {voiceline.strip()}')
+
+        executor = ThreadPoolExecutor(max_workers=max(1, max_concurrent_chunks), thread_name_prefix="TTSChunk")
+        pending: list[tuple[str, str, str, str | None, str | None, Future | None]] = []
+        try:
+            for i, chunk in enumerate(chunks):
+                chunk_text = f' {chunk} '
+                # Only the first chunk starts the response, later chunks get lip sync even with 'Lazy' lip generation
+                chunk_options = SynthesizationOptions(synth_options.aggro, synth_options.is_first_line_of_response and i == 0)
+                new_wav_file_name = self.__get_voiceline_file_name(voice, chunk_text)
+                lip_mode = self._get_lip_mode(chunk_options)
+                cache_key = self.__get_cache_key(requested_voice, voice_accent, chunk_text, chunk_options, lip_mode)
+                if self.__get_cached_voiceline(cache_key, voice, chunk_text, new_wav_file_name, synthesis_start):
+                    pending.append((chunk_text, new_wav_file_name, lip_mode, cache_key, None, None))
+                    continue
+                if not is_voice_ready:
+                    self.__ensure_voice(voice, in_game_voice, csv_in_game_voice, advanced_voice_model, voice_accent)
+                    is_voice_ready = True
+                chunk_file = f"{self._voiceline_folder}/out_chunk_{i}.wav"
+                self.__remove_voiceline_files(chunk_file)
+                synthesis = executor.submit(self.tts_synthesize, chunk_text, chunk_file, chunk_options)
+                pending.append((chunk_text, new_wav_file_name, lip_mode, cache_key, chunk_file, synthesis))
+
+            for chunk_text, new_wav_file_name, lip_mode, cache_key, chunk_file, synthesis in pending:
+                if synthesis is None:
+                    yield chunk_text, new_wav_file_name
+                    continue
+                synthesis.result()
+                yield chunk_text, self.__finish_voiceline(voice, chunk_text, chunk_file, new_wav_file_name, lip_mode, cache_key, synthesis_start)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+    @property
+    def supports_chunked_synthesis(self) -> bool:
+        """Whether synthesize_chunks can send several chunks to the TTS service at once"""
+        return False
+
+
+    @utils.time_it
+    def _split_voiceline(self, voiceline, max_length=150):
+        """Split voiceline into phrases by commas, 'and', and 'or'"""
+        def group_sentences(voiceline_sentences, max_length=150):
+            """
+            Splits sentences into separate voicelines based on their length (max=max_length)
+            Groups sentences if they can be done so without exceeding max_length
+            """
+            grouped_sentences = []
+            temp_group = []
+            for sentence in voiceline_sentences:
+                if len(sentence) > max_length:
+                    grouped_sentences.append(sentence)
+                elif len(' '.join(temp_group + [sentence])) <= max_length:
+                    temp_group.append(sentence)
+                else:
+                    grouped_sentences.append(' '.join(temp_group))
+                    temp_group = [sentence]
+            if temp_group:
+                grouped_sentences.append(' '.join(temp_group))
+
+            return grouped_sentences
+
+        # Split by commas and "and" or "or"
+        chunks = re.split(r'(, | and | or )', voiceline)
+        # Join the delimiters back to their respective chunks
+        chunks = [chunks[i] + (chunks[i+1] if i+1 < len(chunks) else '') for i in range(0, len(chunks), 2)]
+        # Filter out empty chunks
+        chunks = [chunk for chunk in chunks if chunk.strip()]
+
+        result = []
+        for chunk in chunks:
+            if len(chunk) <= max_length:
+                if result and result[-1].endswith(' and'):
+                    result[-1] = result[-1][:-4]
+                    chunk = 'and ' + chunk.strip()
+                elif result and result[-1].endswith(' or'):
+                    result[-1] = result[-1][:-3]
+                    chunk = 'or ' + chunk.strip()
+                result.append(chunk.strip())
+            else:
+                # Split long chunks based on length
+                words = chunk.split()
+                current_line = words[0]
+                for word in words[1:]:
+                    if len(current_line + ' ' + word) <= max_length:
+                        current_line += ' ' + word
+                    else:
+                        if current_line.endswith(' and'):
+                            current_line = current_line[:-4]
+                            word = 'and ' + word
+                        if current_line.endswith(' or'):
+                            current_line = current_line[:-3]
+                            word = 'or ' + word
+                        result.append(current_line.strip())
+                        current_line = word
+                result.append(current_line.strip())
+
+        result = group_sentences(result, max_length)
+        logger.debug(f'Split sentence into : {result}')
+
+        return result
+
+
+    def __ensure_voice(self, voice: str, in_game_voice: str | None, csv_in_game_voice: str | None, advanced_voice_model: str | None, voice_accent: str | None):
         logger.debug(f'last_voice: {self._last_voice}, voice: {voice}, in_game_voice: {in_game_voice}, csv_in_game_voice: {csv_in_game_voice}, advanced_voice_model: {advanced_voice_model}, voice_accent: {voice_accent}')
         if self._last_voice == '' or (isinstance(self._last_voice, str) and self._last_voice.lower() not in {isinstance(v, str) and v.lower() for v in {voice, in_game_voice, csv_in_game_voice, advanced_voice_model, f'fo4_{voice}'}}):
             self.change_voice(voice, in_game_voice, csv_in_game_voice, advanced_voice_model, voice_accent)
 
-        logger.log(22, f'Synthesizing voiceline: {voiceline.strip()}')
 
-        final_voiceline_file_name = 'out' # "out" is the file name used by XTTS
-        final_voiceline_file =  f"{self._voiceline_folder}/{final_voiceline_file_name}.wav"
+    def __get_voiceline_file_name(self, voice: str, voiceline: str) -> str:
+        #Use a sanitized version of the voice text as filename
+        unique_name: str  = f'{voice} {voiceline.strip()}'[:150]
+        new_name: str = "".join(c for c in unique_name if c not in r'\/:*?"<>|.')
+        return f'{self._voiceline_folder}/save/{new_name.strip()}.wav'
+
+
+    def __get_requested_voice(self, voice: str, in_game_voice: str | None, csv_in_game_voice: str | None, advanced_voice_model: str | None) -> str:
+        """Identifies the voice model a speaker asks for, and the model file it resolves to, without loading it"""
+        requested_voice = '|'.join(str(v).lower() for v in (voice, in_game_voice, csv_in_game_voice, advanced_voice_model))
+        if self._voiceline_cache is None:
+            return requested_voice
+        return f'{requested_voice}|{self._get_cache_voice_model(voice, in_game_voice, csv_in_game_voice, advanced_voice_model)}'
+
+
+    def __get_cache_key(self, requested_voice: str, voice_accent: str | None, voiceline: str, synth_options: SynthesizationOptions, lip_mode: str) -> str | None:
+        if self._voiceline_cache is None:
+            return None
+        return VoicelineCache.make_key(type(self).__name__, requested_voice, voiceline, synth_options.aggro, self._get_voiceline_language(voice_accent), lip_mode, self._get_cache_settings())
 
+
+    def __get_cached_voiceline(self, cache_key: str | None, voice: str, voiceline: str, new_wav_file_name: str, synthesis_start: float) -> bool:
+        """Puts the cached files of a voiceline in place if it has been synthesized before"""
+        if self._voiceline_cache is None or cache_key is None:
+            return False
+        if not self._voiceline_cache.get(cache_key, new_wav_file_name):
+            return False
+        logger.log(22, f'Using cached voiceline: {voiceline.strip()}')
+        self.__add_synthesis_timing(voice, voiceline, new_wav_file_name, synthesis_start, True)
+        return True
+
+
+    @staticmethod
+    def __remove_voiceline_files(wav_file: str):
         try:
-            if os.path.exists(final_voiceline_file):
-                os.remove(final_voiceline_file)
-            if os.path.exists(final_voiceline_file.replace(".wav", ".lip")):
-                os.remove(final_voiceline_file.replace(".wav", ".lip"))
+            if os.path.exists(wav_file):
+                os.remove(wav_file)
+            if os.path.exists(wav_file.replace(".wav", ".lip")):
+                os.remove(wav_file.replace(".wav", ".lip"))
         except:
             logger.warning("Failed to remove spoken voicelines")
 
-        self.tts_synthesize(voiceline, final_voiceline_file, synth_options)
+
+    def __finish_voiceline(self, voice: str, voiceline: str, final_voiceline_file: str, new_wav_file_name: str, lip_mode: str, cache_key: str | None, synthesis_start: float) -> str:
+        """Generates the lip sync files of a synthesized voiceline and moves them to their unique name
+
+        Returns:
+            str: the path to the voiceline's .wav file
+        """
         if not os.path.exists(final_voiceline_file):
             logger.error(f'TTS failed to generate voiceline at: {Path(final_voiceline_file)}')
             raise FileNotFoundError()
         
-        if (self._lip_generation_enabled == 'enabled') or (self._lip_generation_enabled == 'lazy' and not synth_options.is_first_line_of_response):
+        if lip_mode == self.LIP_MODE_GENERATED:
             self._generate_voiceline_files(final_voiceline_file, voiceline)
-        elif (self._lip_generation_enabled in ['lazy', 'disabled'] and self._game.base_game == GameEnum.FALLOUT4):
+        elif lip_mode == self.LIP_MODE_PLACEHOLDER:
             self._generate_voiceline_files(final_voiceline_file, voiceline, skip_lip_generation=True)
         
         #rename to unique name        
@@ -79,11 +274,6 @@ class TTSable(ABC):
             #timestamp: str = datetime.datetime.now().strftime("%Y_%m_%d_%H_%M_%S_%f_")
             #new_wav_file_name = f"{self._voiceline_folder}/save/{timestamp + final_voiceline_file_name}.wav" 
 
-            #Use a sanitized version of the voice text as filename
-            unique_name: str  = f'{voice} {voiceline.strip()}'[:150]
-            new_name: str = "".join(c for c in unique_name if c not in r'\/:*?"<>|.')
-            new_wav_file_name = f'{self._voiceline_folder}/save/{new_name.strip()}.wav'
-
             new_lip_file_name = new_wav_file_name.replace(".wav", ".lip")
             new_fuz_file_name = new_wav_file_name.replace(".wav", ".fuz")
 
@@ -95,7 +285,7 @@ class TTSable(ABC):
             except Exception as ex:
                 logger.warning(f'{type(ex).__name__}: {ex.args}')
 
-            if (self._lip_generation_enabled == 'enabled') or (self._lip_generation_enabled == 'lazy' and not synth_options.is_first_line_of_response):
+            if lip_mode == self.LIP_MODE_GENERATED:
                 try:
                     if os.path.exists(new_lip_file_name):
                         os.remove(new_lip_file_name)
@@ -112,12 +302,65 @@ class TTSable(ABC):
                 logger.error(f'Could not rename {final_voiceline_file.replace(".wav", ".fuz")}')
             final_voiceline_file = new_wav_file_name
 
+            if self._voiceline_cache is not None and cache_key and os.path.exists(final_voiceline_file):
+                self._voiceline_cache.put(cache_key, final_voiceline_file)
+
+        self.__add_synthesis_timing(voice, voiceline, final_voiceline_file, synthesis_start, False)
+
         # if Debug Mode is on, play the audio file
         # if (self.debug_mode == '1') & (self.play_audio_from_script == '1'):
         #     winsound.PlaySound(final_voiceline_file, winsound.SND_FILENAME)
         return final_voiceline_file
 
 
+    @property
+    def synthesis_timings(self) -> list[SynthesisTiming]:
+        """The timings of the most recently synthesized voicelines, oldest first"""
+        return list(self.__synthesis_timings)
+
+
+    def __add_synthesis_timing(self, voice: str, voiceline: str, voiceline_file: str, synthesis_start: float, is_cached: bool):
+        timing = SynthesisTiming(voiceline.strip(), str(voice), voiceline_file, time.perf_counter() - synthesis_start, is_cached)
+        self.__synthesis_timings.append(timing)
+        logger.debug(f'{"Retrieved" if is_cached else "Synthesized"} voiceline in {timing.synthesis_seconds:.3f}s: {timing.voiceline}')
+
+
+    def _get_lip_mode(self, synth_options: SynthesizationOptions) -> str:
+        """Returns which lip files are created for a voiceline, see the LIP_MODE_ constants"""
+        if (self._lip_generation_enabled == 'enabled') or (self._lip_generation_enabled == 'lazy' and not synth_options.is_first_line_of_response):
+            return self.LIP_MODE_GENERATED
+        elif (self._lip_generation_enabled in ['lazy', 'disabled'] and self._game.base_game == GameEnum.FALLOUT4):
+            return self.LIP_MODE_PLACEHOLDER
+        return self.LIP_MODE_NONE
+
+
+    def _get_voiceline_language(self, voice_accent: str | None) -> str:
+        """Returns the language a voiceline of a speaker with voice_accent is spoken in. Part of the key of cached voicelines"""
+        return self._language
+
+
+    def _get_cache_settings(self) -> str:
+        """Returns the settings of the TTS service that change how voicelines sound. Part of the key of cached voicelines, so changing them is not answered with outdated audio"""
+        return ''
+
+
+    def _get_cache_voice_model(self, voice: str, in_game_voice: str | None, csv_in_game_voice: str | None, advanced_voice_model: str | None) -> str:
+        """Identifies the model file the voicelines of a speaker are synthesized with, without loading it. Part of the key of cached voicelines, so a replaced model is not answered with outdated audio.
+        An empty string means the TTS service cannot tell, and the requested voice is all that identifies the model
+        """
+        return ''
+
+
+    @staticmethod
+    def _describe_model_file(model_file: str) -> str:
+        """Returns the name, size and modification time of a model file, an empty string if it does not exist"""
+        try:
+            stat = os.stat(model_file)
+        except OSError:
+            return ''
+        return f'{os.path.basename(model_file)}:{stat.st_size}:{int(stat.st_mtime)}'
+
+
     @abstractmethod
     @utils.time_it
     def change_voice(self, voice: str, in_game_voice: str | None = None, csv_in_game_voice: str | None = None, advanced_voice_model: str | None = None, voice_accent: str | None = None, voice_gender: int | None = None, voice_race: str | None = None):
@@ -126,6 +369,25 @@ class TTSable(ABC):
         pass
 
 
+    def preload_voice(self, voice: str, in_game_voice: str | None = None, csv_in_game_voice: str | None = None, advanced_voice_model: str | None = None, voice_accent: str | None = None, voice_gender: int | None = None, voice_race: str | None = None):
+        """Loads a voice model in the background without making it the active voice, so switching to it later is instant.
+        Only does something for TTS services that can hold several voice models at once, see can_preload_voices
+        """
+        pass
+
+
+    @property
+    def can_preload_voices(self) -> bool:
+        return False
+
+
+    def close(self):
+        """Releases what the TTS service keeps running in the background, eg external processes.
+        Called when the TTS service is replaced after a config change and when Mantella shuts down
+        """
+        pass
+
+
     @abstractmethod
     @utils.time_it
     def tts_synthesize(self, voiceline: str, final_voiceline_file: str, synth_options: SynthesizationOptions):
@@ -145,7 +407,7 @@ class TTSable(ABC):
     @staticmethod
     @utils.time_it
     def _send_request(url, data):
-        requests.post(url, json=data)
+        get_tts_http_session(url).post(url, json=data)
 
 
     @utils.time_it
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import os
+import shutil
+import unicodedata
+from collections import OrderedDict
+from threading import Lock
+import src.utils as utils
+
+logger = utils.get_logger()
+
+
+class VoicelineCache:
+    """Persistent cache of synthesized voicelines
+
+    Every entry is the .wav file of a voiceline together with its .lip and .fuz files (if any were generated), stored under a hash of everything that influences the synthesized audio.
+    The cache survives restarts: the entries are rediscovered from the cache folder on start-up, ordered by the last time they were used (the modification time of the .wav file).
+    Once the total size of the cached files exceeds the configured maximum, the least recently used entries are evicted.
+    """
+    FILE_EXTENSIONS: list[str] = [".wav", ".lip", ".fuz"]
+
+    def __init__(self, cache_folder: str, max_size_mb: int) -> None:
+        self.__cache_folder: str = cache_folder
+        self.__max_size_bytes: int = max_size_mb * 1024 * 1024
+        self.__entries: OrderedDict[str, int] = OrderedDict() # key -> combined size of the entry's files in bytes, least recently used first
+        self.__total_size_bytes: int = 0
+        self.__hits: int = 0
+        self.__misses: int = 0
+        self.__lock = Lock()
+        os.makedirs(self.__cache_folder, exist_ok=True)
+        self.__load_entries()
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    @property
+    def size_bytes(self) -> int:
+        return self.__total_size_bytes
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__entries
+
+    @staticmethod
+    def normalize_voiceline(voiceline: str) -> str:
+        """Normalizes the parts of a voiceline that do not change how it is spoken (unicode forms and whitespace)"""
+        return ' '.join(unicodedata.normalize('NFKC', voiceline).split())
+
+    @staticmethod
+    def make_key(tts_service: str, voice_model: str, voiceline: str, aggro: bool, language: str, lip_mode: str, settings: str = '') -> str:
+        """Creates the cache key of a voiceline
+
+        Args:
+            tts_service (str): Name of the TTS service synthesizing the voiceline
+            voice_model (str): The voice model requested for the speaker, including the identity of the model file it resolves to if known
+            voiceline (str): The text of the voiceline
+            aggro (bool): Whether the voiceline is spoken in combat
+            language (str): The language the voiceline is spoken in
+            lip_mode (str): Which lip files are generated alongside the .wav file
+            settings (str): The settings of the TTS service that change how voicelines sound
+
+        Returns:
+            str: A key that is safe to use as a file name
+        """
+        key_parts = [tts_service, str(voice_model).lower(), VoicelineCache.normalize_voiceline(voiceline), aggro, language, lip_mode, settings]
+        return hashlib.sha1(json.dumps(key_parts, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def get(self, key: str, wav_file: str) -> bool:
+        """Places the cached files of a voiceline next to wav_file, if the voiceline is cached
+
+        Args:
+            key (str): The cache key of the voiceline, see make_key
+            wav_file (str): Where the .wav file should be placed. The .lip and .fuz files are placed next to it
+
+        Returns:
+            bool: True if the voiceline was cached, False otherwise
+        """
+        with self.__lock:
+            if key not in self.__entries:
+                self.__misses += 1
+                return False
+            cached_wav_file = self.__get_file(key, ".wav")
+            try:
+                for extension in self.FILE_EXTENSIONS:
+                    destination = wav_file.replace(".wav", extension)
+                    if os.path.exists(destination):
+                        os.remove(destination)
+                    cached_file = self.__get_file(key, extension)
+                    if os.path.exists(cached_file):
+                        self.__link_or_copy(cached_file, destination)
+                os.utime(cached_wav_file)
+            except OSError as e:
+                logger.warning(f'Could not use cached voiceline {cached_wav_file}: {e}')
+                self.__remove_entry(key)
+                self.__misses += 1
+                return False
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+            logger.debug(f'Voiceline cache hit ({self.__hits} hits, {self.__misses} misses)')
+            return True
+
+    def put(self, key: str, wav_file: str):
+        """Adds a synthesized voiceline to the cache, evicting the least recently used voicelines if the cache grows too large
+
+        Args:
+            key (str): The cache key of the voiceline, see make_key
+            wav_file (str): The synthesized .wav file. The .lip and .fuz files next to it are cached as well
+        """
+        with self.__lock:
+            if key in self.__entries:
+                self.__remove_entry(key)
+            size_bytes = 0
+            try:
+                for extension in self.FILE_EXTENSIONS:
+                    source = wav_file.replace(".wav", extension)
+                    if os.path.exists(source):
+                        cached_file = self.__get_file(key, extension)
+                        self.__link_or_copy(source, cached_file)
+                        size_bytes += os.path.getsize(cached_file)
+            except OSError as e:
+                logger.warning(f'Could not cache voiceline {wav_file}: {e}')
+                self.__delete_files(key)
+                return
+            self.__entries[key] = size_bytes
+            self.__total_size_bytes += size_bytes
+            self.__evict()
+
+    def __evict(self):
+        while self.__total_size_bytes > self.__max_size_bytes and len(self.__entries) > 0:
+            oldest_key = next(iter(self.__entries))
+            self.__remove_entry(oldest_key)
+
+    def __remove_entry(self, key: str):
+        self.__total_size_bytes -= self.__entries.pop(key)
+        self.__delete_files(key)
+
+    def __delete_files(self, key: str):
+        for extension in self.FILE_EXTENSIONS:
+            cached_file = self.__get_file(key, extension)
+            try:
+                if os.path.exists(cached_file):
+                    os.remove(cached_file)
+            except OSError as e:
+                logger.warning(f'Could not delete cached voiceline file {cached_file}: {e}')
+
+    def __get_file(self, key: str, extension: str) -> str:
+        return os.path.join(self.__cache_folder, f'{key}{extension}')
+
+    @staticmethod
+    def __link_or_copy(source: str, destination: str):
+        """Hard links are instant and take no extra space. Falls back to copying where they are not supported (eg different drives)"""
+        try:
+            os.link(source, destination)
+        except OSError:
+            shutil.copyfile(source, destination)
+
+    def __load_entries(self):
+        """Rediscovers the entries of previous sessions from the files in the cache folder"""
+        found_entries: dict[str, tuple[float, int]] = {}
+        for file_name in os.listdir(self.__cache_folder):
+            key, extension = os.path.splitext(file_name)
+            if extension not in self.FILE_EXTENSIONS:
+                continue
+            stat = os.stat(os.path.join(self.__cache_folder, file_name))
+            last_used, size_bytes = found_entries.get(key, (0.0, 0))
+            if extension == ".wav":
+                last_used = stat.st_mtime
+            found_entries[key] = (last_used, size_bytes + stat.st_size)
+
+        for key, (last_used, size_bytes) in sorted(found_entries.items(), key=lambda entry: entry[1][0]):
+            if last_used == 0.0: # Leftover .lip/.fuz files without a .wav
+                self.__delete_files(key)
+                continue
+            self.__entries[key] = size_bytes
+            self.__total_size_bytes += size_bytes
+        self.__evict()
+        if len(self.__entries) > 0:
+            logger.debug(f'Loaded {len(self.__entries)} cached voicelines ({self.__total_size_bytes / (1024 * 1024):.1f} MB)')
+
+
+_instances: dict[str, VoicelineCache] = {}
+_instances_lock = Lock()
+
+
+def get_voiceline_cache(cache_folder: str, max_size_mb: int) -> VoicelineCache:
+    """Return the shared :class:`VoicelineCache` of a cache folder, so that all TTS services agree on its contents."""
+    cache_folder = os.path.normpath(cache_folder)
+    with _instances_lock:
+        if cache_folder not in _instances:
+            _instances[cache_folder] = VoicelineCache(cache_folder, max_size_mb)
+        return _instances[cache_folder]
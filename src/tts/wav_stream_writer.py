@@ -0,0 +1,117 @@
+import struct
+import wave
+import numpy as np
+import src.utils as utils
+
+logger = utils.get_logger()
+
+
+class WavStreamWriter:
+    """Writes a .wav file from a stream of .wav bytes as they arrive, converting the samples to 16-bit PCM on the fly
+
+    The stream is expected to start with a RIFF/WAVE header. Its data size is ignored, as streaming servers
+    do not know the length of the audio when they send the header. 16-bit PCM is written as is,
+    32-bit float and 32-bit PCM samples are converted to 16-bit PCM.
+    """
+    WAVE_FORMAT_PCM: int = 1
+    WAVE_FORMAT_IEEE_FLOAT: int = 3
+    WAVE_FORMAT_EXTENSIBLE: int = 0xFFFE
+
+    def __init__(self, output_file: str) -> None:
+        self.__output_file: str = output_file
+        self.__wav_file: wave.Wave_write | None = None
+        self.__pending: bytearray = bytearray()
+        self.__is_header_read: bool = False
+        self.__audio_format: int = self.WAVE_FORMAT_PCM
+        self.__channels: int = 1
+        self.__sample_rate: int = 0
+        self.__bytes_per_sample: int = 2
+        self.__frames_written: int = 0
+
+    @property
+    def frames_written(self) -> int:
+        return self.__frames_written
+
+    @property
+    def sample_rate(self) -> int:
+        return self.__sample_rate
+
+    def write(self, data: bytes):
+        """Adds the next bytes of the stream. Samples that are complete are written to the file straight away"""
+        self.__pending.extend(data)
+        if not self.__is_header_read and not self.__read_header():
+            return
+
+        frame_size = self.__bytes_per_sample * self.__channels
+        complete_bytes = len(self.__pending) - (len(self.__pending) % frame_size)
+        if complete_bytes == 0:
+            return
+        samples = self.__to_int16(bytes(self.__pending[:complete_bytes]))
+        del self.__pending[:complete_bytes]
+        self.__wav_file.writeframes(samples.tobytes())
+        self.__frames_written += complete_bytes // frame_size
+
+    def close(self):
+        """Finishes the file. Incomplete samples at the end of the stream are dropped"""
+        if self.__wav_file:
+            self.__wav_file.close()
+            self.__wav_file = None
+        elif not self.__is_header_read and len(self.__pending) > 0:
+            raise ValueError(f'Stream ended before the end of its .wav header ({len(self.__pending)} bytes received)')
+
+    def __enter__(self) -> 'WavStreamWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __read_header(self) -> bool:
+        """Parses the RIFF header once enough of it has arrived, then opens the output file
+
+        Returns:
+            bool: whether the header is complete
+        """
+        if len(self.__pending) < 12:
+            return False
+        if self.__pending[0:4] != b'RIFF' or self.__pending[8:12] != b'WAVE':
+            raise ValueError('Stream does not start with a .wav header')
+
+        position = 12
+        has_format = False
+        while position + 8 <= len(self.__pending):
+            chunk_id = bytes(self.__pending[position:position + 4])
+            chunk_size = struct.unpack('<I', self.__pending[position + 4:position + 8])[0]
+            if chunk_id == b'data':
+                if not has_format:
+                    raise ValueError('Stream has no format chunk before its audio data')
+                del self.__pending[:position + 8]
+                self.__open_output_file()
+                self.__is_header_read = True
+                return True
+            if position + 8 + chunk_size > len(self.__pending):
+                return False
+            if chunk_id == b'fmt ':
+                self.__audio_format, self.__channels, self.__sample_rate = struct.unpack('<HHI', self.__pending[position + 8:position + 16])
+                bits_per_sample = struct.unpack('<H', self.__pending[position + 22:position + 24])[0]
+                if self.__audio_format == self.WAVE_FORMAT_EXTENSIBLE:
+                    self.__audio_format = struct.unpack('<H', self.__pending[position + 32:position + 34])[0]
+                self.__bytes_per_sample = bits_per_sample // 8
+                has_format = True
+            position += 8 + chunk_size + (chunk_size % 2)
+        return False
+
+    def __open_output_file(self):
+        if (self.__audio_format, self.__bytes_per_sample) not in [(self.WAVE_FORMAT_PCM, 2), (self.WAVE_FORMAT_PCM, 4), (self.WAVE_FORMAT_IEEE_FLOAT, 4)]:
+            raise ValueError(f'Unsupported .wav sample format {self.__audio_format} with {self.__bytes_per_sample * 8} bits per sample')
+        self.__wav_file = wave.open(self.__output_file, 'wb')
+        self.__wav_file.setnchannels(self.__channels)
+        self.__wav_file.setsampwidth(2)
+        self.__wav_file.setframerate(self.__sample_rate)
+
+    def __to_int16(self, data: bytes) -> np.ndarray:
+        if self.__audio_format == self.WAVE_FORMAT_IEEE_FLOAT:
+            samples = np.frombuffer(data, dtype='<f4')
+            return (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2')
+        if self.__bytes_per_sample == 4:
+            return (np.frombuffer(data, dtype='<i4') >> 16).astype('<i2')
+        return np.frombuffer(data, dtype='<i2')
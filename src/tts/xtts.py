@@ -10,6 +10,8 @@ from subprocess import Popen
 import platform
 import time
 from src.tts.synthesization_options import SynthesizationOptions
+from src.tts.tts_http_session import get_tts_http_session
+from src.tts.wav_stream_writer import WavStreamWriter
 from src import utils
 from threading import Thread
 from src.config.definitions.game_definitions import GameEnum
@@ -34,14 +36,18 @@ class XTTS(TTSable):
         self.__xtts_data = config.xtts_data
         self.__xtts_server_path = config.xtts_server_path
         self.__xtts_accent = config.xtts_accent
+        self.__xtts_streaming = config.xtts_streaming
         self._language = self._language if self._language != 'zh' else 'zh-cn'
         self.__voice_accent = self._language
         self.__official_model_list = ["main","v2.0.3","v2.0.2","v2.0.1","v2.0.0"]
         self.__xtts_synthesize_url = f'{self.__xtts_url}/tts_to_audio/'
+        self.__xtts_stream_url = f'{self.__xtts_url}/tts_stream'
         self.__xtts_switch_model = f'{self.__xtts_url}/switch_model'
         self.__xtts_set_tts_settings = f'{self.__xtts_url}/set_tts_settings'
         self.__xtts_get_models_list = f'{self.__xtts_url}/get_models_list'
         self.__xtts_get_speakers_list = f'{self.__xtts_url}/speakers_list'
+        self.__session = get_tts_http_session(self.__xtts_url)
+        self.__request_timeout: float = config.tts_request_timeout
         if not self._facefx_path :
             self._facefx_path = self.__xtts_server_path + "/plugins/lip_fuz"
 
@@ -60,9 +66,35 @@ class XTTS(TTSable):
 
     @utils.time_it
     def tts_synthesize(self, voiceline: str, final_voiceline_file: str, synth_options: SynthesizationOptions):
+        if self.__xtts_streaming and self._stream_line_xtts(voiceline, final_voiceline_file):
+            return
         self._synthesize_line_xtts(voiceline, final_voiceline_file)
     
 
+    @property
+    def supports_chunked_synthesis(self) -> bool:
+        return True
+
+
+    def _get_voiceline_language(self, voice_accent: str | None) -> str:
+        # XTTS speaks with the accent of the voice, which can differ from the language of the voiceline
+        return f'{self._language}_{self.__get_accent(voice_accent)}'
+
+
+    def _get_cache_settings(self) -> str:
+        # The speaker files of XTTS live with its server, which may run on another machine, so only the requested voice identifies them
+        return f'default_model={self.__xtts_default_model}|data={self.__xtts_data}'
+
+
+    def __get_accent(self, voice_accent: str | None) -> str:
+        """Returns the accent XTTS speaks with once the voice of a speaker with voice_accent is selected"""
+        if (self.__xtts_accent == 1) and (voice_accent != None):
+            if voice_accent == '':
+                return self._language
+            return voice_accent if voice_accent != 'zh' else 'zh-cn'
+        return self.__voice_accent
+
+
     @utils.time_it
     def change_voice(self, voice: str, in_game_voice: str | None = None, csv_in_game_voice: str | None = None, advanced_voice_model: str | None = None, voice_accent: str | None = None, voice_gender: int | None = None, voice_race: str | None = None):
         logger.log(self._loglevel, 'Loading voice model...')
@@ -93,19 +125,14 @@ class XTTS(TTSable):
                 thread.start()
                 self.__last_model = voice
 
-        if (self.__xtts_accent == 1) and (voice_accent != None):
-            if voice_accent == '':
-                self.__voice_accent = self._language
-            else:
-                voice_accent = voice_accent if voice_accent != 'zh' else 'zh-cn'
-                self.__voice_accent = voice_accent
+        self.__voice_accent = self.__get_accent(voice_accent)
 
 
     @utils.time_it
     def _get_available_models(self):
         # Code to request and return the list of available models
         try:
-            response = requests.get(self.__xtts_get_models_list)
+            response = self.__session.get(self.__xtts_get_models_list, read_timeout=self.__request_timeout)
             if response.status_code == 200:
                 # Convert each element in the response to lowercase and remove spaces
                 return [model.lower().replace(' ', '') for model in response.json()]
@@ -120,7 +147,7 @@ class XTTS(TTSable):
     def _get_available_speakers(self) -> dict[str, Any]:
         # Code to request and return the list of available models
         try:
-            response = requests.get(self.__xtts_get_speakers_list)
+            response = self.__session.get(self.__xtts_get_speakers_list, read_timeout=self.__request_timeout)
             if response.status_code == 200:
                 all_speakers = response.json()
                 current_language_speakers = all_speakers.get(self._language, {}).get('speakers', [])
@@ -190,7 +217,7 @@ class XTTS(TTSable):
                 'language': self._language,
                 'accent': self.__voice_accent,
             }
-            return requests.post(self.__xtts_synthesize_url, json=data)
+            return self.__session.post(self.__xtts_synthesize_url, json=data, read_timeout=self.__request_timeout)
 
         response = get_voiceline(self._last_voice.lower())
         if response and response.status_code == 200:
@@ -199,6 +226,35 @@ class XTTS(TTSable):
             logger.error(f"Failed with '{self._last_voice}'. HTTP Error: {response.status_code}")
 
 
+    @utils.time_it
+    def _stream_line_xtts(self, line, save_path) -> bool:
+        """Receives a voiceline from the XTTS server while it is being voiced, writing (and converting) the audio as it arrives
+
+        Returns:
+            bool: False if the server does not support streaming, in which case streaming is turned off for the rest of the session
+        """
+        params = {
+            'text': line,
+            'speaker_wav': self._sanitize_voice_name(self._last_voice),
+            'language': self._language,
+            'accent': self.__voice_accent,
+        }
+        try:
+            with self.__session.get(self.__xtts_stream_url, params=params, stream=True, read_timeout=self.__request_timeout) as response:
+                if response.status_code != 200:
+                    logger.warning(f"XTTS server does not support streaming (HTTP Error: {response.status_code}), receiving voicelines all at once instead")
+                    self.__xtts_streaming = False
+                    return False
+                with WavStreamWriter(save_path) as writer:
+                    for data in response.iter_content(chunk_size=None):
+                        writer.write(data)
+        except ValueError as e:
+            logger.warning(f"Could not read streamed voiceline from XTTS: {e}. Receiving voicelines all at once instead")
+            self.__xtts_streaming = False
+            return False
+        return writer.frames_written > 0
+
+
     @utils.time_it
     def _set_xtts_settings(self):
         tts_data_dict = json.loads(self.__xtts_data.replace('\n', ''))
@@ -211,7 +267,7 @@ class XTTS(TTSable):
         is_local = utils.is_local_url(self.__xtts_url)
         try:
             # contact XTTS server; ~2 second timeout
-            response = requests.get(self.__xtts_url, timeout=2)
+            response = self.__session.get(self.__xtts_url, timeout=2, max_retries=0)
             if response.status_code >= 500:
                 if is_local:
                     logger.log(self._loglevel, 'Could not connect to XTTS. Attempting to run headless server...')
@@ -260,7 +316,7 @@ class XTTS(TTSable):
             server_ready = False
             for _ in range(180):  # try for up to three minutes
                 try:
-                    response = requests.get(self.__xtts_url, timeout=2)
+                    response = self.__session.get(self.__xtts_url, timeout=2, max_retries=0)
                     if response.status_code < 500:
                         server_ready = True
                         break
@@ -2,7 +2,6 @@ from src.config.config_loader import ConfigLoader
 from src.tts.ttsable import TTSable
 import src.utils as utils
 import os
-import re
 import numpy as np
 import soundfile as sf
 import json
@@ -11,6 +10,7 @@ from subprocess import Popen, DEVNULL
 import time
 import sys
 from src.tts.synthesization_options import SynthesizationOptions
+from src.tts.tts_http_session import get_tts_http_session
 from src.config.definitions.game_definitions import GameEnum
 
 logger = utils.get_logger()
@@ -34,6 +34,8 @@ class xVASynth(TTSable):
         self.__synthesize_batch_url = 'http://127.0.0.1:8008/synthesize_batch'
         self.__loadmodel_url = 'http://127.0.0.1:8008/loadModel'
         self.__setvocoder_url = 'http://127.0.0.1:8008/setVocoder'
+        self.__session = get_tts_http_session(self.__synthesize_url)
+        self.__request_timeout: float = config.tts_request_timeout
         self.__model_path = f"{self.__xvasynth_path}/resources/app/models/{self._game.base_game.display_name}/"
         self.__pace = config.pace
         self.__use_sr = config.use_sr
@@ -67,6 +69,22 @@ class xVASynth(TTSable):
             self._merge_audio_files(voiceline_files, final_voiceline_file)
     
 
+    @property
+    def supports_chunked_synthesis(self) -> bool:
+        return True
+
+
+    def _get_cache_settings(self) -> str:
+        return f'pace={self.__pace}|use_sr={self.__use_sr}|use_cleanup={self.__use_cleanup}'
+
+
+    def _get_cache_voice_model(self, voice: str, in_game_voice: str | None, csv_in_game_voice: str | None, advanced_voice_model: str | None) -> str:
+        # change_voice only loads the model named by voice
+        acronym = "f4_" if self._game.base_game == GameEnum.FALLOUT4 else "sk_"
+        voice_path = f"{self.__model_path}{acronym}{voice.lower().replace(' ', '')}"
+        return '|'.join(self._describe_model_file(voice_path + extension) for extension in ['.json', '.pt'])
+
+
     @utils.time_it
     def change_voice(self, voice: str, in_game_voice: str | None = None, csv_in_game_voice: str | None = None, advanced_voice_model: str | None = None, voice_accent: str | None = None, voice_gender: int | None = None, voice_race: str | None = None):
         logger.log(self._loglevel, 'Loading voice model...')
@@ -123,7 +141,7 @@ class xVASynth(TTSable):
                 backup_voice='malenord'
                 self._run_backup_model(backup_voice)
         try:
-            requests.post(self.__loadmodel_url, json=model_change)
+            self.__session.post(self.__loadmodel_url, json=model_change, read_timeout=self.__request_timeout)
             self._last_voice = voice
             logger.log(self._loglevel, f'Target model {voice} loaded.')
         except:
@@ -135,7 +153,7 @@ class xVASynth(TTSable):
                 backup_voice='malenord'
             self._run_backup_model(backup_voice)
             try:
-                requests.post(self.__loadmodel_url, json=model_change)
+                self.__session.post(self.__loadmodel_url, json=model_change, read_timeout=self.__request_timeout)
                 self._last_voice = voice
                 logger.log(self._loglevel, f'Voice model {voice} loaded.')
             except:
@@ -144,81 +162,40 @@ class xVASynth(TTSable):
                 sys.exit(0)
     
 
-    @utils.time_it
-    def _split_voiceline(self, voiceline, max_length=150):
-        """Split voiceline into phrases by commas, 'and', and 'or'"""
-        def group_sentences(voiceline_sentences, max_length=150):
-            """
-            Splits sentences into separate voicelines based on their length (max=max_length)
-            Groups sentences if they can be done so without exceeding max_length
-            """
-            grouped_sentences = []
-            temp_group = []
-            for sentence in voiceline_sentences:
-                if len(sentence) > max_length:
-                    grouped_sentences.append(sentence)
-                elif len(' '.join(temp_group + [sentence])) <= max_length:
-                    temp_group.append(sentence)
-                else:
-                    grouped_sentences.append(' '.join(temp_group))
-                    temp_group = [sentence]
-            if temp_group:
-                grouped_sentences.append(' '.join(temp_group))
-
-            return grouped_sentences
-
-        # Split by commas and "and" or "or"
-        chunks = re.split(r'(, | and | or )', voiceline)
-        # Join the delimiters back to their respective chunks
-        chunks = [chunks[i] + (chunks[i+1] if i+1 < len(chunks) else '') for i in range(0, len(chunks), 2)]
-        # Filter out empty chunks
-        chunks = [chunk for chunk in chunks if chunk.strip()]
-
-        result = []
-        for chunk in chunks:
-            if len(chunk) <= max_length:
-                if result and result[-1].endswith(' and'):
-                    result[-1] = result[-1][:-4]
-                    chunk = 'and ' + chunk.strip()
-                elif result and result[-1].endswith(' or'):
-                    result[-1] = result[-1][:-3]
-                    chunk = 'or ' + chunk.strip()
-                result.append(chunk.strip())
-            else:
-                # Split long chunks based on length
-                words = chunk.split()
-                current_line = words[0]
-                for word in words[1:]:
-                    if len(current_line + ' ' + word) <= max_length:
-                        current_line += ' ' + word
-                    else:
-                        if current_line.endswith(' and'):
-                            current_line = current_line[:-4]
-                            word = 'and ' + word
-                        if current_line.endswith(' or'):
-                            current_line = current_line[:-3]
-                            word = 'or ' + word
-                        result.append(current_line.strip())
-                        current_line = word
-                result.append(current_line.strip())
-
-        result = group_sentences(result, max_length)
-        logger.debug(f'Split sentence into : {result}')
-
-        return result
-    
-
     @utils.time_it
     def _merge_audio_files(self, audio_files, voiceline_file_name):
-        merged_audio = np.array([])
+        """Joins the audio of the phrases of a voiceline into a single file
 
+        The length of every phrase is read from its header first, so the merged audio is allocated once,
+        each phrase is read straight into its place and the merged file is written a single time
+        """
+        audio_infos = []
         for audio_file in audio_files:
             try:
-                audio, samplerate = sf.read(audio_file)
-                merged_audio = np.concatenate((merged_audio, audio))
-                sf.write(voiceline_file_name, merged_audio, samplerate)
-            except:
+                audio_infos.append((audio_file, sf.info(audio_file)))
+            except Exception:
                 logger.error(f'Could not find voiceline file: {audio_file}')
+        if len(audio_infos) == 0:
+            return
+
+        samplerate = audio_infos[0][1].samplerate
+        channels = audio_infos[0][1].channels
+        total_frames = sum(info.frames for _, info in audio_infos)
+        merged_audio = np.zeros((total_frames, channels) if channels > 1 else total_frames, dtype=np.float64)
+
+        position = 0
+        for audio_file, info in audio_infos:
+            if info.samplerate != samplerate or info.channels != channels:
+                logger.error(f'Voiceline file {audio_file} does not match the format of the other phrases ({info.samplerate} Hz, {info.channels} channels), skipping it')
+                continue
+            try:
+                frames_read = sf.read(audio_file, out=merged_audio[position:position + info.frames])[0].shape[0]
+            except Exception:
+                logger.error(f'Could not read voiceline file: {audio_file}')
+                continue
+            position += frames_read
+
+        sf.write(voiceline_file_name, merged_audio[:position], samplerate)
 
 
     @utils.time_it
@@ -245,9 +222,9 @@ class xVASynth(TTSable):
         max_attempts = 3
         for attempt in range(max_attempts):
             try:
-                requests.post(self.__synthesize_url, json=data)
+                self.__session.post(self.__synthesize_url, json=data, read_timeout=self.__request_timeout)
                 break  # exit the loop if the request is successful
-            except ConnectionError as e:
+            except requests.exceptions.ConnectionError as e:
                 if attempt < max_attempts - 1:  # if not the last attempt
                     logger.warning(f"Connection error while synthesizing voiceline. Restarting xVASynth server... ({attempt})")
                     if voicemodelversion!='1.0':
@@ -277,9 +254,9 @@ class xVASynth(TTSable):
         max_attempts = 3
         for attempt in range(max_attempts):
             try:
-                requests.post(self.__synthesize_batch_url, json=data)
+                self.__session.post(self.__synthesize_batch_url, json=data, read_timeout=self.__request_timeout)
                 break  # Exit the loop if the request is successful
-            except ConnectionError as e:
+            except requests.exceptions.ConnectionError as e:
                 if attempt < max_attempts - 1:  # Not the last attempt
                     logger.warning(f"Connection error while synthesizing voiceline. Restarting xVASynth server... ({attempt})")
                     self._run_xvasynth_server()
@@ -299,7 +276,7 @@ class xVASynth(TTSable):
                 raise TTSServiceFailure()
 
             # contact local xVASynth server; ~2 second timeout
-            response = requests.get('http://127.0.0.1:8008/')
+            response = self.__session.get('http://127.0.0.1:8008/', timeout=2, max_retries=0)
             response.raise_for_status()  # If the response contains an HTTP error status code, raise an exception
         except requests.exceptions.RequestException as err:
             if ('Connection aborted' in err.__str__()):
@@ -370,7 +347,7 @@ class xVASynth(TTSable):
             'pluginsContext': '{}',
         }
         try:
-            requests.post(self.__loadmodel_url, json=backup_model_change)
+            self.__session.post(self.__loadmodel_url, json=backup_model_change, read_timeout=self.__request_timeout)
             logger.log(self._loglevel, f'Backup model {voice} loaded.')
         except:
             logger.error(f"Backup model {voice} failed to load")
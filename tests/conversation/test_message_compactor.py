@@ -0,0 +1,144 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from src.config.config_loader import ConfigLoader
+from src.character_manager import Character
+from src.characters_manager import Characters
+from src.conversation.message_compactor import MessageCompactor
+from src.llm.llm_client import LLMClient
+from src.llm.message_thread import message_thread
+from src.llm.messages import AssistantMessage, CompactionMessage, Message, ToolMessage, UserMessage
+from src.llm.sentence import Sentence
+from src.llm.sentence_content import SentenceContent, SentenceTypeEnum
+
+
+@pytest.fixture
+def long_thread(default_config: ConfigLoader, example_skyrim_npc_character: Character) -> message_thread:
+    thread = message_thread(default_config, "You are a helpful NPC.")
+    for i in range(20):
+        thread.add_message(UserMessage(default_config, f"Tell me about the road number {i}.", "Prisoner"))
+        assistant_message = AssistantMessage(default_config)
+        assistant_message.add_sentence(Sentence(SentenceContent(example_skyrim_npc_character, f"Road number {i} leads north, past the old watchtower.", SentenceTypeEnum.SPEECH), "", 0))
+        thread.add_message(assistant_message)
+    return thread
+
+
+@pytest.fixture
+def compactor(default_config: ConfigLoader, llm_client: LLMClient, mocker) -> MessageCompactor:
+    mocker.patch.object(llm_client, 'request_call', return_value="The player asked about the roads north of Whiterun.")
+    return MessageCompactor(llm_client, default_config, "English")
+
+
+def wait_for_compaction(compactor: MessageCompactor, messages: message_thread, timeout: float = 5) -> tuple[list[Message], list[int]] | None:
+    start = time.time()
+    while time.time() - start < timeout:
+        result = compactor.apply(messages)
+        if result or not compactor.is_compacting:
+            return result
+        time.sleep(0.01)
+    return None
+
+
+def test_compaction_replaces_oldest_messages(compactor: MessageCompactor, long_thread: message_thread, llm_client: LLMClient, example_characters_pc_to_npc: Characters):
+    newest_messages = [m.get_formatted_content() for m in long_thread.get_talk_only()[-4:]]
+    tokens_before = llm_client.get_count_tokens(long_thread)
+
+    assert compactor.start(long_thread, example_characters_pc_to_npc, token_budget_to_keep=80)
+    result = wait_for_compaction(compactor, long_thread)
+
+    assert result is not None
+    compacted_messages, replaced_indices = result
+    assert replaced_indices == list(range(1, len(compacted_messages) + 1))
+    assert isinstance(long_thread[1], CompactionMessage)
+    assert "The player asked about the roads north of Whiterun." in long_thread[1].get_formatted_content()
+    assert [m.get_formatted_content() for m in long_thread.get_talk_only()[-4:]] == newest_messages
+    assert llm_client.get_count_tokens(long_thread) < tokens_before
+    assert not compactor.is_compacting
+
+
+def test_compaction_not_started_when_everything_fits(compactor: MessageCompactor, long_thread: message_thread, example_characters_pc_to_npc: Characters):
+    assert not compactor.start(long_thread, example_characters_pc_to_npc, token_budget_to_keep=100000)
+    assert not compactor.is_compacting
+
+
+def test_compaction_discarded_after_reload(compactor: MessageCompactor, long_thread: message_thread, llm_client: LLMClient, example_characters_pc_to_npc: Characters):
+    assert compactor.start(long_thread, example_characters_pc_to_npc, token_budget_to_keep=80)
+    long_thread.reload_message_thread("New prompt.", llm_client.get_message_token_count, 80)
+    messages_after_reload = list(long_thread)
+
+    assert wait_for_compaction(compactor, long_thread) is None
+    assert list(long_thread) == messages_after_reload
+    assert not compactor.is_compacting
+
+
+@pytest.mark.parametrize("token_budget_to_keep, expected_compacted_count", [
+    (3, 3), # the budget ends between the tool call and its result, the pair is kept
+    (2, 5), # the budget ends after the tool result, the pair is compacted
+])
+def test_compaction_keeps_tool_calls_with_their_results(default_config: ConfigLoader, token_budget_to_keep: int, expected_compacted_count: int):
+    thread = message_thread(default_config, "You are a helpful NPC.")
+    tool_call_message = AssistantMessage(default_config)
+    tool_call_message.tool_calls = [{"id": "call_1", "type": "function", "function": {"name": "Follow", "arguments": "{}"}}]
+    for message in [
+        UserMessage(default_config, "Hello.", "Prisoner"),
+        AssistantMessage(default_config),
+        UserMessage(default_config, "Follow me.", "Prisoner"),
+        tool_call_message,
+        ToolMessage("call_1"),
+        UserMessage(default_config, "Thanks.", "Prisoner"),
+        AssistantMessage(default_config),
+    ]:
+        thread.add_message(message)
+
+    messages_to_compact = thread.get_messages_to_compact(lambda message: 1, token_budget_to_keep)
+    thread.replace_messages(messages_to_compact, CompactionMessage(default_config, "Summary."))
+
+    assert len(messages_to_compact) == expected_compacted_count
+    roles = [message["role"] for message in thread.get_openai_messages()]
+    for i, role in enumerate(roles):
+        if role == "tool":
+            assert thread[i - 1] is tool_call_message
+
+
+def test_slow_compaction_does_not_delay_streamed_response(default_config: ConfigLoader, llm_client: LLMClient, long_thread: message_thread, example_characters_pc_to_npc: Characters, mocker):
+    summary_started = threading.Event()
+    def slow_summary(**kwargs):
+        summary_started.set()
+        time.sleep(1)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="The player asked about the roads."))])
+    mocker.patch.object(llm_client, 'generate_sync_client', return_value=SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=slow_summary))))
+
+    class ResponseStream:
+        async def __aiter__(self):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="Hello", tool_calls=None))])
+        async def close(self):
+            pass
+    async def create_stream(**kwargs):
+        return ResponseStream()
+    mocker.patch.object(llm_client, 'generate_async_client', return_value=SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create_stream))))
+
+    compactor = MessageCompactor(llm_client, default_config, "English")
+    assert compactor.start(long_thread, example_characters_pc_to_npc, token_budget_to_keep=80)
+    assert summary_started.wait(5)
+
+    async def stream_response() -> list:
+        return [item async for item in llm_client.streaming_call(UserMessage(default_config, "Hello there."), False)]
+    start = time.time()
+    items = asyncio.run(stream_response())
+
+    assert items == [("content", "Hello")]
+    assert time.time() - start < 0.5
+    assert compactor.is_compacting
+    assert wait_for_compaction(compactor, long_thread) is not None
+
+
+def test_remap_participation_log(example_skyrim_npc_character: Character, another_example_skyrim_npc_character: Character):
+    characters = Characters()
+    characters.add_or_update_character(example_skyrim_npc_character, 0)
+    characters.add_or_update_character(another_example_skyrim_npc_character, 10)
+
+    characters.remap_participation_log(lambda index: index - 5 if index > 5 else index)
+
+    assert characters.get_participation_log() == [("join", example_skyrim_npc_character.name, 0), ("join", another_example_skyrim_npc_character.name, 5)]
@@ -0,0 +1,141 @@
+from concurrent.futures import Future
+from unittest.mock import MagicMock
+import pytest
+from src.conversation.context import Context
+from src.conversation.conversation import Conversation
+from src.llm.llm_client import LLMClient
+from src.llm.messages import UserMessage
+from src.remember.summaries import Summaries
+
+
+def _make_chat_manager() -> MagicMock:
+    """Records the last message of every response it is asked to generate in responded_to. Responses run until stop_generation is called"""
+    chat_manager = MagicMock()
+    chat_manager.listen_requested = False
+    chat_manager.end_conversation_requested = False
+    chat_manager.responded_to = []
+    generations: list[Future] = []
+    def start_generating_response(messages, *args, **kwargs) -> Future:
+        chat_manager.responded_to.append(messages.get_last_message().text)
+        generation = Future()
+        generations.append(generation)
+        return generation
+    def stop_generation():
+        for generation in generations:
+            if not generation.done():
+                generation.set_result(None)
+    def clear_listen_requested():
+        chat_manager.listen_requested = False
+    def clear_end_conversation_requested():
+        chat_manager.end_conversation_requested = False
+    chat_manager.start_generating_response.side_effect = start_generating_response
+    chat_manager.stop_generation.side_effect = stop_generation
+    chat_manager.clear_listen_requested.side_effect = clear_listen_requested
+    chat_manager.clear_end_conversation_requested.side_effect = clear_end_conversation_requested
+    return chat_manager
+
+
+def _make_stt(interim_transcriptions: list[str], final_transcription: str) -> MagicMock:
+    """STT that reports the player pausing after each interim transcription before returning the final one"""
+    def get_latest_transcription(silence_timeout: float = 0, on_speech_paused = None) -> str:
+        for interim_transcription in interim_transcriptions:
+            on_speech_paused(interim_transcription)
+        return final_transcription
+    stt = MagicMock()
+    stt.is_listening = True
+    stt.temporary_pause = None
+    stt.get_latest_transcription.side_effect = get_latest_transcription
+    return stt
+
+
+@pytest.fixture
+def chat_manager() -> MagicMock:
+    return _make_chat_manager()
+
+
+def _make_conversation(context: Context, chat_manager: MagicMock, rememberer: Summaries, llm_client: LLMClient, stt: MagicMock) -> Conversation:
+    context.config.proactive_mic_mode = True
+    context.config.speculative_response = True
+    return Conversation(context, chat_manager, rememberer, llm_client, stt, True, False)
+
+
+def _user_messages(conversation: Conversation) -> list[UserMessage]:
+    messages = conversation._Conversation__messages
+    return [messages[i] for i in range(len(messages)) if isinstance(messages[i], UserMessage)]
+
+
+def test_matching_speculative_response_is_kept(default_context: Context, chat_manager: MagicMock, default_rememberer: Summaries, llm_client: LLMClient):
+    default_context.get_context_ingame_events().append('It starts raining.')
+    stt = _make_stt(['where is the nearest inn'], 'Where is the nearest inn?')
+    conversation = _make_conversation(default_context, chat_manager, default_rememberer, llm_client, stt)
+
+    player_text, _, _ = conversation.process_player_input('')
+
+    assert player_text == 'Where is the nearest inn?'
+    assert chat_manager.responded_to == ['where is the nearest inn']
+    user_messages = _user_messages(conversation)
+    assert len(user_messages) == 1
+    assert user_messages[0].text == 'Where is the nearest inn?'
+    assert 'It starts raining.' in user_messages[0].get_formatted_content()
+    assert default_context.get_context_ingame_events() == []
+
+
+def test_outdated_speculative_response_is_restarted(default_context: Context, chat_manager: MagicMock, default_rememberer: Summaries, llm_client: LLMClient):
+    default_context.get_context_ingame_events().append('It starts raining.')
+    stt = _make_stt(['Where is', 'Where is the nearest'], 'Where is the nearest inn?')
+    conversation = _make_conversation(default_context, chat_manager, default_rememberer, llm_client, stt)
+
+    conversation.process_player_input('')
+
+    assert chat_manager.responded_to == ['Where is', 'Where is the nearest', 'Where is the nearest inn?']
+    user_messages = _user_messages(conversation)
+    assert len(user_messages) == 1
+    assert user_messages[0].text == 'Where is the nearest inn?'
+    assert 'It starts raining.' in user_messages[0].get_formatted_content()
+
+
+def test_no_speculative_response_to_goodbye(default_context: Context, chat_manager: MagicMock, default_rememberer: Summaries, llm_client: LLMClient):
+    goodbye = default_context.config.end_conversation_keyword.split(',')[0]
+    stt = _make_stt([goodbye], 'Where is the nearest inn?')
+    conversation = _make_conversation(default_context, chat_manager, default_rememberer, llm_client, stt)
+
+    conversation.process_player_input('')
+
+    assert chat_manager.responded_to == ['Where is the nearest inn?']
+
+
+def test_tool_calls_of_discarded_speculative_response_are_undone(default_context: Context, chat_manager: MagicMock, default_rememberer: Summaries, llm_client: LLMClient):
+    stt = _make_stt(['Goodnight then'], 'Goodnight then, see you tomorrow.')
+    start_generating_response = chat_manager.start_generating_response.side_effect
+    def respond_with_tool_calls(messages, *args, **kwargs):
+        if not chat_manager.responded_to: # the speculative response ends the conversation and asks the player to keep talking
+            chat_manager.end_conversation_requested = True
+            chat_manager.listen_requested = True
+            stt.temporary_pause = 10.0
+        return start_generating_response(messages, *args, **kwargs)
+    chat_manager.start_generating_response.side_effect = respond_with_tool_calls
+    conversation = _make_conversation(default_context, chat_manager, default_rememberer, llm_client, stt)
+
+    conversation.process_player_input('')
+
+    assert chat_manager.responded_to == ['Goodnight then', 'Goodnight then, see you tomorrow.']
+    assert not chat_manager.end_conversation_requested
+    assert not chat_manager.listen_requested
+    assert stt.temporary_pause is None
+
+
+def test_speculative_response_is_restarted_for_new_events(default_context: Context, chat_manager: MagicMock, default_rememberer: Summaries, llm_client: LLMClient):
+    stt = _make_stt(['Where is the nearest inn'], 'Where is the nearest inn?')
+    start_generating_response = chat_manager.start_generating_response.side_effect
+    def respond(messages, *args, **kwargs):
+        default_context.get_context_ingame_events().append('A dragon appears.') # arrives while the player is still speaking
+        return start_generating_response(messages, *args, **kwargs)
+    chat_manager.start_generating_response.side_effect = respond
+    conversation = _make_conversation(default_context, chat_manager, default_rememberer, llm_client, stt)
+
+    conversation.process_player_input('')
+
+    assert chat_manager.responded_to == ['Where is the nearest inn', 'Where is the nearest inn?']
+    user_messages = _user_messages(conversation)
+    assert len(user_messages) == 1
+    assert 'A dragon appears.' in user_messages[0].get_formatted_content()
@@ -188,4 +188,19 @@ def test_setup_route_ends_conversation(default_config: ConfigLoader, english_lan
     assert second_game is not None
     
     # Assert that a new game instance was created
-    assert first_game is not second_game
\ No newline at end of file
+    assert first_game is not second_game
+
+
+def test_setup_route_closes_replaced_tts(default_config: ConfigLoader, english_language_info: dict, monkeypatch):
+    """Test that the TTS service of the previous setup is closed, so it does not leave Piper processes running"""
+    close = MagicMock()
+    monkeypatch.setattr(Piper, 'close', close)
+    route = mantella_route(
+        config=default_config,
+        language_info=english_language_info,
+    )
+
+    route._setup_route()
+    close.assert_not_called()
+    route._setup_route()
+    close.assert_called_once()
@@ -0,0 +1,132 @@
+import pytest
+from unittest.mock import MagicMock
+from src.characters_manager import Characters
+from src.conversation.action import Action
+from src.llm.output.actions_parser import actions_parser
+from src.llm.output.change_character_parser import change_character_parser
+from src.llm.output.italics_parser import italics_parser
+from src.llm.output.max_count_sentences_parser import max_count_sentences_parser
+from src.llm.output.narration_parser import narration_parser
+from src.llm.output.output_parser import output_parser, sentence_generation_settings
+from src.llm.output.output_parser_chain import output_parser_chain
+from src.llm.output.sentence_accumulator import sentence_accumulator
+from src.llm.output.sentence_end_parser import sentence_end_parser
+from src.llm.output.sentence_length_parser import sentence_length_parser
+from src.llm.sentence_content import SentenceContent
+
+
+@pytest.fixture
+def wave_action() -> Action:
+    return Action(
+        identifier="wave",
+        name="Wave",
+        keyword="Wave",
+        description="Waves at the player",
+        prompt_text="If the player asks you to wave, begin your response with 'Wave:'.",
+        requires_response=False,
+        is_interrupting=False,
+        one_on_one=True,
+        multi_npc=False,
+        radiant=False
+    )
+
+
+def create_parsers(characters: Characters, actions: list[Action]) -> list[output_parser]:
+    return [
+        change_character_parser(characters),
+        italics_parser(),
+        narration_parser(),
+        sentence_end_parser(),
+        actions_parser(actions),
+        sentence_length_parser(3),
+        max_count_sentences_parser(100, False)
+    ]
+
+
+def parse_with_parser_loop(parsers: list[output_parser], tokens: list[str], characters: Characters) -> list[tuple[str, str, str]]:
+    """Reference: runs the parsers one after the other the way the output manager used to"""
+    cut_indicators: set[str] = set()
+    for parser in parsers:
+        cut_indicators.update(parser.get_cut_indicators())
+    accumulator = sentence_accumulator(list(cut_indicators))
+    settings = sentence_generation_settings(characters.last_added_character)
+    pending_sentence: SentenceContent | None = None
+    results: list[SentenceContent] = []
+    for token in tokens:
+        accumulator.accumulate(token)
+        while accumulator.has_next_sentence():
+            current_sentence = accumulator.get_next_sentence()
+            parsed_sentence: SentenceContent | None = None
+            for parser in parsers:
+                if not parsed_sentence:
+                    parsed_sentence, current_sentence = parser.cut_sentence(current_sentence, settings)
+                if parsed_sentence:
+                    parsed_sentence, pending_sentence = parser.modify_sentence_content(parsed_sentence, pending_sentence, settings)
+                if settings.stop_generation:
+                    break
+            accumulator.refuse(current_sentence)
+            if parsed_sentence:
+                results.append(parsed_sentence)
+    if pending_sentence:
+        results.append(pending_sentence)
+    return [(s.speaker.name, s.sentence_type.name, s.text) for s in results]
+
+
+def parse_with_chain(chain: output_parser_chain, tokens: list[str], characters: Characters) -> list[tuple[str, str, str]]:
+    accumulator = sentence_accumulator(chain.get_cut_indicators())
+    settings = sentence_generation_settings(characters.last_added_character)
+    results: list[SentenceContent] = []
+    for token in tokens:
+        accumulator.accumulate(token)
+        while accumulator.has_next_sentence():
+            parsed_sentence, current_sentence = chain.cut_sentence(accumulator.get_next_sentence(), settings)
+            accumulator.refuse(current_sentence)
+            if parsed_sentence:
+                results.append(parsed_sentence)
+    pending_sentence = chain.take_pending_sentence()
+    if pending_sentence:
+        results.append(pending_sentence)
+    return [(s.speaker.name, s.sentence_type.name, s.text) for s in results]
+
+
+@pytest.mark.parametrize("response", [
+    "Hello there, traveller. What brings you to Whiterun today? Ah. I see.",
+    "*draws sword* You should not have come here. I am *really* angry!",
+    "Wave: Hello! It is good to see you again, my friend.",
+    "Guard: Halt! Who goes there? Lydia: Stand down, it is only the Dragonborn.",
+    "I think... maybe we should go. \"Quickly now,\" she says. (She looks around nervously.) Yes.",
+    "Hmm?! Okay; fine. That is all there is to it, I suppose.",
+])
+def test_chain_matches_parser_loop(example_characters_multi_npc: Characters, wave_action: Action, response: str):
+    tokens = [word + " " for word in response.split(" ")]
+    expected = parse_with_parser_loop(create_parsers(example_characters_multi_npc, [wave_action]), tokens, example_characters_multi_npc)
+    chain = output_parser_chain(create_parsers(example_characters_multi_npc, [wave_action]))
+
+    assert parse_with_chain(chain, tokens, example_characters_multi_npc) == expected
+
+
+def test_chain_merges_cut_indicators(example_characters_multi_npc: Characters, wave_action: Action):
+    chain = output_parser_chain(create_parsers(example_characters_multi_npc, [wave_action]))
+    indicators = chain.get_cut_indicators()
+
+    assert len(indicators) == len(set(indicators))
+    for expected in [":", ".", "?", "!", "*", "(", ")", "\""]:
+        assert expected in indicators
+
+
+def test_chain_skips_parsers_without_triggers(example_characters_multi_npc: Characters):
+    """Parsers are only asked to cut a text that contains one of their triggers"""
+    triggered_parser = MagicMock(spec=output_parser)
+    triggered_parser.get_cut_indicators.return_value = ["#"]
+    triggered_parser.get_cut_triggers.return_value = "#"
+    triggered_parser.cut_sentence.side_effect = lambda output, settings: (None, output)
+    chain = output_parser_chain([triggered_parser, sentence_end_parser()])
+    settings = sentence_generation_settings(example_characters_multi_npc.last_added_character)
+
+    parsed_sentence, rest = chain.cut_sentence("Hello there. How are you", settings)
+    assert parsed_sentence.text == "Hello there."
+    assert rest == " How are you"
+    triggered_parser.cut_sentence.assert_not_called()
+
+    chain.cut_sentence("Hello #there. How are you", settings)
+    triggered_parser.cut_sentence.assert_called_once()
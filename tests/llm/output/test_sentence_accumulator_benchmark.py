@@ -0,0 +1,46 @@
+import time
+import pytest
+from src.llm.output.sentence_accumulator import sentence_accumulator
+
+
+def stream_tokens(accumulator: sentence_accumulator, tokens: list[str]) -> tuple[list[str], float]:
+    """Feeds tokens one by one and polls for sentences after each, the same way the output manager does"""
+    sentences: list[str] = []
+    start = time.perf_counter()
+    for token in tokens:
+        accumulator.accumulate(token)
+        while accumulator.has_next_sentence():
+            sentences.append(accumulator.get_next_sentence())
+    return sentences, time.perf_counter() - start
+
+
+def unpunctuated_tokens(token_count: int) -> list[str]:
+    """A long narration block without any sentence end, eg a list or run-on text"""
+    return [f" word{i % 10}" for i in range(token_count)] + ["."]
+
+
+def ellipsis_tokens(token_count: int) -> list[str]:
+    """Long text full of ellipses, which are scanned but never cut"""
+    return [" hmm", "..."] * (token_count // 2) + [" done."]
+
+
+def short_sentence_tokens(token_count: int) -> list[str]:
+    return [" Hello", " there", "."] * (token_count // 3)
+
+
+@pytest.mark.parametrize("make_tokens", [unpunctuated_tokens, ellipsis_tokens, short_sentence_tokens])
+def test_sentences_add_up_to_streamed_text(make_tokens):
+    tokens = make_tokens(1000)
+    sentences, _ = stream_tokens(sentence_accumulator(['.', '?', '!', ';']), tokens)
+
+    assert ''.join(sentences) == ''.join(tokens)
+
+
+@pytest.mark.parametrize("make_tokens", [unpunctuated_tokens, ellipsis_tokens])
+def test_sentence_accumulator_scales_linearly(make_tokens):
+    """The cost per token must not grow with the length of the pending text"""
+    _, short_elapsed = stream_tokens(sentence_accumulator(['.', '?', '!', ';']), make_tokens(2000))
+    _, long_elapsed = stream_tokens(sentence_accumulator(['.', '?', '!', ';']), make_tokens(40000))
+
+    # 20x the tokens, allow plenty of headroom for timing noise. A quadratic scan would take ~400x as long
+    assert long_elapsed < short_elapsed * 20 * 5
@@ -3,6 +3,10 @@ from src.llm.client_base import ClientBase
 from unittest.mock import patch
 import json
 import os
+import asyncio
+import threading
+from types import SimpleNamespace
+from src.llm.messages import UserMessage
 
 
 def test_service_key_found_in_mod_secret_json(tmp_path, monkeypatch):
@@ -132,4 +136,120 @@ def test_nanogpt_success():
     """Test successful NanoGPT model list retrieval"""
     result = ClientBase.get_model_list("NanoGPT")
     assert result.default_model == "mistral-small-31-24b-instruct"
-    assert result.allows_manual_model_input is False
\ No newline at end of file
+    assert result.allows_manual_model_input is False
+
+async def _collect_merged(response_stream, concurrent_tool_calls) -> list:
+    merged = []
+    async for item in ClientBase._ClientBase__merge_concurrent_tool_calls(response_stream, concurrent_tool_calls):
+        merged.append(item)
+    return merged
+
+
+@pytest.mark.asyncio
+async def test_concurrent_tool_calls_merged_as_soon_as_available():
+    """Tool calls from a concurrent function client request should be yielded while the text stream is still waiting"""
+    tool_calls = [{"id": "call_1", "type": "function", "function": {"name": "Follow", "arguments": "{}"}}]
+
+    async def function_client_request():
+        await asyncio.sleep(0.05)
+        return tool_calls
+
+    async def slow_stream():
+        yield "chunk 1"
+        await asyncio.sleep(0.3)
+        yield "chunk 2"
+
+    merged = await _collect_merged(slow_stream(), asyncio.ensure_future(function_client_request()))
+    assert merged == ["chunk 1", ("tool_calls", tool_calls), "chunk 2"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_tool_calls_awaited_after_stream_ends():
+    """Tool calls that arrive after the text stream has finished should still be yielded"""
+    tool_calls = [{"id": "call_1", "type": "function", "function": {"name": "Follow", "arguments": "{}"}}]
+
+    async def function_client_request():
+        await asyncio.sleep(0.1)
+        return tool_calls
+
+    async def fast_stream():
+        yield "chunk 1"
+
+    merged = await _collect_merged(fast_stream(), asyncio.ensure_future(function_client_request()))
+    assert merged == ["chunk 1", ("tool_calls", tool_calls)]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_tool_calls_error_ignored():
+    """A failing function client request should not break the text stream"""
+    async def function_client_request():
+        raise Exception("Simulated function LLM error")
+
+    async def fast_stream():
+        yield "chunk 1"
+        yield "chunk 2"
+
+    merged = await _collect_merged(fast_stream(), asyncio.ensure_future(function_client_request()))
+    assert merged == ["chunk 1", "chunk 2"]
+
+
+class _FakeResponseStream:
+    def __init__(self, texts: list[str]):
+        self.__texts = texts
+        self.closed = False
+
+    async def __aiter__(self):
+        for text in self.__texts:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text, tool_calls=None))])
+
+    async def close(self):
+        self.closed = True
+
+
+def _fake_async_client(texts: list[str]):
+    async def create(**kwargs):
+        return _FakeResponseStream(texts)
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+@pytest.mark.asyncio
+async def test_streaming_call_waits_for_generation_lock_without_blocking_loop(llm_client, default_config, mocker):
+    """While another request holds the generation lock, the event loop should keep running other tasks"""
+    mocker.patch.object(llm_client, 'generate_async_client', return_value=_fake_async_client(["Hello"]))
+    llm_client._generation_lock.acquire()
+    threading.Timer(0.3, llm_client._generation_lock.release).start()
+
+    ticks = 0
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+    ticker_task = asyncio.ensure_future(ticker())
+
+    items = [item async for item in llm_client.streaming_call(UserMessage(default_config, "Hi"), False)]
+    ticker_task.cancel()
+
+    assert items == [("content", "Hello")]
+    assert ticks > 5
+    assert not llm_client._generation_lock.locked()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_streaming_call_releases_generation_lock(llm_client, default_config, mocker):
+    """A generation cancelled while waiting for the lock should not leave the lock held once it is handed over"""
+    mocker.patch.object(llm_client, 'generate_async_client', return_value=_fake_async_client(["Hello"]))
+    llm_client._generation_lock.acquire()
+
+    async def consume():
+        return [item async for item in llm_client.streaming_call(UserMessage(default_config, "Hi"), False)]
+    generation = asyncio.ensure_future(consume())
+    await asyncio.sleep(0.1)
+    generation.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await generation
+
+    llm_client._generation_lock.release()
+    await asyncio.sleep(0.1)
+    assert llm_client._generation_lock.acquire(timeout=1)
+    llm_client._generation_lock.release()
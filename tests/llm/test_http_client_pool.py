@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+from src.llm.http_client_pool import HttpClientPool, get_http_client_pool
+from src.llm.llm_client import LLMClient
+
+
+@pytest.fixture
+def pool():
+    pool = HttpClientPool(max_connections=5, keepalive_expiry=10.0)
+    yield pool
+    pool.close()
+
+
+def test_sync_client_reused_per_endpoint(pool: HttpClientPool):
+    """The same endpoint should always get the same pooled client"""
+    first = pool.get_sync_client("https://openrouter.ai/api/v1")
+    second = pool.get_sync_client("https://openrouter.ai/api/v1")
+    other = pool.get_sync_client("http://localhost:5001/v1")
+
+    assert first is second
+    assert first is not other
+
+
+def test_configure_replaces_clients(pool: HttpClientPool):
+    """Changing the pool settings should close existing clients and create new ones on next use"""
+    old_client = pool.get_sync_client("https://openrouter.ai/api/v1")
+    pool.configure(max_connections=20, keepalive_expiry=5.0, http2=False)
+    new_client = pool.get_sync_client("https://openrouter.ai/api/v1")
+
+    assert old_client.is_closed
+    assert new_client is not old_client
+    assert pool.max_connections == 20
+    assert pool.keepalive_expiry == 5.0
+
+
+def test_configure_same_settings_keeps_clients(pool: HttpClientPool):
+    """Reapplying identical settings should not drop existing connections"""
+    client = pool.get_sync_client("https://openrouter.ai/api/v1")
+    pool.configure(max_connections=5, keepalive_expiry=10.0, http2=False)
+
+    assert pool.get_sync_client("https://openrouter.ai/api/v1") is client
+    assert not client.is_closed
+
+
+def test_async_client_adopted_by_first_loop(pool: HttpClientPool):
+    """A client prepared outside an event loop should be reused by the first loop that needs it"""
+    prepared = pool.get_async_client("https://openrouter.ai/api/v1")
+
+    async def get_clients():
+        return pool.get_async_client("https://openrouter.ai/api/v1"), pool.get_async_client("https://openrouter.ai/api/v1")
+
+    first, second = asyncio.run(get_clients())
+    assert first is prepared
+    assert second is prepared
+
+
+def test_async_clients_separate_per_loop(pool: HttpClientPool):
+    """Each event loop should get its own async client, and closing a loop's clients should only affect that loop"""
+    async def get_and_close():
+        client = pool.get_async_client("https://openrouter.ai/api/v1")
+        await pool.aclose_loop_clients()
+        return client
+
+    first = asyncio.run(get_and_close())
+    second = asyncio.run(get_and_close())
+
+    assert first is not second
+    assert first.is_closed
+    assert second.is_closed
+
+
+def test_llm_client_uses_pooled_connections(llm_client: LLMClient):
+    """Clients generated by the LLM client should share the pooled connections of their endpoint"""
+    first = llm_client.generate_sync_client()
+    second = llm_client.generate_sync_client()
+
+    assert first._client is second._client
+    assert first._client is get_http_client_pool().get_sync_client(llm_client._base_url)
@@ -0,0 +1,184 @@
+import time
+import pytest
+from src.config.config_loader import ConfigLoader
+from src.character_manager import Character
+from src.llm.llm_client import LLMClient
+from src.llm.message_thread import message_thread
+from src.llm.messages import AssistantMessage, Message, UserMessage
+from src.llm.sentence import Sentence
+from src.llm.sentence_content import SentenceContent, SentenceTypeEnum
+
+
+def count_tokens_uncached(llm_client: LLMClient, messages: list[Message]) -> int:
+    """Reference count that encodes every message from scratch"""
+    num_tokens = 0
+    for message in messages:
+        num_tokens += 4
+        for key, value in message.get_openai_message().items():
+            if isinstance(value, str):
+                num_tokens += len(llm_client._encoding.encode(value))
+                if key == "name":
+                    num_tokens += -1
+    return num_tokens + 2
+
+
+@pytest.fixture
+def example_thread(default_config: ConfigLoader, example_skyrim_npc_character: Character) -> message_thread:
+    thread = message_thread(default_config, "You are a helpful NPC.")
+    thread.add_message(UserMessage(default_config, "Hello there, how are you today?", "Prisoner"))
+    assistant_message = AssistantMessage(default_config)
+    assistant_message.add_sentence(Sentence(SentenceContent(example_skyrim_npc_character, "I am doing well.", SentenceTypeEnum.SPEECH), "", 0))
+    thread.add_message(assistant_message)
+    return thread
+
+
+@pytest.fixture
+def counting_encoder(llm_client: LLMClient, monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Records every text that is encoded by the LLM client"""
+    encoded: list[str] = []
+    original_encode = llm_client._encoding.encode
+    def encode(text: str, *args, **kwargs):
+        encoded.append(text)
+        return original_encode(text, *args, **kwargs)
+    monkeypatch.setattr(llm_client._encoding, "encode", encode)
+    return encoded
+
+
+def test_token_count_matches_full_count(llm_client: LLMClient, example_thread: message_thread):
+    assert llm_client.get_count_tokens(example_thread) == count_tokens_uncached(llm_client, list(example_thread))
+    assert llm_client.get_count_tokens(example_thread.get_talk_only()) == count_tokens_uncached(llm_client, example_thread.get_talk_only())
+
+
+def test_repeated_token_counts_do_not_encode_again(llm_client: LLMClient, example_thread: message_thread, counting_encoder: list[str]):
+    first = llm_client.get_count_tokens(example_thread)
+    encode_calls = len(counting_encoder)
+    for _ in range(10):
+        assert llm_client.get_count_tokens(example_thread) == first
+    assert len(counting_encoder) == encode_calls
+
+
+def test_new_message_only_encodes_new_message(default_config: ConfigLoader, llm_client: LLMClient, example_thread: message_thread, counting_encoder: list[str]):
+    llm_client.get_count_tokens(example_thread)
+    counting_encoder.clear()
+
+    example_thread.add_message(UserMessage(default_config, "What news from the capital?", "Prisoner"))
+
+    count = llm_client.get_count_tokens(example_thread)
+    assert counting_encoder == list(example_thread.get_last_message().get_openai_message().values())
+    assert count == count_tokens_uncached(llm_client, list(example_thread))
+
+
+def test_token_count_updates_when_sentence_added(llm_client: LLMClient, example_thread: message_thread, example_skyrim_npc_character: Character):
+    before = llm_client.get_count_tokens(example_thread)
+
+    last_assistant_message = example_thread.get_last_assistant_message()
+    last_assistant_message.add_sentence(Sentence(SentenceContent(example_skyrim_npc_character, "The roads have been dangerous lately.", SentenceTypeEnum.SPEECH), "", 0))
+
+    after = llm_client.get_count_tokens(example_thread)
+    assert after > before
+    assert after == count_tokens_uncached(llm_client, list(example_thread))
+
+
+def test_token_count_updates_when_text_appended(llm_client: LLMClient, example_thread: message_thread):
+    llm_client.get_count_tokens(example_thread)
+
+    example_thread.append_text_to_last_assistant_message(" Farewell.")
+
+    assert llm_client.get_count_tokens(example_thread) == count_tokens_uncached(llm_client, list(example_thread))
+
+
+def test_token_count_updates_when_messages_modified(llm_client: LLMClient, example_thread: message_thread):
+    before = llm_client.get_count_tokens(example_thread)
+
+    example_thread.modify_messages("You are a helpful NPC. You are currently guarding the gates of Whiterun.", multi_npc_conversation=True)
+
+    after = llm_client.get_count_tokens(example_thread)
+    assert after > before
+    assert after == count_tokens_uncached(llm_client, list(example_thread))
+
+
+def test_token_count_updates_when_shared_message_changes(llm_client: LLMClient, example_thread: message_thread, example_skyrim_npc_character: Character):
+    cloned_thread = example_thread.clone_with_new_system_message("You are a quiet NPC.")
+    llm_client.get_count_tokens(example_thread)
+    llm_client.get_count_tokens(cloned_thread)
+
+    example_thread.get_last_assistant_message().add_sentence(Sentence(SentenceContent(example_skyrim_npc_character, "The roads have been dangerous lately.", SentenceTypeEnum.SPEECH), "", 0))
+
+    assert llm_client.get_count_tokens(example_thread) == count_tokens_uncached(llm_client, list(example_thread))
+    assert llm_client.get_count_tokens(cloned_thread) == count_tokens_uncached(llm_client, list(cloned_thread))
+
+
+def test_changes_to_other_threads_keep_token_total(default_config: ConfigLoader, llm_client: LLMClient, example_thread: message_thread):
+    other_thread = message_thread(default_config, "You are a quiet NPC.")
+    other_thread.add_message(UserMessage(default_config, "Good evening.", "Prisoner"))
+    llm_client.get_count_tokens(example_thread)
+
+    other_thread.get_last_message().append_text(" Lovely weather.")
+    other_thread.modify_messages("You are a grumpy NPC.", multi_npc_conversation=True)
+
+    assert example_thread._message_thread__token_totals
+
+
+def build_long_thread(default_config: ConfigLoader, npc: Character, message_count: int) -> message_thread:
+    thread = message_thread(default_config, "You are a helpful NPC.")
+    for i in range(message_count // 2):
+        thread.add_message(UserMessage(default_config, f"Tell me about the road number {i}.", "Prisoner"))
+        assistant_message = AssistantMessage(default_config)
+        assistant_message.add_sentence(Sentence(SentenceContent(npc, f"Road number {i} leads north, past the old watchtower.", SentenceTypeEnum.SPEECH), "", 0))
+        thread.add_message(assistant_message)
+    return thread
+
+
+def test_reload_keeps_latest_messages_within_budget(default_config: ConfigLoader, llm_client: LLMClient, example_skyrim_npc_character: Character):
+    thread = build_long_thread(default_config, example_skyrim_npc_character, 100)
+    last_text = thread.get_last_message().get_formatted_content()
+
+    thread.reload_message_thread("New prompt.", llm_client.get_message_token_count, llm_client.get_token_budget(0.1))
+
+    kept_messages = thread.get_talk_only()
+    assert 0 < len(kept_messages) < 100
+    assert thread[0].text == "New prompt."
+    assert thread.get_last_message().get_formatted_content() == last_text
+    # Same outcome as growing the list until it is too long
+    assert not llm_client.is_too_long(kept_messages, 0.1)
+    one_more_message = build_long_thread(default_config, example_skyrim_npc_character, 100).get_talk_only()[-(len(kept_messages) + 1):]
+    assert llm_client.is_too_long(one_more_message, 0.1)
+
+
+@pytest.mark.parametrize("message_count", [100, 1000, 5000])
+def test_reload_counts_each_message_at_most_once(default_config: ConfigLoader, llm_client: LLMClient, example_skyrim_npc_character: Character, message_count: int):
+    thread = build_long_thread(default_config, example_skyrim_npc_character, message_count)
+    counted_messages: list[Message] = []
+    def count_message_tokens(message: Message) -> int:
+        counted_messages.append(message)
+        return llm_client.get_message_token_count(message)
+
+    thread.reload_message_thread("New prompt.", count_message_tokens, llm_client.get_token_budget(0.1))
+
+    # Only the messages up to the first one that does not fit are counted, each of them once
+    assert len(counted_messages) == len(thread) # kept messages plus the one that exceeded the budget, in place of the old system message
+    assert len({id(m) for m in counted_messages}) == len(counted_messages)
+
+
+def test_reload_work_does_not_grow_with_thread_length(default_config: ConfigLoader, llm_client: LLMClient, example_skyrim_npc_character: Character, record_property):
+    """Messages older than the ones that fit into the budget are never looked at, so a long thread reloads with as much work as a short one.
+    The reload time at each thread length is recorded as a test property (eg in the JUnit XML report) for reference
+    """
+    counted_messages_per_length: dict[int, int] = {}
+    for message_count in [100, 1000, 5000]:
+        thread = build_long_thread(default_config, example_skyrim_npc_character, message_count)
+        counted_messages = 0
+        def count_message_tokens(message: Message) -> int:
+            nonlocal counted_messages
+            counted_messages += 1
+            return llm_client.get_message_token_count(message)
+
+        start = time.perf_counter()
+        thread.reload_message_thread("New prompt.", count_message_tokens, llm_client.get_token_budget(0.1))
+        record_property(f"reload_seconds_{message_count}_messages", time.perf_counter() - start)
+        counted_messages_per_length[message_count] = counted_messages
+
+    # 50x the messages, but only the ones that fit into the budget (plus the first one that does not) are counted.
+    # Longer threads have longer road numbers in their latest messages, so slightly fewer of them fit
+    assert counted_messages_per_length[100] < 100
+    assert all(counted <= counted_messages_per_length[100] for counted in counted_messages_per_length.values()), counted_messages_per_length
@@ -0,0 +1,47 @@
+import numpy as np
+from src.stt.audio_buffer import AudioBuffer
+
+
+def _chunk(start: int, size: int = 4) -> np.ndarray:
+    return np.arange(start, start + size, dtype=np.float32)
+
+
+def test_appended_chunks_are_returned_in_order():
+    buffer = AudioBuffer(16)
+    buffer.append(_chunk(0))
+    buffer.append(_chunk(4))
+
+    assert len(buffer) == 8
+    assert np.array_equal(buffer.view(), np.arange(8, dtype=np.float32))
+
+
+def test_buffer_grows_when_full():
+    buffer = AudioBuffer(4)
+    for i in range(0, 40, 4):
+        buffer.append(_chunk(i))
+
+    assert buffer.capacity >= 40
+    assert np.array_equal(buffer.view(), np.arange(40, dtype=np.float32))
+
+
+def test_keep_last_reuses_memory_for_lookback():
+    buffer = AudioBuffer(16)
+    for i in range(0, 400, 4):
+        buffer.append(_chunk(i))
+        buffer.keep_last(8)
+
+    assert buffer.capacity == 16 # only the lookback window is ever kept, so the buffer never has to grow
+    assert np.array_equal(buffer.view(), np.arange(392, 400, dtype=np.float32))
+
+
+def test_view_does_not_copy_and_snapshot_does():
+    buffer = AudioBuffer(16)
+    buffer.append(_chunk(0))
+    view = buffer.view()
+    snapshot = buffer.snapshot()
+
+    buffer.clear()
+    buffer.append(_chunk(100))
+
+    assert np.array_equal(view, _chunk(100))
+    assert np.array_equal(snapshot, _chunk(0))
@@ -0,0 +1,64 @@
+import time
+import numpy as np
+import soundfile as sf
+from src.stt.audio_source import ArraySource, GeneratorSource, WavFileSource
+
+
+CHUNK_SIZE = 512
+SAMPLING_RATE = 16000
+
+
+def _replay(source: GeneratorSource, sampling_rate: int = SAMPLING_RATE) -> list[np.ndarray]:
+    chunks: list[np.ndarray] = []
+    source.start(sampling_rate, CHUNK_SIZE, lambda indata, frames, time, status: chunks.append(indata.copy()))
+    assert source.wait_until_finished(timeout=5)
+    source.stop()
+    return chunks
+
+
+def test_audio_is_delivered_in_padded_chunks_followed_by_silence():
+    audio = np.arange(1, CHUNK_SIZE * 2 + 101, dtype=np.float32)
+    source = ArraySource(audio, SAMPLING_RATE, speed=0, trailing_silence_seconds=CHUNK_SIZE * 2 / SAMPLING_RATE)
+
+    chunks = _replay(source)
+
+    assert all(chunk.shape == (CHUNK_SIZE, 1) for chunk in chunks)
+    assert len(chunks) == 5
+    delivered = np.concatenate(chunks).reshape(-1)
+    assert np.array_equal(delivered[:len(audio)], audio)
+    assert not delivered[len(audio):].any()
+    assert source.audio_end_time is not None
+
+
+def test_audio_is_delivered_at_the_requested_pace():
+    audio = np.ones(SAMPLING_RATE // 4, dtype=np.float32)
+
+    start = time.perf_counter()
+    _replay(ArraySource(audio, SAMPLING_RATE, speed=1))
+    real_time_duration = time.perf_counter() - start
+    start = time.perf_counter()
+    _replay(ArraySource(audio, SAMPLING_RATE, speed=5))
+    accelerated_duration = time.perf_counter() - start
+
+    assert real_time_duration >= 0.24
+    assert accelerated_duration < real_time_duration / 2
+
+
+def test_generator_chunks_of_any_size_are_joined():
+    audio = (np.full(300, i, dtype=np.float32) for i in range(1, 5))
+
+    delivered = np.concatenate(_replay(GeneratorSource(audio, speed=0))).reshape(-1)
+
+    assert np.array_equal(delivered[:1200], np.repeat(np.arange(1, 5, dtype=np.float32), 300))
+
+
+def test_wav_file_is_mixed_down_and_resampled(tmp_path):
+    file_path = str(tmp_path / 'utterance.wav')
+    sf.write(file_path, np.full((8000, 2), 0.5, dtype=np.float32), 8000, subtype='FLOAT')
+    source = WavFileSource(file_path, speed=0)
+
+    delivered = np.concatenate(_replay(source)).reshape(-1)
+
+    assert source.duration == 1.0
+    assert len(delivered) == 32 * CHUNK_SIZE # one second at 16kHz, padded to a full chunk
+    assert np.allclose(delivered[1000:15000], 0.5, atol=0.01)
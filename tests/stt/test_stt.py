@@ -0,0 +1,275 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import numpy as np
+from src.stt.audio_buffer import AudioBuffer
+from src.stt.audio_source import ArraySource
+from src.stt.stt import Transcriber
+
+
+class FakeVAD:
+    """Returns a fixed speech probability for every chunk, set via probability"""
+    def __init__(self) -> None:
+        self.probability = 0.0
+
+    def process(self, chunk):
+        return self.probability
+
+
+class LoudnessVAD:
+    """Detects speech in every chunk that is not silent"""
+    def process(self, chunk):
+        return 0.9 if np.abs(chunk).max() > 0.1 else 0.0
+
+
+def _make_transcriber(proactive_mic_mode: bool = False, pause_threshold: float = 0.0) -> Transcriber:
+    """Create a Transcriber with voice activity detection and transcription stubbed out, without calling __init__ (which loads the STT model)"""
+    transcriber = object.__new__(Transcriber)
+    transcriber.loglevel = 27
+    transcriber.ptt_enabled = False
+    transcriber.proactive_mic_mode = proactive_mic_mode
+    transcriber.min_refresh_secs = 0.3
+    transcriber.refresh_freq = transcriber.min_refresh_secs // Transcriber.CHUNK_DURATION
+    transcriber.pause_threshold = pause_threshold
+    transcriber.audio_threshold = 0.4
+    transcriber.listen_timeout = 30
+    transcriber._Transcriber__save_mic_input = False
+    transcriber.vad = FakeVAD()
+    transcriber._audio_buffer = AudioBuffer(Transcriber.SAMPLING_RATE)
+    transcriber._lock = threading.Lock()
+    transcriber._speech_detected = False
+    transcriber._speech_end_time = 0
+    transcriber._last_update_time = 0
+    transcriber._current_transcription = ''
+    transcriber._transcription_ready = threading.Event()
+    transcriber._consecutive_empty_count = 0
+    transcriber._max_consecutive_empty = 10
+    transcriber._transcription_executor = ThreadPoolExecutor(max_workers=1)
+    transcriber._refresh_future = None
+    transcriber._utterance_id = 0
+    transcriber._speech_paused = False
+    transcriber._pause_start_samples = 0
+    transcriber._transcribed_samples = 0
+    transcriber._temporary_pause_override = None
+    transcriber.play_cough_sound = False
+    transcriber.prompt = ''
+    transcriber._running = False
+    transcriber._processing_thread = None
+    transcriber._audio_queue = queue.Queue()
+    transcriber._Transcriber__processing_audio_error_count = 0
+    transcriber._Transcriber__mic_input_process_error_count = 0
+    transcriber._Transcriber__warning_frequency = 5
+    transcriber._Transcriber__on_speech_end = None
+    transcriber._Transcriber__on_utterance_transcribed = None
+    transcriber.transcribed_audio = []
+    transcriber.transcription_allowed = threading.Event() # transcriptions block until this is set, to simulate a slow STT model
+    transcriber.transcription_allowed.set()
+    def transcribe(audio: np.ndarray, utterance_id: int | None = None) -> str:
+        transcriber.transcription_allowed.wait()
+        transcriber.transcribed_audio.append(audio.copy())
+        return f'{len(audio)} samples.'
+    def reset_state():
+        transcriber._speech_detected = False
+        transcriber._audio_buffer.clear()
+        transcriber._refresh_future = None
+        transcriber._utterance_id += 1
+        transcriber._speech_paused = False
+        transcriber._transcribed_samples = 0
+    transcriber._transcribe = transcribe
+    transcriber._reset_state = reset_state
+    return transcriber
+
+
+def _process_chunks(transcriber: Transcriber, probabilities: list[float]):
+    lookback_size = Transcriber.LOOKBACK_CHUNKS * Transcriber.CHUNK_SIZE
+    chunk_count = 0
+    for i, probability in enumerate(probabilities):
+        transcriber.vad.probability = probability
+        chunk = np.full(Transcriber.CHUNK_SIZE, i, dtype=np.float32)
+        with transcriber._lock:
+            chunk_count = transcriber._process_vad_chunk(chunk, lookback_size, chunk_count)
+
+
+def test_only_lookback_is_kept_before_speech():
+    transcriber = _make_transcriber()
+
+    _process_chunks(transcriber, [0.0] * 20)
+
+    assert len(transcriber._audio_buffer) == Transcriber.LOOKBACK_CHUNKS * Transcriber.CHUNK_SIZE
+    assert transcriber._audio_buffer.view()[0] == 20 - Transcriber.LOOKBACK_CHUNKS
+
+
+def test_utterance_is_transcribed_with_its_lookback_once_speech_ends():
+    transcriber = _make_transcriber()
+
+    _process_chunks(transcriber, [0.0] * 10 + [0.9] * 30 + [0.0])
+
+    assert transcriber._transcription_ready.wait(timeout=5)
+    assert len(transcriber.transcribed_audio) == 1
+    transcribed = transcriber.transcribed_audio[0]
+    assert len(transcribed) == (Transcriber.LOOKBACK_CHUNKS + 30) * Transcriber.CHUNK_SIZE # the first speech chunk is part of the lookback
+    assert transcribed[0] == 10 - (Transcriber.LOOKBACK_CHUNKS - 1)
+    assert transcriber._current_transcription == f'{len(transcribed)} samples.'
+
+
+def test_end_of_speech_and_transcription_are_reported():
+    transcriber = _make_transcriber()
+    events: list[tuple[str, str | None]] = []
+    utterance_transcribed = threading.Event()
+    def on_utterance_transcribed(transcription: str | None):
+        events.append(('transcribed', transcription))
+        utterance_transcribed.set()
+    transcriber.set_on_speech_end(lambda: events.append(('speech end', None)))
+    transcriber.set_on_utterance_transcribed(on_utterance_transcribed)
+    transcriber.transcription_allowed.clear()
+
+    _process_chunks(transcriber, [0.9] * 5 + [0.0])
+
+    assert events == [('speech end', None)] # reported before the transcription has finished
+    transcriber.transcription_allowed.set()
+    assert utterance_transcribed.wait(timeout=5)
+    assert events[1] == ('transcribed', f'{len(transcriber.transcribed_audio[0])} samples.')
+    assert transcriber._transcription_ready.is_set()
+
+
+def test_audio_keeps_being_processed_during_slow_transcription():
+    transcriber = _make_transcriber()
+    transcriber.transcription_allowed.clear()
+
+    _process_chunks(transcriber, [0.9] * 5 + [0.0]) # first utterance, its transcription is stuck
+    _process_chunks(transcriber, [0.0] * 3 + [0.9] * 5)
+
+    assert transcriber._speech_detected # speech of the next utterance is detected while the first one is being transcribed
+    assert not transcriber._transcription_ready.is_set()
+    transcriber.transcription_allowed.set()
+    assert transcriber._transcription_ready.wait(timeout=5)
+    assert transcriber._current_transcription == f'{6 * Transcriber.CHUNK_SIZE} samples.'
+
+
+def test_proactive_refreshes_do_not_pile_up_and_last_one_is_used():
+    transcriber = _make_transcriber(proactive_mic_mode=True)
+    transcriber.transcription_allowed.clear()
+
+    _process_chunks(transcriber, [0.9] * int(transcriber.refresh_freq) * 4 + [0.0])
+    transcriber.transcription_allowed.set()
+
+    assert transcriber._transcription_ready.wait(timeout=5)
+    assert len(transcriber.transcribed_audio) == 1 # later refreshes were skipped while the first one was running
+    assert transcriber._current_transcription == f'{len(transcriber.transcribed_audio[0])} samples.'
+
+
+def test_pause_is_transcribed_straight_away_for_speculation():
+    transcriber = _make_transcriber(proactive_mic_mode=True, pause_threshold=10)
+    speech_chunk_count = int(transcriber.refresh_freq) + 2 # not a multiple of the refresh frequency, so only the pause triggers the last refresh
+
+    _process_chunks(transcriber, [0.9] * speech_chunk_count)
+    transcriber._refresh_future.result(timeout=5)
+    assert transcriber.get_speculative_transcription() is None
+    _process_chunks(transcriber, [0.0])
+    transcriber._refresh_future.result(timeout=5)
+
+    expected_samples = (speech_chunk_count + 1) * Transcriber.CHUNK_SIZE
+    assert transcriber.get_speculative_transcription() == f'{expected_samples} samples.'
+    _process_chunks(transcriber, [0.9])
+    assert transcriber.get_speculative_transcription() is None # the player continues speaking
+
+
+def test_speculative_transcription_is_passed_on_while_waiting():
+    transcriber = _make_transcriber(proactive_mic_mode=True, pause_threshold=10)
+    _process_chunks(transcriber, [0.9] * 5 + [0.0])
+    speculative_transcriptions = []
+    def on_speech_paused(transcription: str):
+        speculative_transcriptions.append(transcription)
+        with transcriber._lock:
+            transcriber._finalize_transcription(transcribe=False)
+
+    transcription = transcriber.get_latest_transcription(on_speech_paused=on_speech_paused)
+
+    assert speculative_transcriptions == [f'{6 * Transcriber.CHUNK_SIZE} samples.']
+    assert transcription == speculative_transcriptions[0]
+
+
+def test_recorded_audio_is_transcribed_without_a_microphone():
+    transcriber = _make_transcriber(pause_threshold=0.1)
+    transcriber.vad = LoudnessVAD()
+    speech = np.full(Transcriber.SAMPLING_RATE // 2, 0.5, dtype=np.float32)
+    transcriber.audio_source = ArraySource(np.concatenate((np.zeros(Transcriber.SAMPLING_RATE // 4, dtype=np.float32), speech)), Transcriber.SAMPLING_RATE, speed=4, trailing_silence_seconds=0.5)
+
+    transcriber.start_listening()
+    transcription = transcriber.get_latest_transcription()
+    transcriber.stop_listening()
+
+    assert transcription == f'{len(transcriber.transcribed_audio[0])} samples.'
+    transcribed_audio = transcriber.transcribed_audio[0]
+    assert (transcribed_audio == 0.5).sum() == len(speech)
+
+
+class FakeWhisperModel:
+    """Transcribes every run of equal samples as one word named after the sample value, with word timestamps.
+    With timestamp_jitter, every other pass shifts its words that many seconds later, like Whisper's timestamps shifting between passes
+    """
+    def __init__(self, timestamp_jitter: float = 0.0) -> None:
+        self.windows: list[np.ndarray] = []
+        self.prompts: list[str] = []
+        self.timestamp_jitter: float = timestamp_jitter
+
+    def transcribe(self, audio: np.ndarray, initial_prompt: str = '', word_timestamps: bool = False, **kwargs):
+        self.windows.append(audio.copy())
+        self.prompts.append(initial_prompt)
+        jitter = self.timestamp_jitter if len(self.windows) % 2 == 0 else 0.0
+        boundaries = [0] + list(np.flatnonzero(np.diff(audio)) + 1) + [len(audio)]
+        words = [SimpleNamespace(word=f' w{int(audio[start])}', start=start / Transcriber.SAMPLING_RATE + jitter, end=end / Transcriber.SAMPLING_RATE + jitter)
+                 for start, end in zip(boundaries[:-1], boundaries[1:])]
+        return [SimpleNamespace(text=''.join(word.word for word in words), words=words)], None
+
+
+def _make_incremental_transcriber() -> Transcriber:
+    transcriber = object.__new__(Transcriber)
+    transcriber.transcribe_model = FakeWhisperModel()
+    transcriber.prompt = ''
+    transcriber.task = 'transcribe'
+    transcriber.language = 'en'
+    transcriber._Transcriber__ignore_list = []
+    transcriber._committed_transcription = (-1, '', 0)
+    return transcriber
+
+
+def _spoken_words(word_count: int) -> np.ndarray:
+    """Half a second of audio per word"""
+    return np.repeat(np.arange(word_count, dtype=np.float32), Transcriber.SAMPLING_RATE // 2)
+
+
+def test_incremental_transcription_only_retranscribes_the_uncommitted_tail():
+    transcriber = _make_incremental_transcriber()
+    audio = _spoken_words(16)
+
+    for word_count in range(4, 17, 2):
+        transcription = transcriber.whisper_transcribe_incremental(audio[:word_count * Transcriber.SAMPLING_RATE // 2], utterance_id=1)
+
+    assert transcription == ' '.join(f'w{i}' for i in range(16))
+    last_window = transcriber.transcribe_model.windows[-1]
+    assert len(last_window) < len(audio) // 2
+    assert transcriber.transcribe_model.prompts[-1].startswith('w0 w1')
+
+
+def test_incremental_transcription_does_not_repeat_words_with_shifted_timestamps():
+    transcriber = _make_incremental_transcriber()
+    transcriber.transcribe_model = FakeWhisperModel(timestamp_jitter=0.04)
+    audio = _spoken_words(16)
+
+    for word_count in range(4, 17, 2):
+        transcription = transcriber.whisper_transcribe_incremental(audio[:word_count * Transcriber.SAMPLING_RATE // 2], utterance_id=1)
+
+    assert transcription == ' '.join(f'w{i}' for i in range(16))
+
+
+def test_incremental_transcription_starts_over_for_a_new_utterance():
+    transcriber = _make_incremental_transcriber()
+    audio = _spoken_words(8)
+    transcriber.whisper_transcribe_incremental(audio, utterance_id=1)
+
+    transcription = transcriber.whisper_transcribe_incremental(audio[:Transcriber.SAMPLING_RATE] + 100, utterance_id=2)
+
+    assert transcription == 'w100 w101'
+    assert len(transcriber.transcribe_model.windows[-1]) == Transcriber.SAMPLING_RATE
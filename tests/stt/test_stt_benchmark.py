@@ -0,0 +1,150 @@
+"""Replays recorded utterances through the Transcriber to measure how quickly the end of speech is detected and transcribed
+
+Set MANTELLA_STT_BENCHMARK_DIR to a folder of recordings to run the benchmark, eg:
+    MANTELLA_STT_BENCHMARK_DIR=path/to/recordings pytest tests/stt/test_stt_benchmark.py -s
+
+Every recording should be a single utterance of the player that ends when their speech ends (eg the files saved with `save_mic_input` enabled).
+Recordings are replayed in real time, as the pause threshold is measured in wall clock time.
+"""
+import os
+import statistics
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+import pytest
+from src.config.config_loader import ConfigLoader
+from src.stt.audio_source import WavFileSource
+from src.stt.stt import Transcriber, has_moonshine
+
+
+RECORDINGS_DIR = os.environ.get('MANTELLA_STT_BENCHMARK_DIR', '')
+TRAILING_SILENCE_SECONDS = 3.0 # silence replayed after every recording, on top of the pause threshold
+TRANSCRIPTION_TIMEOUT_SECONDS = 60.0
+
+# (STT service, model)
+STT_MODELS = [
+    ('whisper', 'tiny.en'),
+    ('whisper', 'base.en'),
+    ('moonshine', 'moonshine/tiny/quantized'),
+    ('moonshine', 'moonshine/base/quantized'),
+]
+# (pause threshold, proactive mode, refresh frequency)
+LISTEN_SETTINGS = [
+    (1.0, False, 0.3),
+    (0.5, False, 0.3),
+    (1.0, True, 0.3),
+    (1.0, True, 0.6),
+]
+
+pytestmark = pytest.mark.skipif(not RECORDINGS_DIR, reason='MANTELLA_STT_BENCHMARK_DIR is not set')
+
+_transcribers: dict[tuple[str, str], Transcriber] = {}
+
+
+@dataclass
+class UtteranceResult:
+    file_name: str
+    audio_seconds: float
+    transcription: str | None
+    speech_end_delay: float | None # seconds from the end of the recording to the end of speech being detected
+    transcription_latency: float | None # seconds from the end of speech being detected to the transcription being ready
+    transcribe_seconds: float # time spent transcribing, including proactive transcriptions
+
+    @property
+    def real_time_factor(self) -> float:
+        return self.transcribe_seconds / self.audio_seconds
+
+
+def _get_recordings() -> list[Path]:
+    return sorted(path for path in Path(RECORDINGS_DIR).glob('*') if path.suffix.lower() in ('.wav', '.flac', '.ogg'))
+
+
+def _get_transcriber(default_config: ConfigLoader, stt_service: str, model: str) -> Transcriber:
+    """Loads every model once per test session"""
+    if stt_service == 'moonshine' and not has_moonshine:
+        pytest.skip('moonshine_onnx is not installed')
+    transcriber = _transcribers.get((stt_service, model))
+    if transcriber:
+        return transcriber
+
+    default_config.stt_service = stt_service
+    default_config.whisper_model = model
+    default_config.moonshine_model = model
+    default_config.external_whisper_service = False
+    default_config.whisper_process_device = 'cpu'
+    default_config.ptt_enabled = False
+    default_config.save_mic_input = False
+    try:
+        transcriber = Transcriber(default_config)
+    except Exception as e:
+        pytest.skip(f'Could not load {stt_service} model {model}: {e}')
+    _transcribers[(stt_service, model)] = transcriber
+    return transcriber
+
+
+def replay_utterance(transcriber: Transcriber, file_path: Path) -> UtteranceResult:
+    """Replays a recording through the Transcriber as if it was spoken into the microphone"""
+    source = WavFileSource(str(file_path), speed=1.0, trailing_silence_seconds=transcriber.pause_threshold + TRAILING_SILENCE_SECONDS)
+    speech_end_times: list[float] = []
+    transcriptions: list[tuple[float, str | None]] = []
+    utterance_transcribed = threading.Event()
+    def on_utterance_transcribed(transcription: str | None):
+        transcriptions.append((time.perf_counter(), transcription))
+        utterance_transcribed.set()
+    transcriber.set_on_speech_end(lambda: speech_end_times.append(time.perf_counter()))
+    transcriber.set_on_utterance_transcribed(on_utterance_transcribed)
+    transcription_count = len(transcriber.transcription_times)
+
+    transcriber.audio_source = source
+    try:
+        transcriber.start_listening()
+        is_transcribed = utterance_transcribed.wait(timeout=source.duration + TRAILING_SILENCE_SECONDS + TRANSCRIPTION_TIMEOUT_SECONDS)
+        transcriber.stop_listening()
+        if is_transcribed and transcriptions[0][1]:
+            transcriber.get_latest_transcription() # takes the transcription, so it is not returned for the next recording
+    finally:
+        transcriber.set_on_speech_end(None)
+        transcriber.set_on_utterance_transcribed(None)
+
+    speech_end_delay = None
+    transcription_latency = None
+    transcription = None
+    if speech_end_times and source.audio_end_time is not None:
+        speech_end_delay = speech_end_times[0] - source.audio_end_time
+        if is_transcribed:
+            ready_time, transcription = transcriptions[0]
+            transcription_latency = ready_time - speech_end_times[0]
+    return UtteranceResult(file_path.name, source.duration, transcription, speech_end_delay, transcription_latency, sum(transcriber.transcription_times[transcription_count:]))
+
+
+def _summarize(values: list[float]) -> str:
+    if not values:
+        return 'n/a'
+    return f'mean {statistics.mean(values):.3f}s, median {statistics.median(values):.3f}s, max {max(values):.3f}s'
+
+
+@pytest.mark.parametrize("pause_threshold, proactive_mic_mode, min_refresh_secs", LISTEN_SETTINGS)
+@pytest.mark.parametrize("stt_service, model", STT_MODELS)
+def test_stt_benchmark(default_config: ConfigLoader, stt_service: str, model: str, pause_threshold: float, proactive_mic_mode: bool, min_refresh_secs: float):
+    recordings = _get_recordings()
+    if not recordings:
+        pytest.skip(f'No recordings found in {RECORDINGS_DIR}')
+    transcriber = _get_transcriber(default_config, stt_service, model)
+    transcriber.pause_threshold = pause_threshold
+    transcriber.proactive_mic_mode = proactive_mic_mode
+    transcriber.min_refresh_secs = min_refresh_secs
+    transcriber.refresh_freq = min_refresh_secs // Transcriber.CHUNK_DURATION
+
+    results = [replay_utterance(transcriber, recording) for recording in recordings]
+
+    print(f"\n{stt_service} {model}, pause threshold {pause_threshold}s, proactive mode {proactive_mic_mode}, refresh frequency {min_refresh_secs}s:")
+    for result in results:
+        speech_end_delay = f'{result.speech_end_delay:.3f}s' if result.speech_end_delay is not None else 'not detected'
+        transcription_latency = f'{result.transcription_latency:.3f}s' if result.transcription_latency is not None else 'n/a'
+        print(f"  {result.file_name} ({result.audio_seconds:.1f}s): speech end after {speech_end_delay}, transcribed after {transcription_latency}, RTF {result.real_time_factor:.3f}: '{result.transcription}'")
+    print(f"  Speech end detection delay: {_summarize([r.speech_end_delay for r in results if r.speech_end_delay is not None])}")
+    print(f"  Transcription latency: {_summarize([r.transcription_latency for r in results if r.transcription_latency is not None])}")
+    print(f"  Real-time factor: mean {statistics.mean(r.real_time_factor for r in results):.3f}")
+
+    assert all(result.speech_end_delay is not None for result in results), 'The end of speech was not detected in every recording'
@@ -1,9 +1,10 @@
 import pytest
-from unittest.mock import MagicMock, AsyncMock
+from unittest.mock import MagicMock, AsyncMock, patch
 from src.output_manager import ChatManager
 from src.config.config_loader import ConfigLoader
 from src.config.definitions.llm_definitions import NarrationHandlingEnum
 from src.tts.piper import Piper
+from src.tts.ttsable import TTSable
 from src.llm.sentence_queue import SentenceQueue
 from src.llm.message_thread import message_thread
 from src.characters_manager import Characters
@@ -15,6 +16,8 @@ from src.llm.function_client import FunctionClient
 from src.llm.messages import AssistantMessage
 from tests.conftest import MockAIClient
 import time
+import asyncio
+from threading import Event
 
 @pytest.fixture
 def mock_queue() -> SentenceQueue:
@@ -82,7 +85,7 @@ async def test_process_response_api_error(output_manager: ChatManager, example_s
     """Test handling of a simulated API error during streaming"""
     output_manager._ChatManager__client.error_on_call = True
     monkeypatch.setattr("src.utils.play_error_sound", lambda *a, **kw: None)
-    monkeypatch.setattr(time, "sleep", lambda *a, **kw: None) # Skip sleeping between retries
+    monkeypatch.setattr(ChatManager, "LLM_RETRY_DELAY_SECONDS", 0) # Skip sleeping between retries
     
     await output_manager.process_response(example_skyrim_npc_character, mock_queue, mock_messages, example_characters_pc_to_npc, mock_actions, tools=None)
 
@@ -552,3 +555,254 @@ async def test_process_response_param(
 
     assert actual == expected_texts
     assert actual_types == expected_types
+
+
+@pytest.mark.asyncio
+async def test_process_response_stream_not_blocked_by_tts(output_manager: ChatManager, example_skyrim_npc_character: Character, example_characters_pc_to_npc: Characters, mock_queue: SentenceQueue, mock_messages: message_thread, mock_actions: list[Action]):
+    """Test that the LLM stream keeps being read while sentences are voiced, and that sentence order is preserved"""
+    client = output_manager._ChatManager__client
+    client.response_pattern = ["First ", "sentence ", "here.", "Second ", "sentence ", "here.", "Third ", "sentence ", "here."]
+    client.delay = 0
+
+    synthesized_texts: list[str] = []
+    synthesis_finished_at: list[float] = []
+    def slow_synthesize(voice, voiceline, *args, **kwargs):
+        time.sleep(0.2)
+        synthesized_texts.append(voiceline.strip())
+        synthesis_finished_at.append(time.time())
+        return "mock_audio_file.wav"
+    output_manager.tts.synthesize = MagicMock(side_effect=slow_synthesize)
+
+    stream_finished_at: list[float] = []
+    original_streaming_call = client.streaming_call
+    async def timed_streaming_call(*args, **kwargs):
+        async for item in original_streaming_call(*args, **kwargs):
+            yield item
+        stream_finished_at.append(time.time())
+    client.streaming_call = timed_streaming_call
+
+    await output_manager.process_response(example_skyrim_npc_character, mock_queue, mock_messages, example_characters_pc_to_npc, mock_actions, tools=None)
+
+    output_sentences = get_sentence_list_from_queue(mock_queue)
+    assert [s.content.text.strip() for s in output_sentences] == ["First sentence here.", "Second sentence here.", "Third sentence here.", ""]
+    assert synthesized_texts == ["First sentence here.", "Second sentence here.", "Third sentence here."]
+    # The whole stream should have been read before the TTS service finished voicing the first sentence
+    assert stream_finished_at[0] < synthesis_finished_at[0]
+
+
+def test_generation_loop_stays_responsive_while_sentences_are_voiced(output_manager: ChatManager, example_characters_pc_to_npc: Characters, mock_queue: SentenceQueue, mock_messages: message_thread, mock_actions: list[Action]):
+    """Test that waiting for the TTS service does not block the generation loop, which is shared by all responses"""
+    client = output_manager._ChatManager__client
+    client.response_pattern = ["First sentence here. ", "Second sentence here. ", "Third sentence here."]
+    client.delay = 0
+    def slow_synthesize(voice, voiceline, *args, **kwargs):
+        time.sleep(0.3)
+        return "mock_audio_file.wav"
+    output_manager.tts.synthesize = MagicMock(side_effect=slow_synthesize)
+
+    generation = output_manager.start_generating_response(mock_messages, example_characters_pc_to_npc, mock_queue, mock_actions, tools=None)
+    time.sleep(0.1) # the stream has been read, the response now waits for its sentences to be voiced
+    start = time.time()
+    asyncio.run_coroutine_threadsafe(asyncio.sleep(0), output_manager._get_generation_loop()).result(timeout=5)
+    loop_response_time = time.time() - start
+    generation.result(timeout=10)
+
+    assert loop_response_time < 0.2
+    output_manager.shutdown_generation_loop()
+
+
+def test_generate_response_reuses_generation_loop(output_manager: ChatManager, example_characters_pc_to_npc: Characters, mock_queue: SentenceQueue, mock_messages: message_thread, mock_actions: list[Action]):
+    """Test that consecutive responses are generated on the same long-lived event loop"""
+    output_manager.generate_response(mock_messages, example_characters_pc_to_npc, mock_queue, mock_actions, tools=None)
+    first_loop = output_manager._get_generation_loop()
+    first_output = get_sentence_list_from_queue(mock_queue)
+
+    generation = output_manager.start_generating_response(mock_messages, example_characters_pc_to_npc, mock_queue, mock_actions, tools=None)
+    generation.result(timeout=10)
+    second_output = get_sentence_list_from_queue(mock_queue)
+
+    assert output_manager._get_generation_loop() is first_loop
+    assert [s.content.text.strip() for s in first_output] == ["Hello there.", ""]
+    assert [s.content.text.strip() for s in second_output] == ["Hello there.", ""]
+
+    output_manager.shutdown_generation_loop()
+    assert first_loop.is_closed()
+
+
+def test_stop_generation_cancels_stream(output_manager: ChatManager, example_characters_pc_to_npc: Characters, mock_queue: SentenceQueue, mock_messages: message_thread, mock_actions: list[Action]):
+    """Test that stopping cancels a stream that is waiting for its next chunk and closes it right away"""
+    client = output_manager._ChatManager__client
+    stream_closed = []
+    async def slow_streaming_call(messages=None, is_multi_npc=False, tools=None):
+        try:
+            yield ("content", "Well met, traveller. ")
+            yield ("content", "How ")
+            await asyncio.sleep(30) # an LLM that stalls mid-response
+            yield ("content", "This should never arrive.")
+        finally:
+            stream_closed.append(True)
+    client.streaming_call = slow_streaming_call
+
+    mock_queue.is_more_to_come = True
+    generation = output_manager.start_generating_response(mock_messages, example_characters_pc_to_npc, mock_queue, mock_actions, tools=None)
+    first_sentence = mock_queue.get_next_sentence()
+    assert first_sentence.content.text.strip() == "Well met, traveller."
+
+    start = time.time()
+    output_manager.stop_generation()
+    assert time.time() - start < 5
+    assert stream_closed == [True]
+    generation.result(timeout=5)
+
+    remaining = [s.content.text.strip() for s in get_sentence_list_from_queue(mock_queue)]
+    assert "This should never arrive." not in remaining
+
+    # Stopping when nothing is being generated returns immediately
+    output_manager.stop_generation()
+    output_manager.shutdown_generation_loop()
+
+
+@pytest.mark.asyncio
+async def test_process_response_late_interrupting_tool_call_discards_text(output_manager: ChatManager, example_skyrim_npc_character: Character, example_characters_pc_to_npc: Characters, mock_queue: SentenceQueue, mock_messages: message_thread, mock_actions: list[Action], monkeypatch):
+    """Test that tool calls requiring a game response which arrive mid-response (concurrent function client) stop the verbal response"""
+    async def concurrent_streaming_call(messages=None, is_multi_npc=False, tools=None):
+        yield ("content", "I will get right on that. ")
+        yield ("content", "Let me ")
+        yield ("tool_calls", [{"id": "call_123", "type": "function", "function": {"name": "Inventory"}}])
+        yield ("content", "see what I have.")
+    output_manager._ChatManager__client.streaming_call = concurrent_streaming_call
+    monkeypatch.setattr("src.actions.function_manager.FunctionManager.parse_function_calls", lambda tool_calls, characters=None, game=None: [{"identifier": "mantella_npc_inventory"}])
+    monkeypatch.setattr("src.actions.function_manager.FunctionManager.any_action_requires_response", lambda actions: True)
+
+    await output_manager.process_response(example_skyrim_npc_character, mock_queue, mock_messages, example_characters_pc_to_npc, mock_actions, [{"type": "function", "function": {"name": "Inventory"}}])
+
+    output_sentences = get_sentence_list_from_queue(mock_queue)
+    assert [s.content.text.strip() for s in output_sentences] == ["I will get right on that.", "", ""]
+    assert output_sentences[1].content.actions == [{"identifier": "mantella_npc_inventory"}]
+
+
+def test_voiceline_warmup_prerenders_system_lines(output_manager: ChatManager, example_skyrim_npc_character: Character, default_config: ConfigLoader):
+    """Test that goodbyes and the LLM error fallback are voiced in the background as NPCs join, without changing the state of the response"""
+    default_config.voiceline_warmup_enabled = True
+    default_config.voiceline_cache_size = 100
+    output_manager.tts.can_preload_voices = True
+    output_manager.tts._get_lip_mode = lambda synth_options: TTSable.LIP_MODE_PLACEHOLDER if synth_options.is_first_line_of_response else TTSable.LIP_MODE_GENERATED # 'Lazy' lip generation
+    synthesized = []
+    all_synthesized = Event()
+    def record_synthesize(voice, voiceline, in_game_voice, csv_in_game_voice, voice_accent, synth_options, advanced_voice_model=None):
+        synthesized.append((voiceline.strip(), synth_options.is_first_line_of_response))
+        if len(synthesized) == 6:
+            all_synthesized.set()
+        return "mock_audio_file.wav"
+    output_manager.tts.synthesize = MagicMock(side_effect=record_synthesize)
+
+    output_manager.start_voiceline_warmup()
+    output_manager.warm_up_voicelines([example_skyrim_npc_character])
+    output_manager.warm_up_voicelines([example_skyrim_npc_character]) # Already warmed up, must not be queued again
+    assert all_synthesized.wait(timeout=10)
+    output_manager.shutdown_generation_loop()
+
+    expected_lines = [default_config.goodbye_npc_response.strip(), default_config.collecting_thoughts_npc_response.strip(), ChatManager.LLM_ERROR_RESPONSE]
+    assert synthesized == [(line, is_first_line) for line in expected_lines for is_first_line in [True, False]]
+    assert output_manager._ChatManager__is_first_sentence is False
+
+
+def test_voiceline_warmup_skips_player_and_waits_for_generation(output_manager: ChatManager, example_skyrim_npc_character: Character, default_config: ConfigLoader):
+    """Test that the warm-up ignores the player and does not voice anything while a response is being generated"""
+    default_config.voiceline_warmup_enabled = True
+    default_config.voiceline_cache_size = 100
+    output_manager.tts.can_preload_voices = True
+    output_manager.tts._get_lip_mode = MagicMock(return_value=TTSable.LIP_MODE_GENERATED)
+    output_manager.tts.synthesize = MagicMock(return_value="mock_audio_file.wav")
+    player = MagicMock(spec=Character)
+    player.is_player_character = True
+
+    generation_finished: Event = output_manager._ChatManager__generation_finished
+    generation_finished.clear() # A response is being generated
+    output_manager.start_voiceline_warmup()
+    output_manager.warm_up_voicelines([player, example_skyrim_npc_character])
+    time.sleep(0.3)
+    assert output_manager.tts.synthesize.call_count == 0
+
+    generation_finished.set()
+    deadline = time.time() + 10
+    while output_manager.tts.synthesize.call_count < 3 and time.time() < deadline:
+        time.sleep(0.05)
+    output_manager.shutdown_generation_loop()
+    # The lip files do not depend on the position in the response, so every line is only voiced once
+    assert output_manager.tts.synthesize.call_count == 3
+    assert all(call.args[0] == example_skyrim_npc_character.tts_voice_model for call in output_manager.tts.synthesize.call_args_list)
+
+
+def test_voiceline_warmup_skips_tts_services_that_would_switch_voices(output_manager: ChatManager, example_skyrim_npc_character: Character, default_config: ConfigLoader):
+    """Test that NPCs are not warmed up if their TTS service can only hold one voice model, as the next reply would have to switch back"""
+    default_config.voiceline_warmup_enabled = True
+    default_config.voiceline_cache_size = 100
+    output_manager.tts.can_preload_voices = False
+    output_manager.tts.synthesize = MagicMock(return_value="mock_audio_file.wav")
+    output_manager.tts.change_voice = MagicMock()
+
+    output_manager.start_voiceline_warmup()
+    output_manager.warm_up_voicelines([example_skyrim_npc_character])
+    time.sleep(0.3)
+    output_manager.shutdown_generation_loop()
+    assert output_manager.tts.synthesize.call_count == 0
+    output_manager.tts.change_voice.assert_not_called()
+
+
+def test_voiceline_warmup_gives_way_to_a_response_starting_while_waiting_for_tts(output_manager: ChatManager, example_skyrim_npc_character: Character):
+    """Test that a pre-render that only gets the TTS service after a response started generating is skipped"""
+    output_manager.tts.synthesize = MagicMock(return_value="mock_audio_file.wav")
+    content = SentenceContent(example_skyrim_npc_character, "Farewell.", SentenceTypeEnum.SPEECH, True)
+
+    output_manager._ChatManager__generation_finished.clear()
+    assert output_manager.prerender_sentence(content, True) is False
+    output_manager._ChatManager__generation_finished.set()
+    assert output_manager.prerender_sentence(content, True) is True
+    assert output_manager.tts.synthesize.call_count == 1
+
+
+def test_preload_voices_loads_npc_voices_in_the_background(output_manager: ChatManager, example_skyrim_npc_character: Character):
+    """Test that the voice models of NPCs joining a conversation are handed to the TTS service to preload, skipping the player"""
+    output_manager.tts.can_preload_voices = True
+    preloaded = Event()
+    output_manager.tts.preload_voice = MagicMock(side_effect=lambda *args: preloaded.set())
+    player = MagicMock(spec=Character)
+    player.is_player_character = True
+
+    output_manager.preload_voices([player, example_skyrim_npc_character])
+
+    assert preloaded.wait(timeout=10)
+    output_manager.tts.preload_voice.assert_called_once_with(example_skyrim_npc_character.tts_voice_model, example_skyrim_npc_character.in_game_voice_model, example_skyrim_npc_character.csv_in_game_voice_model, example_skyrim_npc_character.advanced_voice_model, example_skyrim_npc_character.voice_accent)
+
+
+def test_preload_voices_only_starts_a_thread_for_new_voices(output_manager: ChatManager, example_skyrim_npc_character: Character):
+    """Test that preloading the same characters again, as happens on every context update, does not start another thread"""
+    output_manager.tts.can_preload_voices = True
+    output_manager.tts.preload_voice = MagicMock()
+
+    with patch("src.output_manager.Thread") as thread:
+        for _ in range(3):
+            output_manager.preload_voices([example_skyrim_npc_character])
+        assert thread.call_count == 1
+
+        output_manager.clear_preloaded_voices()
+        output_manager.preload_voices([example_skyrim_npc_character])
+        assert thread.call_count == 2
+
+
+def test_generate_sentences_passes_on_chunks_of_long_text_as_sentences(output_manager: ChatManager, example_skyrim_npc_character: Character, default_config: ConfigLoader):
+    """Test that a long text is voiced in chunks, each one becoming its own sentence, with the actions sent along with the first chunk"""
+    default_config.tts_chunk_concurrency = 2
+    output_manager.tts.supports_chunked_synthesis = True
+    output_manager.tts.synthesize_chunks = MagicMock(return_value=iter([(" First chunk, ", "first.wav"), (" second chunk. ", "second.wav")]))
+    long_text = "First chunk, " + "and more words " * 12 + "second chunk."
+
+    with patch("src.utils.get_audio_duration", return_value=1.0):
+        sentences = list(output_manager.generate_sentences(SentenceContent(example_skyrim_npc_character, long_text, SentenceTypeEnum.SPEECH, False, [{"identifier": "mantella_npc_follow"}])))
+
+    assert [sentence.content.text for sentence in sentences] == [" First chunk, ", " second chunk. "]
+    assert [sentence.voice_file for sentence in sentences] == ["first.wav", "second.wav"]
+    assert sentences[0].content.actions == [{"identifier": "mantella_npc_follow"}]
+    assert sentences[1].content.actions == []
+    assert output_manager.tts.synthesize_chunks.call_args.args[-1] == 2
@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+from src.config.definitions.game_definitions import GameEnum
+from src.tts.synthesization_options import SynthesizationOptions
+from src.tts.ttsable import TTSable
+
+
+LONG_VOICELINE = "The road to Whiterun is long and full of bandits, so keep your sword close and your wits about you. " \
+                 "If you reach the city before nightfall, ask for Hulda at the Bannered Mare and tell her I sent you. " \
+                 "She keeps a room for travellers who know the right name, and she asks no questions about where they have been."
+
+
+class SlowTTS(TTSable):
+    """TTS service that takes a while per voiceline and records how many voicelines it synthesizes at the same time"""
+    def __init__(self, config) -> None:
+        super().__init__(config)
+        self.synthesized: list[tuple[str, bool]] = []
+        self.max_concurrent = 0
+        self.__concurrent = 0
+        self.__lock = threading.Lock()
+
+    def change_voice(self, voice, in_game_voice=None, csv_in_game_voice=None, advanced_voice_model=None, voice_accent=None, voice_gender=None, voice_race=None):
+        self._last_voice = voice
+
+    @property
+    def supports_chunked_synthesis(self) -> bool:
+        return True
+
+    def tts_synthesize(self, voiceline, final_voiceline_file, synth_options):
+        with self.__lock:
+            self.__concurrent += 1
+            self.max_concurrent = max(self.max_concurrent, self.__concurrent)
+            self.synthesized.append((voiceline.strip(), synth_options.is_first_line_of_response))
+        time.sleep(0.2)
+        with open(final_voiceline_file, 'wb') as f:
+            f.write(os.urandom(128))
+        with self.__lock:
+            self.__concurrent -= 1
+
+
+@pytest.fixture
+def slow_tts(tmp_path, monkeypatch) -> SlowTTS:
+    monkeypatch.setattr('src.utils.get_tmp_dir', lambda: str(tmp_path))
+    config = MagicMock()
+    config.lip_generation = 'disabled'
+    config.language = 'en'
+    config.voiceline_cache_size = 0
+    config.game.base_game = GameEnum.SKYRIM
+    return SlowTTS(config)
+
+
+def test_chunks_are_synthesized_concurrently_and_returned_in_order(slow_tts: SlowTTS):
+    synth_options = SynthesizationOptions(aggro=False, is_first_line_of_response=True)
+    expected_chunks = slow_tts._split_voiceline(LONG_VOICELINE)
+    assert len(expected_chunks) > 2
+
+    chunks = list(slow_tts.synthesize_chunks('FemaleNord', LONG_VOICELINE, 'FemaleNord', 'FemaleNord', 'en', synth_options, max_concurrent_chunks=2))
+
+    assert [chunk_text.strip() for chunk_text, _ in chunks] == expected_chunks
+    assert all(os.path.exists(voiceline_file) for _, voiceline_file in chunks)
+    assert len({voiceline_file for _, voiceline_file in chunks}) == len(chunks)
+    assert slow_tts.max_concurrent == 2
+
+
+def test_first_chunk_is_returned_before_the_rest_is_voiced(slow_tts: SlowTTS):
+    synth_options = SynthesizationOptions(aggro=False, is_first_line_of_response=False)
+    chunk_count = len(slow_tts._split_voiceline(LONG_VOICELINE))
+
+    chunks = slow_tts.synthesize_chunks('FemaleNord', LONG_VOICELINE, 'FemaleNord', 'FemaleNord', 'en', synth_options, max_concurrent_chunks=1)
+    next(chunks)
+    voiced_when_first_chunk_was_ready = len(slow_tts.synthesized)
+    chunks.close()
+
+    assert voiced_when_first_chunk_was_ready < chunk_count
+
+
+def test_only_first_chunk_starts_the_response(slow_tts: SlowTTS):
+    synth_options = SynthesizationOptions(aggro=False, is_first_line_of_response=True)
+
+    list(slow_tts.synthesize_chunks('FemaleNord', LONG_VOICELINE, 'FemaleNord', 'FemaleNord', 'en', synth_options, max_concurrent_chunks=1))
+
+    assert [is_first_line for _, is_first_line in slow_tts.synthesized] == [True] + [False] * (len(slow_tts.synthesized) - 1)
+
+
+def test_short_voiceline_is_not_split(slow_tts: SlowTTS):
+    synth_options = SynthesizationOptions(aggro=False, is_first_line_of_response=False)
+
+    chunks = list(slow_tts.synthesize_chunks('FemaleNord', ' Hello there. ', 'FemaleNord', 'FemaleNord', 'en', synth_options))
+
+    assert len(chunks) == 1
+    assert slow_tts.synthesized == [('Hello there.', False)]
@@ -1,8 +1,13 @@
 import pytest
 import os
+import threading
+import time
+import wave
 from unittest.mock import MagicMock, patch
 from queue import Queue
-from src.tts.piper import Piper, TTSServiceFailure
+from collections import OrderedDict
+from pathlib import Path
+from src.tts.piper import Piper, TTSServiceFailure, PIPER_EXITED
 from src.tts.synthesization_options import SynthesizationOptions
 
 
@@ -20,6 +25,7 @@ def _make_mock_piper():
     piper._Piper__selected_voice = 'testvoice'
     piper._Piper__waiting_for_voice_load = False
     piper._Piper__models_path = MagicMock()
+    piper._Piper__engine = None
     piper._loglevel = 20
     piper._last_voice = None
     piper.process = MagicMock()
@@ -27,7 +33,7 @@ def _make_mock_piper():
     piper.process.stdin = MagicMock()
     piper.q = Queue()
     piper.t = MagicMock()
-    piper.stop_thread = False
+    piper.stop_event = threading.Event()
     return piper
 
 
@@ -169,4 +175,251 @@ def test_voice_models(piper: Piper):
 
         if count >= num_models_to_check:
             break
-        count += 1
\ No newline at end of file
+        count += 1
+
+def _make_mock_piper_pool(max_workers: int):
+    """Create a mock Piper instance that starts mock processes and records the commands sent to each of them"""
+    piper = _make_mock_piper()
+    piper._Piper__selected_voice = None
+    piper._Piper__max_workers = max_workers
+    piper._Piper__parked_workers = OrderedDict()
+    piper._Piper__workers_lock = threading.Lock()
+    piper._Piper__available_models = ['femalenord', 'malenord', 'maleorc']
+    piper._Piper__models_path = Path('models')
+    piper._current_actor_gender = None
+    piper._current_actor_race = None
+    piper.started_processes = []
+    piper.commands = []
+
+    def start_piper_process():
+        process = MagicMock()
+        process.poll.return_value = None
+        piper.started_processes.append(process)
+        return process, Queue(), MagicMock(), threading.Event()
+    def write_to_stdin(text):
+        piper.commands.append((piper.process, text))
+    def check_voice_changed(max_retries: int = 5):
+        piper._Piper__waiting_for_voice_load = False
+        piper._last_voice = piper._Piper__selected_voice
+        return True
+    piper._Piper__start_piper_process = start_piper_process
+    piper._Piper__write_to_stdin = write_to_stdin
+    piper._check_voice_changed = check_voice_changed
+    piper._run_piper()
+    return piper
+
+
+def _switch_voice(piper: Piper, voice: str):
+    piper.change_voice(voice)
+    if piper._Piper__waiting_for_voice_load:
+        piper._check_voice_changed()
+
+
+def test_voice_pool_keeps_alternating_speakers_loaded():
+    """Switching back to a recent speaker reuses the process that has their voice loaded instead of reloading the model"""
+    piper = _make_mock_piper_pool(max_workers=2)
+
+    for voice in ['femalenord', 'malenord', 'femalenord', 'malenord']:
+        _switch_voice(piper, voice)
+        assert piper._Piper__selected_voice == voice
+
+    load_commands = [text for _, text in piper.commands if text.startswith('load_model')]
+    assert len(load_commands) == 2
+    assert len(piper.started_processes) == 2
+
+
+def test_voice_pool_reuses_least_recently_used_process():
+    piper = _make_mock_piper_pool(max_workers=2)
+    _switch_voice(piper, 'femalenord')
+    _switch_voice(piper, 'malenord')
+    femalenord_process, malenord_process = piper.started_processes
+
+    _switch_voice(piper, 'femalenord')
+    _switch_voice(piper, 'maleorc') # malenord was used least recently
+
+    assert len(piper.started_processes) == 2
+    assert piper.process is malenord_process
+    assert piper.commands[-1][0] is malenord_process
+    assert 'maleorc' in piper.commands[-1][1]
+    assert list(piper._Piper__parked_workers.keys()) == ['femalenord']
+
+
+def test_single_worker_reloads_model_on_every_switch():
+    piper = _make_mock_piper_pool(max_workers=1)
+
+    for voice in ['femalenord', 'malenord', 'femalenord']:
+        _switch_voice(piper, voice)
+
+    assert len(piper.started_processes) == 1
+    assert len([text for _, text in piper.commands if text.startswith('load_model')]) == 3
+
+
+def test_preloaded_voice_is_loaded_in_its_own_process():
+    piper = _make_mock_piper_pool(max_workers=3)
+    _switch_voice(piper, 'femalenord')
+
+    piper.preload_voice('MaleNord')
+    preloading_process = piper.started_processes[-1]
+    preloading_process.stdin.write.assert_called_once_with(f"load_model {Path('models') / 'malenord.onnx'}\n")
+    assert piper._Piper__parked_workers['malenord'].is_loading
+
+    piper.change_voice('MaleNord')
+    assert piper.process is preloading_process
+    assert piper._Piper__waiting_for_voice_load # Switching waits for Piper to confirm the preloaded model instead of loading it again
+    assert not [text for process, text in piper.commands if process is preloading_process]
+
+
+def test_reusing_a_preloading_process_waits_for_its_pending_model():
+    """A stale "Model loaded" line of a preloaded model must not be taken as confirmation for the next model loaded into the same process"""
+    piper = _make_mock_piper_pool(max_workers=2)
+    _switch_voice(piper, 'femalenord')
+    piper.preload_voice('MaleNord')
+    preloading_worker = piper._Piper__parked_workers['malenord']
+    threading.Timer(0.1, lambda: preloading_worker.q.put("Model loaded")).start()
+
+    piper.change_voice('MaleOrc') # reuses the preloading process, which is the least recently used one
+    time.sleep(0.2)
+
+    assert piper.process is preloading_worker.process
+    assert 'maleorc' in piper.commands[-1][1]
+    assert piper._Piper__waiting_for_voice_load
+    assert piper.q.empty()
+
+
+def test_preloading_does_not_replace_recent_speakers():
+    piper = _make_mock_piper_pool(max_workers=2)
+    _switch_voice(piper, 'femalenord')
+    _switch_voice(piper, 'malenord')
+
+    piper.preload_voice('MaleOrc')
+    piper.preload_voice('MaleNord')
+
+    assert len(piper.started_processes) == 2
+    assert list(piper._Piper__parked_workers.keys()) == ['femalenord']
+
+
+def test_close_stops_every_process():
+    piper = _make_mock_piper_pool(max_workers=3)
+    _switch_voice(piper, 'femalenord')
+    _switch_voice(piper, 'malenord')
+    piper.preload_voice('MaleOrc')
+
+    piper.close()
+
+    assert len(piper.started_processes) == 3
+    for process in piper.started_processes:
+        process.terminate.assert_called_once()
+    assert not piper._Piper__parked_workers
+
+
+def test_restarting_the_active_process_only_stops_its_own_reader_thread():
+    piper = _make_mock_piper_pool(max_workers=2)
+    _switch_voice(piper, 'femalenord')
+    _switch_voice(piper, 'malenord')
+    parked_worker = piper._Piper__parked_workers['femalenord']
+    restarted_stop_event = piper.stop_event
+
+    piper._restart_piper()
+
+    assert restarted_stop_event.is_set()
+    assert not parked_worker.stop_event.is_set()
+    assert not piper.stop_event.is_set()
+
+
+def test_preloading_needs_a_pool():
+    piper = _make_mock_piper_pool(max_workers=1)
+    _switch_voice(piper, 'femalenord')
+
+    piper.preload_voice('MaleNord')
+
+    assert not piper.can_preload_voices
+    assert len(piper.started_processes) == 1
+
+
+def _write_wav(path: str):
+    with wave.open(path, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(22050)
+        wav_file.writeframes(b'\x00\x00' * 2205)
+
+
+def test_check_voice_changed_wakes_up_on_stdout_line():
+    """Waiting for a voice model blocks on Piper's stdout instead of sleeping in a loop"""
+    piper = _make_mock_piper()
+    piper._Piper__waiting_for_voice_load = True
+    threading.Timer(0.1, lambda: piper.q.put("Model loaded successfully")).start()
+
+    with patch('src.tts.piper.time.sleep', side_effect=AssertionError("must not poll")):
+        start = time.perf_counter()
+        assert piper._check_voice_changed(max_retries=0) is True
+    assert time.perf_counter() - start < 1
+
+
+def test_synthesize_finishes_when_piper_reports_the_voiceline(tmp_path):
+    """Piper announcing a finished voiceline on stdout ends the wait for it right away"""
+    piper = _make_mock_piper()
+    synth_options = SynthesizationOptions(aggro=False, is_first_line_of_response=False)
+    output_file = str(tmp_path / 'out.wav')
+    written = []
+
+    def finish_voiceline(text):
+        def finish():
+            _write_wav(output_file)
+            written.append(time.perf_counter())
+            piper.q.put(f"Wrote {output_file}")
+        threading.Timer(0.05, finish).start()
+    piper._Piper__write_to_stdin = finish_voiceline
+
+    for voiceline in ['Hello.', 'Hello again.']:
+        piper.tts_synthesize(voiceline, output_file, synth_options)
+        assert time.perf_counter() - written[-1] < 0.05
+        os.remove(output_file)
+
+
+def test_synthesize_finishes_when_piper_does_not_report_the_voiceline(tmp_path):
+    """Voicelines are still picked up from the output file if Piper writes nothing to stdout"""
+    piper = _make_mock_piper()
+    synth_options = SynthesizationOptions(aggro=False, is_first_line_of_response=False)
+    output_file = str(tmp_path / 'out.wav')
+    written = []
+
+    def finish_voiceline(text):
+        def finish():
+            _write_wav(output_file)
+            written.append(time.perf_counter())
+        threading.Timer(0.05, finish).start()
+    piper._Piper__write_to_stdin = finish_voiceline
+
+    piper.tts_synthesize('Hello.', output_file, synth_options)
+    assert time.perf_counter() - written[-1] < 0.1
+
+
+def test_synthesize_restarts_piper_right_away_when_it_exits(tmp_path):
+    """A Piper process that exits cleanly mid-voiceline is restarted at once instead of waiting out the timeout"""
+    piper = _make_mock_piper()
+    synth_options = SynthesizationOptions(aggro=False, is_first_line_of_response=False)
+    output_file = str(tmp_path / 'out.wav')
+    commands = []
+
+    def write_to_stdin(text):
+        commands.append(text)
+        if len(commands) == 1:
+            piper.process.poll.return_value = 0
+            piper.q.put(PIPER_EXITED)
+        else:
+            _write_wav(output_file)
+    piper._Piper__write_to_stdin = write_to_stdin
+
+    def run_piper():
+        piper.process = MagicMock()
+        piper.process.poll.return_value = None
+    with patch.object(piper, '_run_piper', side_effect=run_piper) as restart, \
+         patch.object(piper, 'change_voice'), \
+         patch.object(piper, '_check_voice_changed', return_value=True):
+        start = time.perf_counter()
+        piper.tts_synthesize('Hello.', output_file, synth_options)
+
+    assert time.perf_counter() - start < 1
+    restart.assert_called_once()
+    assert len(commands) == 2
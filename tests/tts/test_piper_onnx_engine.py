@@ -0,0 +1,110 @@
+import json
+import wave
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from src.tts import piper_onnx_engine
+from src.tts.piper import Piper
+from src.tts.piper_onnx_engine import PiperOnnxEngine
+from src.tts.synthesization_options import SynthesizationOptions
+
+
+PHONEME_ID_MAP = {"^": [1], "$": [2], "_": [0], "h": [3], "i": [4], ".": [5]}
+
+
+class FakeSession:
+    """Stands in for an onnxruntime InferenceSession of a Piper voice, returns one sample per phoneme id"""
+    def __init__(self, model_path: str, sess_options=None, providers=None) -> None:
+        self.model_path = model_path
+        self.runs: list[dict] = []
+
+    def get_inputs(self):
+        return [SimpleNamespace(name=input_name) for input_name in ["input", "input_lengths", "scales"]]
+
+    def run(self, output_names, inputs: dict):
+        self.runs.append(inputs)
+        phoneme_count = inputs["input"].shape[1]
+        return [np.linspace(-0.5, 0.5, phoneme_count, dtype=np.float32).reshape(1, 1, 1, phoneme_count)]
+
+
+@pytest.fixture
+def models_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(piper_onnx_engine, 'has_piper_phonemize', True)
+    monkeypatch.setattr(piper_onnx_engine, 'phonemize_espeak', lambda text, voice: [list(sentence.strip()) for sentence in text.split('.') if sentence.strip()], raising=False)
+    monkeypatch.setattr(piper_onnx_engine.ort, 'InferenceSession', FakeSession)
+    for voice in ['femalenord', 'malenord', 'maleorc']:
+        (tmp_path / f'{voice}.onnx').write_bytes(b'')
+        (tmp_path / f'{voice}.onnx.json').write_text(json.dumps({
+            "audio": {"sample_rate": 22050},
+            "espeak": {"voice": "en-us"},
+            "inference": {"noise_scale": 0.667, "length_scale": 1, "noise_w": 0.8},
+            "phoneme_type": "espeak",
+            "phoneme_id_map": PHONEME_ID_MAP,
+            "num_speakers": 1
+        }))
+    return tmp_path
+
+
+def test_phonemes_are_padded_and_wrapped(models_path):
+    engine = PiperOnnxEngine(models_path)
+    voice = engine.load_voice('femalenord')
+
+    assert voice.phonemes_to_ids(['h', 'i', '?']) == [1, 3, 0, 4, 0, 2]
+
+
+def test_synthesize_returns_pcm_in_memory(models_path):
+    engine = PiperOnnxEngine(models_path)
+    audio, sample_rate = engine.synthesize('femalenord', 'hi. hi')
+
+    assert sample_rate == 22050
+    assert audio.dtype == np.int16
+    assert audio.size == 2 * len([1, 3, 0, 4, 0, 2]) # one sentence after the other
+    assert np.max(np.abs(audio)) == 32767
+
+
+def test_least_recently_used_voice_is_unloaded(models_path):
+    engine = PiperOnnxEngine(models_path, max_loaded_voices=2)
+    engine.load_voice('femalenord')
+    engine.load_voice('malenord')
+    engine.load_voice('femalenord')
+    engine.load_voice('maleorc')
+
+    assert engine.is_voice_loaded('femalenord')
+    assert not engine.is_voice_loaded('malenord')
+    assert engine.is_voice_loaded('maleorc')
+
+
+def test_resident_voice_is_not_reloaded(models_path):
+    engine = PiperOnnxEngine(models_path)
+
+    assert engine.load_voice('femalenord') is engine.load_voice('femalenord')
+
+
+def test_engine_requires_piper_phonemize(models_path, monkeypatch):
+    monkeypatch.setattr(piper_onnx_engine, 'has_piper_phonemize', False)
+
+    assert not PiperOnnxEngine.is_available()
+    with pytest.raises(ModuleNotFoundError):
+        PiperOnnxEngine(models_path)
+
+
+def test_piper_synthesizes_in_process_without_piper_exe(models_path, tmp_path):
+    piper = object.__new__(Piper)
+    piper._Piper__engine = PiperOnnxEngine(models_path)
+    piper._Piper__selected_voice = None
+    piper._Piper__waiting_for_voice_load = False
+    piper._Piper__available_models = ['femalenord', 'malenord', 'maleorc']
+    piper._Piper__models_path = models_path
+    piper._loglevel = 20
+    piper._last_voice = ''
+    piper._current_actor_gender = None
+    piper._current_actor_race = None
+    output_file = str(tmp_path / 'out.wav')
+
+    piper.change_voice('FemaleNord')
+    piper.tts_synthesize('hi.', output_file, SynthesizationOptions(aggro=False, is_first_line_of_response=False))
+
+    assert piper._last_voice == 'femalenord'
+    with wave.open(output_file, 'rb') as wav_file:
+        assert wav_file.getframerate() == 22050
+        assert wav_file.getnframes() > 0
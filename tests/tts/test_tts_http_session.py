@@ -0,0 +1,111 @@
+import socket
+import threading
+import time
+import pytest
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.tts.tts_http_session import TTSHttpSession, get_tts_http_session
+
+
+class TTSServerHandler(BaseHTTPRequestHandler):
+    """Answers with the status codes queued on the server, 200 once the queue is empty"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.client_address[1]))
+        if self.path == '/slow':
+            time.sleep(0.5)
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        body = b'ok'
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def tts_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), TTSServerHandler)
+    server.statuses = []
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _url(server: ThreadingHTTPServer, path: str = '/') -> str:
+    return f'http://127.0.0.1:{server.server_address[1]}{path}'
+
+
+def _unused_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def test_connections_are_kept_alive(tts_server):
+    session = TTSHttpSession(_url(tts_server), backoff_seconds=0)
+
+    for _ in range(3):
+        assert session.get(_url(tts_server)).status_code == 200
+
+    client_ports = {client_port for _, client_port in tts_server.requests}
+    assert len(client_ports) == 1
+    session.close()
+
+
+def test_unavailable_server_is_retried(tts_server):
+    tts_server.statuses = [503, 503]
+    session = TTSHttpSession(_url(tts_server), max_retries=2, backoff_seconds=0)
+
+    assert session.get(_url(tts_server)).status_code == 200
+    assert len(tts_server.requests) == 3
+    session.close()
+
+
+def test_last_response_is_returned_once_retries_are_used_up(tts_server):
+    tts_server.statuses = [503, 503]
+    session = TTSHttpSession(_url(tts_server), max_retries=1, backoff_seconds=0)
+
+    assert session.get(_url(tts_server)).status_code == 503
+    assert len(tts_server.requests) == 2
+    session.close()
+
+
+def test_unreachable_server_raises_after_retries():
+    url = f'http://127.0.0.1:{_unused_port()}/'
+    session = TTSHttpSession(url, max_retries=2, backoff_seconds=0)
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        session.get(url)
+    session.close()
+
+
+def test_hung_server_times_out_without_retry(tts_server):
+    session = TTSHttpSession(_url(tts_server), read_timeout=0.1, max_retries=2, backoff_seconds=0)
+
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        session.get(_url(tts_server, '/slow'))
+    assert len(tts_server.requests) == 1
+    session.close()
+
+
+def test_read_timeout_can_be_set_per_request(tts_server):
+    session = TTSHttpSession(_url(tts_server), read_timeout=5, max_retries=0)
+
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        session.get(_url(tts_server, '/slow'), read_timeout=0.1)
+    # Other users of the shared session keep its own read timeout
+    assert session.read_timeout == 5
+    assert session.get(_url(tts_server, '/slow')).status_code == 200
+    session.close()
+
+
+def test_session_is_shared_per_server():
+    assert get_tts_http_session('http://127.0.0.1:8008/synthesize') is get_tts_http_session('http://127.0.0.1:8008/loadModel')
+    assert get_tts_http_session('http://127.0.0.1:8008/') is not get_tts_http_session('http://127.0.0.1:8020/')
@@ -0,0 +1,207 @@
+import os
+import pytest
+from unittest.mock import MagicMock
+from src.config.definitions.game_definitions import GameEnum
+from src.tts.synthesization_options import SynthesizationOptions
+from src.tts.ttsable import TTSable
+from src.tts.voiceline_cache import VoicelineCache
+
+
+def _write_voiceline(wav_file: str, size: int = 1024, with_lip: bool = True) -> str:
+    with open(wav_file, 'wb') as f:
+        f.write(os.urandom(size))
+    if with_lip:
+        with open(wav_file.replace(".wav", ".lip"), 'wb') as f:
+            f.write(b'lip')
+    return wav_file
+
+
+def _make_key(voiceline: str, voice_model: str = 'femalenord', aggro: bool = False, language: str = 'en', lip_mode: str = 'generated') -> str:
+    return VoicelineCache.make_key('Piper', voice_model, voiceline, aggro, language, lip_mode)
+
+
+class CountingTTS(TTSable):
+    """Minimal TTS service that writes a fixed .wav file and counts how often it is asked to synthesize"""
+    def __init__(self, config) -> None:
+        super().__init__(config)
+        self.synthesize_count = 0
+        self.change_voice_count = 0
+        self.settings = ''
+        self.model_file = ''
+
+    def change_voice(self, voice, in_game_voice=None, csv_in_game_voice=None, advanced_voice_model=None, voice_accent=None, voice_gender=None, voice_race=None):
+        self.change_voice_count += 1
+        self._last_voice = voice
+
+    def _get_cache_settings(self):
+        return self.settings
+
+    def _get_cache_voice_model(self, voice, in_game_voice, csv_in_game_voice, advanced_voice_model):
+        return self._describe_model_file(self.model_file)
+
+    def tts_synthesize(self, voiceline, final_voiceline_file, synth_options):
+        self.synthesize_count += 1
+        _write_voiceline(final_voiceline_file, with_lip=False)
+
+
+@pytest.fixture
+def counting_tts(tmp_path, monkeypatch) -> CountingTTS:
+    monkeypatch.setattr('src.utils.get_tmp_dir', lambda: str(tmp_path))
+    config = MagicMock()
+    config.lip_generation = 'disabled'
+    config.language = 'en'
+    config.voiceline_cache_size = 10
+    config.game.base_game = GameEnum.SKYRIM
+    return CountingTTS(config)
+
+
+def test_key_ignores_whitespace_differences():
+    assert _make_key(' Hello there. ') == _make_key('Hello   there.')
+    assert _make_key('Hello there.') != _make_key('Hello there!')
+
+
+@pytest.mark.parametrize("changed_part", [
+    {'voice_model': 'malenord'},
+    {'aggro': True},
+    {'language': 'de'},
+    {'lip_mode': 'none'},
+])
+def test_key_changes_with_every_part(changed_part: dict):
+    assert _make_key('Hello there.') != _make_key('Hello there.', **changed_part)
+
+
+def test_get_returns_cached_files(tmp_path):
+    cache = VoicelineCache(str(tmp_path / 'cache'), 1)
+    key = _make_key('Hello there.')
+    cache.put(key, _write_voiceline(str(tmp_path / 'source.wav')))
+
+    destination = str(tmp_path / 'destination.wav')
+    assert cache.get(key, destination)
+    assert os.path.exists(destination)
+    assert os.path.exists(destination.replace(".wav", ".lip"))
+    assert cache.hits == 1
+    assert cache.misses == 0
+
+
+def test_get_counts_misses(tmp_path):
+    cache = VoicelineCache(str(tmp_path / 'cache'), 1)
+
+    assert not cache.get(_make_key('Hello there.'), str(tmp_path / 'destination.wav'))
+    assert cache.hits == 0
+    assert cache.misses == 1
+
+
+def test_cached_files_survive_deleting_the_returned_files(tmp_path):
+    """The game deletes voicelines once they have been played"""
+    cache = VoicelineCache(str(tmp_path / 'cache'), 1)
+    key = _make_key('Hello there.')
+    source = _write_voiceline(str(tmp_path / 'source.wav'))
+    cache.put(key, source)
+    os.remove(source)
+    os.remove(source.replace(".wav", ".lip"))
+
+    destination = str(tmp_path / 'destination.wav')
+    assert cache.get(key, destination)
+    os.remove(destination)
+    assert cache.get(key, destination)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = VoicelineCache(str(tmp_path / 'cache'), 1)
+    entry_size = 400 * 1024
+    keys = [_make_key(f'Voiceline {i}.') for i in range(3)]
+    cache.put(keys[0], _write_voiceline(str(tmp_path / '0.wav'), entry_size, with_lip=False))
+    cache.put(keys[1], _write_voiceline(str(tmp_path / '1.wav'), entry_size, with_lip=False))
+    assert cache.get(keys[0], str(tmp_path / 'used.wav'))
+
+    cache.put(keys[2], _write_voiceline(str(tmp_path / '2.wav'), entry_size, with_lip=False))
+
+    assert keys[0] in cache
+    assert keys[1] not in cache
+    assert keys[2] in cache
+    assert cache.size_bytes == 2 * entry_size
+    assert not os.path.exists(str(tmp_path / 'cache' / f'{keys[1]}.wav'))
+
+
+def test_entries_persist_across_instances(tmp_path):
+    cache_folder = str(tmp_path / 'cache')
+    key = _make_key('Hello there.')
+    VoicelineCache(cache_folder, 1).put(key, _write_voiceline(str(tmp_path / 'source.wav')))
+
+    reloaded_cache = VoicelineCache(cache_folder, 1)
+    assert key in reloaded_cache
+    assert reloaded_cache.size_bytes == 1024 + len(b'lip')
+    assert reloaded_cache.get(key, str(tmp_path / 'destination.wav'))
+
+
+def test_synthesize_reuses_cached_voiceline(counting_tts: CountingTTS):
+    synth_options = SynthesizationOptions(aggro=False, is_first_line_of_response=False)
+
+    first_file = counting_tts.synthesize('FemaleNord', ' Hello there. ', 'FemaleNord', 'FemaleNord', 'en', synth_options)
+    os.remove(first_file) # Played voicelines are removed by the game
+    second_file = counting_tts.synthesize('FemaleNord', ' Hello there. ', 'FemaleNord', 'FemaleNord', 'en', synth_options)
+
+    assert counting_tts.synthesize_count == 1
+    assert second_file == first_file
+    assert os.path.exists(second_file)
+
+
+def test_cached_voiceline_does_not_switch_voice(counting_tts: CountingTTS):
+    synth_options = SynthesizationOptions(aggro=False, is_first_line_of_response=False)
+    counting_tts.synthesize('FemaleNord', 'Hello there.', 'FemaleNord', 'FemaleNord', 'en', synth_options)
+    counting_tts.synthesize('MaleNord', 'Well met.', 'MaleNord', 'MaleNord', 'en', synth_options)
+    assert counting_tts.change_voice_count == 2
+
+    counting_tts.synthesize('FemaleNord', 'Hello there.', 'FemaleNord', 'FemaleNord', 'en', synth_options)
+
+    assert counting_tts.change_voice_count == 2
+    assert counting_tts.synthesize_count == 2
+    assert counting_tts._last_voice == 'MaleNord'
+
+
+def test_synthesize_does_not_reuse_voiceline_after_settings_change(counting_tts: CountingTTS):
+    synth_options = SynthesizationOptions(aggro=False, is_first_line_of_response=False)
+    counting_tts.settings = 'pace=1.0'
+    counting_tts.synthesize('FemaleNord', 'Hello there.', 'FemaleNord', 'FemaleNord', 'en', synth_options)
+
+    counting_tts.settings = 'pace=1.2'
+    counting_tts.synthesize('FemaleNord', 'Hello there.', 'FemaleNord', 'FemaleNord', 'en', synth_options)
+
+    assert counting_tts.synthesize_count == 2
+
+
+def test_synthesize_does_not_reuse_voiceline_of_replaced_model(counting_tts: CountingTTS, tmp_path):
+    synth_options = SynthesizationOptions(aggro=False, is_first_line_of_response=False)
+    counting_tts.model_file = str(tmp_path / 'femalenord.onnx')
+    _write_voiceline(counting_tts.model_file, size=100, with_lip=False)
+    counting_tts.synthesize('FemaleNord', 'Hello there.', 'FemaleNord', 'FemaleNord', 'en', synth_options)
+    counting_tts.synthesize('FemaleNord', 'Hello there.', 'FemaleNord', 'FemaleNord', 'en', synth_options)
+    assert counting_tts.synthesize_count == 1
+
+    _write_voiceline(counting_tts.model_file, size=200, with_lip=False) # a different model installed under the same name
+    counting_tts.synthesize('FemaleNord', 'Hello there.', 'FemaleNord', 'FemaleNord', 'en', synth_options)
+
+    assert counting_tts.synthesize_count == 2
+
+
+def test_synthesize_does_not_reuse_voiceline_of_other_voice_or_aggro(counting_tts: CountingTTS):
+    calm = SynthesizationOptions(aggro=False, is_first_line_of_response=False)
+    aggro = SynthesizationOptions(aggro=True, is_first_line_of_response=False)
+
+    counting_tts.synthesize('FemaleNord', 'Hello there.', 'FemaleNord', 'FemaleNord', 'en', calm)
+    counting_tts.synthesize('MaleNord', 'Hello there.', 'MaleNord', 'MaleNord', 'en', calm)
+    counting_tts.synthesize('MaleNord', 'Hello there.', 'MaleNord', 'MaleNord', 'en', aggro)
+
+    assert counting_tts.synthesize_count == 3
+
+
+def test_synthesize_records_timings(counting_tts: CountingTTS):
+    synth_options = SynthesizationOptions(aggro=False, is_first_line_of_response=False)
+
+    counting_tts.synthesize('FemaleNord', 'Hello there.', 'FemaleNord', 'FemaleNord', 'en', synth_options)
+    counting_tts.synthesize('FemaleNord', 'Hello there.', 'FemaleNord', 'FemaleNord', 'en', synth_options)
+
+    timings = counting_tts.synthesis_timings
+    assert [timing.is_cached for timing in timings] == [False, True]
+    assert all(timing.voiceline == 'Hello there.' and timing.voice == 'FemaleNord' for timing in timings)
+    assert all(timing.synthesis_seconds >= 0 for timing in timings)
@@ -0,0 +1,66 @@
+import io
+import wave
+import numpy as np
+import pytest
+import soundfile as sf
+from src.tts.wav_stream_writer import WavStreamWriter
+
+
+def _wav_bytes(samples: np.ndarray, subtype: str, sample_rate: int = 24000) -> bytes:
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, sample_rate, format='WAV', subtype=subtype)
+    return buffer.getvalue()
+
+
+def _stream(data: bytes, output_file: str, piece_size: int) -> WavStreamWriter:
+    with WavStreamWriter(output_file) as writer:
+        for i in range(0, len(data), piece_size):
+            writer.write(data[i:i + piece_size])
+    return writer
+
+
+@pytest.mark.parametrize("piece_size", [1, 7, 4096])
+def test_pcm16_stream_is_written_as_is(tmp_path, piece_size: int):
+    samples = (np.sin(np.linspace(0, 20, 1000)) * 20000).astype(np.int16)
+    output_file = str(tmp_path / 'out.wav')
+
+    writer = _stream(_wav_bytes(samples, 'PCM_16'), output_file, piece_size)
+
+    assert writer.frames_written == 1000
+    with wave.open(output_file, 'rb') as wav_file:
+        assert wav_file.getframerate() == 24000
+        assert wav_file.getsampwidth() == 2
+        assert np.array_equal(np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16), samples)
+
+
+def test_float_stream_is_converted_to_pcm16(tmp_path):
+    samples = np.linspace(-1.0, 1.0, 501, dtype=np.float32)
+    output_file = str(tmp_path / 'out.wav')
+
+    _stream(_wav_bytes(samples, 'FLOAT'), output_file, 333)
+
+    written, sample_rate = sf.read(output_file, dtype='int16')
+    assert sample_rate == 24000
+    assert sf.info(output_file).subtype == 'PCM_16'
+    assert np.array_equal(written, (samples * 32767).astype(np.int16))
+
+
+def test_stream_header_with_unknown_length(tmp_path):
+    """Streaming servers send the header before they know how long the audio is"""
+    samples = np.arange(100, dtype=np.int16)
+    data = bytearray(_wav_bytes(samples, 'PCM_16'))
+    data_chunk = data.index(b'data')
+    data[data_chunk + 4:data_chunk + 8] = b'\x00\x00\x00\x00'
+    output_file = str(tmp_path / 'out.wav')
+
+    writer = _stream(bytes(data), output_file, 64)
+
+    assert writer.frames_written == 100
+    assert sf.info(output_file).frames == 100
+
+
+def test_stream_without_wav_header_is_rejected(tmp_path):
+    writer = WavStreamWriter(str(tmp_path / 'out.wav'))
+
+    with pytest.raises(ValueError):
+        writer.write(b'{"detail": "HTTP Streaming is only supported for local models."}')
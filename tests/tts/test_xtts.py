@@ -0,0 +1,64 @@
+import io
+import numpy as np
+import soundfile as sf
+from unittest.mock import MagicMock
+from src.tts.xtts import XTTS
+
+
+def _make_mock_xtts(streaming: bool = True) -> XTTS:
+    """Create a minimal XTTS instance without calling __init__ (which connects to the XTTS server)"""
+    xtts = object.__new__(XTTS)
+    xtts._XTTS__xtts_streaming = streaming
+    xtts._XTTS__xtts_stream_url = 'http://127.0.0.1:8020/tts_stream'
+    xtts._XTTS__xtts_synthesize_url = 'http://127.0.0.1:8020/tts_to_audio/'
+    xtts._XTTS__voice_accent = 'en'
+    xtts._XTTS__session = MagicMock()
+    xtts._XTTS__request_timeout = 120
+    xtts._language = 'en'
+    xtts._last_voice = 'femalenord'
+    return xtts
+
+
+def _wav_bytes(samples: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, 24000, format='WAV', subtype='PCM_16')
+    return buffer.getvalue()
+
+
+def _response(status_code: int, content: bytes) -> MagicMock:
+    response = MagicMock()
+    response.status_code = status_code
+    response.content = content
+    response.iter_content.return_value = [content[i:i + 100] for i in range(0, len(content), 100)]
+    response.__enter__.return_value = response
+    return response
+
+
+def test_streamed_voiceline_is_written_as_it_arrives(tmp_path):
+    xtts = _make_mock_xtts()
+    samples = np.arange(2000, dtype=np.int16)
+    xtts._XTTS__session.get.return_value = _response(200, _wav_bytes(samples))
+    output_file = str(tmp_path / 'out.wav')
+
+    xtts.tts_synthesize('Hello there.', output_file, MagicMock())
+
+    assert xtts._XTTS__session.get.call_args.kwargs['stream'] is True
+    assert xtts._XTTS__session.get.call_args.kwargs['read_timeout'] == 120
+    assert xtts._XTTS__session.get.call_args.kwargs['params']['speaker_wav'] == 'femalenord'
+    xtts._XTTS__session.post.assert_not_called()
+    assert np.array_equal(sf.read(output_file, dtype='int16')[0], samples)
+
+
+def test_falls_back_to_full_response_if_streaming_is_not_supported(tmp_path):
+    xtts = _make_mock_xtts()
+    samples = np.arange(2000, dtype=np.int16)
+    xtts._XTTS__session.get.return_value = _response(400, b'{"detail": "HTTP Streaming is only supported for local models."}')
+    xtts._XTTS__session.post.return_value = _response(200, _wav_bytes(samples))
+    output_file = str(tmp_path / 'out.wav')
+
+    xtts.tts_synthesize('Hello there.', output_file, MagicMock())
+    xtts.tts_synthesize('Hello again.', output_file, MagicMock())
+
+    assert xtts._XTTS__session.get.call_count == 1 # Streaming is not tried again
+    assert xtts._XTTS__session.post.call_count == 2
+    assert np.allclose(sf.read(output_file, dtype='int16')[0], samples, atol=1)
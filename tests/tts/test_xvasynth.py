@@ -0,0 +1,51 @@
+import numpy as np
+import soundfile as sf
+from unittest.mock import patch
+from src.tts.xvasynth import xVASynth
+
+
+def _make_mock_xvasynth() -> xVASynth:
+    """Create a minimal xVASynth instance without calling __init__ (which connects to the xVASynth server)"""
+    return object.__new__(xVASynth)
+
+
+def _write_phrase(path: str, values: np.ndarray, samplerate: int = 22050) -> str:
+    sf.write(path, values, samplerate, subtype='FLOAT')
+    return path
+
+
+def test_merge_audio_files_joins_phrases_in_order(tmp_path):
+    xvasynth = _make_mock_xvasynth()
+    phrases = [np.full(100, 0.1), np.full(50, 0.2), np.full(75, 0.3)]
+    audio_files = [_write_phrase(str(tmp_path / f'{i}.wav'), phrase) for i, phrase in enumerate(phrases)]
+    merged_file = str(tmp_path / 'merged.wav')
+
+    xvasynth._merge_audio_files(audio_files, merged_file)
+
+    merged_audio, samplerate = sf.read(merged_file)
+    assert samplerate == 22050
+    np.testing.assert_allclose(merged_audio, np.concatenate(phrases), atol=1e-4)
+
+
+def test_merge_audio_files_writes_merged_file_once(tmp_path):
+    xvasynth = _make_mock_xvasynth()
+    audio_files = [_write_phrase(str(tmp_path / f'{i}.wav'), np.zeros(100)) for i in range(5)]
+
+    with patch('src.tts.xvasynth.sf.write', wraps=sf.write) as write:
+        xvasynth._merge_audio_files(audio_files, str(tmp_path / 'merged.wav'))
+
+    assert write.call_count == 1
+
+
+def test_merge_audio_files_skips_missing_phrases(tmp_path):
+    xvasynth = _make_mock_xvasynth()
+    audio_files = [
+        _write_phrase(str(tmp_path / '0.wav'), np.full(100, 0.1)),
+        str(tmp_path / 'missing.wav'),
+        _write_phrase(str(tmp_path / '2.wav'), np.full(50, 0.2)),
+    ]
+    merged_file = str(tmp_path / 'merged.wav')
+
+    xvasynth._merge_audio_files(audio_files, merged_file)
+
+    assert sf.info(merged_file).frames == 150